@@ -14,11 +14,173 @@ import (
 	"github.com/ToxiPain/snakechat/utils"
 )
 import (
+	"database/sql"
+	"encoding/binary"
+	"errors"
+	"fmt"
 	"time"
 
+	"go.mau.fi/whatsmeow/types"
 	"google.golang.org/protobuf/proto"
 )
 
+// flags of a packed chat settings record, see ChatSettingsStore.put_many
+const (
+	chatMutedSet = 1 << iota
+	chatPinnedSet
+	chatPinned
+	chatArchivedSet
+	chatArchived
+)
+
+// flags of a packed GetChatSettingsMany result
+const (
+	chatFound = 1 << iota
+	chatIsPinned
+	chatIsArchived
+)
+
+const putChatSettingQuery = `
+	INSERT INTO whatsmeow_chat_settings (our_jid, chat_jid, %[1]s) VALUES ($1, $2, $3)
+	ON CONFLICT (our_jid, chat_jid) DO UPDATE SET %[1]s=excluded.%[1]s
+`
+
+const getChatSettingsQuery = `
+	SELECT muted_until, pinned, archived FROM whatsmeow_chat_settings WHERE our_jid=$1 AND chat_jid=$2
+`
+
+var errTruncatedChatRecord = errors.New("truncated chat settings record")
+
+func readChatJID(buf []byte) (types.JID, []byte, error) {
+	if len(buf) < 2 {
+		return types.JID{}, nil, errTruncatedChatRecord
+	}
+	size := int(binary.LittleEndian.Uint16(buf))
+	if len(buf) < 2+size {
+		return types.JID{}, nil, errTruncatedChatRecord
+	}
+	jid, err := types.ParseJID(string(buf[2 : 2+size]))
+	return jid, buf[2+size:], err
+}
+
+func chatSettingsStore(id *C.char) (*sql.DB, string, error) {
+	uuid := C.GoString(id)
+	client, ok := clients[uuid]
+	if !ok || client.Store.ID == nil {
+		return nil, "", errors.New("device is not logged in")
+	}
+	return databases[uuid], client.Store.ID.String(), nil
+}
+
+func putChatSettingsMany(db *sql.DB, ourJID string, buf []byte) error {
+	tx, err := db.Begin()
+	if err != nil {
+		return err
+	}
+	defer tx.Rollback()
+	statements := map[string]*sql.Stmt{}
+	for _, column := range []string{"muted_until", "pinned", "archived"} {
+		statements[column], err = tx.Prepare(fmt.Sprintf(putChatSettingQuery, column))
+		if err != nil {
+			return err
+		}
+		defer statements[column].Close()
+	}
+	for len(buf) > 0 {
+		var chat types.JID
+		chat, buf, err = readChatJID(buf)
+		if err != nil {
+			return err
+		}
+		if len(buf) < 9 {
+			return errTruncatedChatRecord
+		}
+		flags, mutedUntil := buf[0], int64(binary.LittleEndian.Uint64(buf[1:9]))
+		buf = buf[9:]
+		chatJID := chat.String()
+		if flags&chatMutedSet != 0 {
+			if _, err = statements["muted_until"].Exec(ourJID, chatJID, mutedUntil); err != nil {
+				return err
+			}
+		}
+		if flags&chatPinnedSet != 0 {
+			if _, err = statements["pinned"].Exec(ourJID, chatJID, flags&chatPinned != 0); err != nil {
+				return err
+			}
+		}
+		if flags&chatArchivedSet != 0 {
+			if _, err = statements["archived"].Exec(ourJID, chatJID, flags&chatArchived != 0); err != nil {
+				return err
+			}
+		}
+	}
+	return tx.Commit()
+}
+
+func getChatSettingsMany(db *sql.DB, ourJID string, buf []byte) ([]byte, error) {
+	tx, err := db.Begin()
+	if err != nil {
+		return nil, err
+	}
+	defer tx.Rollback()
+	statement, err := tx.Prepare(getChatSettingsQuery)
+	if err != nil {
+		return nil, err
+	}
+	defer statement.Close()
+	result := []byte{0}
+	for len(buf) > 0 {
+		var chat types.JID
+		chat, buf, err = readChatJID(buf)
+		if err != nil {
+			return nil, err
+		}
+		var flags byte
+		var mutedUntil int64
+		var pinned, archived bool
+		err = statement.QueryRow(ourJID, chat.String()).Scan(&mutedUntil, &pinned, &archived)
+		if err == nil {
+			flags |= chatFound
+			if pinned {
+				flags |= chatIsPinned
+			}
+			if archived {
+				flags |= chatIsArchived
+			}
+		} else if !errors.Is(err, sql.ErrNoRows) {
+			return nil, err
+		}
+		result = append(result, flags)
+		result = binary.LittleEndian.AppendUint64(result, uint64(mutedUntil))
+	}
+	return result, nil
+}
+
+//export PutChatSettingsMany
+func PutChatSettingsMany(id *C.char, settings *C.uchar, settingsSize C.int) *C.char {
+	db, ourJID, err := chatSettingsStore(id)
+	if err == nil {
+		err = putChatSettingsMany(db, ourJID, getByteByAddr(settings, settingsSize))
+	}
+	if err != nil {
+		return C.CString(err.Error())
+	}
+	return C.CString("")
+}
+
+//export GetChatSettingsMany
+func GetChatSettingsMany(id *C.char, users *C.uchar, usersSize C.int) C.struct_BytesReturn {
+	db, ourJID, err := chatSettingsStore(id)
+	var result []byte
+	if err == nil {
+		result, err = getChatSettingsMany(db, ourJID, getByteByAddr(users, usersSize))
+	}
+	if err != nil {
+		result = append([]byte{1}, err.Error()...)
+	}
+	return ReturnBytes(result)
+}
+
 //export PutMutedUntil
 func PutMutedUntil(id *C.char, user *C.uchar, userSize C.int, mutedUntil C.float) *C.char {
 	var JID defproto.JID
@@ -44,7 +206,7 @@ func GetChatSettings(id *C.char, user *C.uchar, userSize C.int) C.struct_BytesRe
 			Found:      proto.Bool(local_chat_settings.Found),
 			MutedUntil: proto.Float64(float64(local_chat_settings.MutedUntil.Unix())),
 			Pinned:     proto.Bool(local_chat_settings.Pinned),
-			Archived:   proto.Bool(local_chat_settings.Pinned),
+			Archived:   proto.Bool(local_chat_settings.Archived),
 		},
 	}
 	return_bytes, err_proto := proto.Marshal(&return_)
@@ -120,3 +120,32 @@ func GetAllContacts(id *C.char) C.struct_BytesReturn {
 	return ReturnBytes(return_bytes)
 
 }
+
+//export GetContacts
+func GetContacts(id *C.char, users *C.uchar, usersSize C.int) C.struct_BytesReturn {
+	var userJIDs defproto.JIDArray
+	err := proto.Unmarshal(getByteByAddr(users, usersSize), &userJIDs)
+	if err != nil {
+		panic(err)
+	}
+	contactStore := clients[C.GoString(id)].Store.Contacts
+	return_ := defproto.ContactsGetAllContactsReturnFunction{
+		Contact: make([]*defproto.Contact, 0, len(userJIDs.JIDS)),
+	}
+	for _, userJID := range userJIDs.JIDS {
+		contact_info, err_ := contactStore.GetContact(utils.DecodeJidProto(userJID))
+		if err_ != nil {
+			return_.Error = proto.String(err_.Error())
+			break
+		}
+		return_.Contact = append(return_.Contact, &defproto.Contact{
+			JID:  userJID,
+			Info: utils.EncodeContactInfo(contact_info),
+		})
+	}
+	return_bytes, err_proto := proto.Marshal(&return_)
+	if err_proto != nil {
+		panic(err_proto)
+	}
+	return ReturnBytes(return_bytes)
+}
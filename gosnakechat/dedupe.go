@@ -0,0 +1,122 @@
+package main
+
+import (
+	"C"
+)
+import (
+	"encoding/binary"
+	"sync"
+	"time"
+
+	"go.mau.fi/whatsmeow/types"
+)
+
+const (
+	defaultDedupeCapacity = 50000
+	defaultDedupeWindow   = 24 * time.Hour
+)
+
+type dedupeKey struct {
+	chat   types.JID
+	sender types.JID
+	id     types.MessageID
+}
+
+// dedupeFilter remembers the last capacity inbound messages so redeliveries
+// after a reconnect or an offline sync are dropped before they are marshalled.
+// The ring grows with the traffic and, once it holds capacity entries, evicts
+// them in insertion order, so an idle client costs almost nothing and a busy
+// one stays bounded at roughly 200 bytes per entry.
+type dedupeFilter struct {
+	mu       sync.Mutex
+	capacity int
+	window   time.Duration
+	seenAt   map[dedupeKey]time.Time
+	ring     []dedupeKey
+	next     int
+	checked  uint64
+	dropped  uint64
+}
+
+var (
+	dedupers   = make(map[string]*dedupeFilter)
+	dedupersMu sync.RWMutex
+)
+
+func newDedupeFilter(capacity int, window time.Duration) *dedupeFilter {
+	if capacity < 0 {
+		capacity = 0
+	}
+	return &dedupeFilter{
+		capacity: capacity,
+		window:   window,
+		seenAt:   make(map[dedupeKey]time.Time),
+	}
+}
+
+func getDedupeFilter(uuid string) *dedupeFilter {
+	dedupersMu.RLock()
+	defer dedupersMu.RUnlock()
+	return dedupers[uuid]
+}
+
+// releaseDedupeFilter frees the filter of a client that is torn down.
+func releaseDedupeFilter(uuid string) {
+	dedupersMu.Lock()
+	defer dedupersMu.Unlock()
+	delete(dedupers, uuid)
+}
+
+// duplicate records a message and tells whether it was already seen within the window.
+func (f *dedupeFilter) duplicate(chat, sender types.JID, id types.MessageID) bool {
+	if f == nil {
+		return false
+	}
+	key := dedupeKey{chat.ToNonAD(), sender.ToNonAD(), id}
+	now := time.Now()
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	if f.capacity == 0 {
+		return false
+	}
+	f.checked++
+	at, ok := f.seenAt[key]
+	if ok && now.Sub(at) < f.window {
+		f.dropped++
+		return true
+	}
+	if !ok {
+		if len(f.ring) < f.capacity {
+			// the ring only wraps once it is full, so next stays at the oldest entry
+			f.ring = append(f.ring, key)
+		} else {
+			delete(f.seenAt, f.ring[f.next])
+			f.ring[f.next] = key
+			f.next = (f.next + 1) % len(f.ring)
+		}
+	}
+	f.seenAt[key] = now
+	return false
+}
+
+//export SetInboundDedupe
+func SetInboundDedupe(id *C.char, capacity C.int, windowSeconds C.longlong) {
+	dedupersMu.Lock()
+	defer dedupersMu.Unlock()
+	dedupers[C.GoString(id)] = newDedupeFilter(int(capacity), time.Duration(windowSeconds)*time.Second)
+}
+
+// GetInboundDedupeStats returns checked, dropped and held entries as three little-endian uint64.
+//
+//export GetInboundDedupeStats
+func GetInboundDedupeStats(id *C.char) C.struct_BytesReturn {
+	stats := make([]byte, 24)
+	if f := getDedupeFilter(C.GoString(id)); f != nil {
+		f.mu.Lock()
+		binary.LittleEndian.PutUint64(stats[0:], f.checked)
+		binary.LittleEndian.PutUint64(stats[8:], f.dropped)
+		binary.LittleEndian.PutUint64(stats[16:], uint64(len(f.seenAt)))
+		f.mu.Unlock()
+	}
+	return ReturnBytes(stats)
+}
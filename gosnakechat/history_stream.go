@@ -0,0 +1,148 @@
+package main
+
+import (
+	"C"
+)
+import (
+	"encoding/binary"
+	"sync"
+
+	waHistorySync "go.mau.fi/whatsmeow/proto/waHistorySync"
+	"google.golang.org/protobuf/proto"
+)
+
+// historySyncChunkEvent is the event code of a part of a history sync.
+const historySyncChunkEvent = 45
+
+const defaultHistoryChunkMessages = 500
+
+// history syncs waiting for their parts to be sent before the event handler blocks
+const historySyncBacklog = 4
+
+var (
+	historyChunkSizes   = make(map[string]int)
+	historyChunkSizesMu sync.RWMutex
+	historySenders      = make(map[string]chan func())
+	historySendersMu    sync.Mutex
+)
+
+type historyChunk struct {
+	data               *waHistorySync.HistorySync
+	conversationsDone  int
+	conversationsTotal int
+}
+
+func historyChunkSize(uuid string) int {
+	historyChunkSizesMu.RLock()
+	defer historyChunkSizesMu.RUnlock()
+	if size, ok := historyChunkSizes[uuid]; ok {
+		return size
+	}
+	return defaultHistoryChunkMessages
+}
+
+//export SetHistorySyncChunkSize
+func SetHistorySyncChunkSize(id *C.char, maxMessages C.int) {
+	historyChunkSizesMu.Lock()
+	defer historyChunkSizesMu.Unlock()
+	if maxMessages > 0 {
+		historyChunkSizes[C.GoString(id)] = int(maxMessages)
+	} else {
+		delete(historyChunkSizes, C.GoString(id))
+	}
+}
+
+// splitHistorySync splits a history sync into parts of at most maxMessages
+// messages. The first part carries every field besides the conversations,
+// every part keeps SyncType, ChunkOrder and Progress, and a conversation longer
+// than maxMessages is split across parts that repeat its metadata.
+func splitHistorySync(data *waHistorySync.HistorySync, maxMessages int) []historyChunk {
+	conversations := data.Conversations
+	data.Conversations = nil
+	first := proto.Clone(data).(*waHistorySync.HistorySync)
+	data.Conversations = conversations
+
+	total := len(conversations)
+	chunks := []historyChunk{}
+	current := first
+	size := 0
+	done := 0
+	emit := func() {
+		chunks = append(chunks, historyChunk{current, done, total})
+		current = &waHistorySync.HistorySync{
+			SyncType:   data.SyncType,
+			ChunkOrder: data.ChunkOrder,
+			Progress:   data.Progress,
+		}
+		size = 0
+	}
+	for _, conversation := range conversations {
+		messages := conversation.Messages
+		if len(messages) <= maxMessages {
+			if size > 0 && size+len(messages) > maxMessages {
+				emit()
+			}
+			current.Conversations = append(current.Conversations, conversation)
+			size += max(len(messages), 1)
+			done++
+			continue
+		}
+		conversation.Messages = nil
+		head := proto.Clone(conversation).(*waHistorySync.Conversation)
+		conversation.Messages = messages
+		for start := 0; start < len(messages); start += maxMessages {
+			if size > 0 {
+				emit()
+			}
+			part := proto.Clone(head).(*waHistorySync.Conversation)
+			part.Messages = messages[start:min(start+maxMessages, len(messages))]
+			current.Conversations = append(current.Conversations, part)
+			size += len(part.Messages)
+			if start+maxMessages >= len(messages) {
+				done++
+			}
+		}
+	}
+	if size > 0 || len(chunks) == 0 {
+		chunks = append(chunks, historyChunk{current, done, total})
+	}
+	return chunks
+}
+
+// queueHistorySync runs send on the history goroutine of a client. A single
+// goroutine per client sends the parts of one history sync after the other,
+// so the parts of two syncs never interleave.
+func queueHistorySync(uuid string, send func()) {
+	historySendersMu.Lock()
+	out, ok := historySenders[uuid]
+	if !ok {
+		out = make(chan func(), historySyncBacklog)
+		historySenders[uuid] = out
+		go func() {
+			for send := range out {
+				send()
+			}
+		}()
+	}
+	historySendersMu.Unlock()
+	out <- send
+}
+
+// sendHistoryChunks sends the parts of a history sync one after the other, so
+// Python holds a single part at a time. Each event is a header of four
+// little-endian uint32 (index, count, conversations done, conversations
+// total) followed by the part as a waHistorySync.HistorySync.
+func sendHistoryChunks(chunks []historyChunk, send func([]byte)) {
+	for i, chunk := range chunks {
+		header := make([]byte, 16, 16+proto.Size(chunk.data))
+		binary.LittleEndian.PutUint32(header[0:], uint32(i))
+		binary.LittleEndian.PutUint32(header[4:], uint32(len(chunks)))
+		binary.LittleEndian.PutUint32(header[8:], uint32(chunk.conversationsDone))
+		binary.LittleEndian.PutUint32(header[12:], uint32(chunk.conversationsTotal))
+		payload, err := proto.MarshalOptions{}.MarshalAppend(header, chunk.data)
+		if err != nil {
+			panic(err)
+		}
+		send(payload)
+	}
+}
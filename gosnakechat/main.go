@@ -8,7 +8,10 @@ package main
 import "C"
 import (
 	"context"
+	"database/sql"
 	"fmt"
+	"runtime"
+	"runtime/debug"
 	"strings"
 	"time"
 	"unsafe"
@@ -29,6 +32,9 @@ import (
 
 var clients = make(map[string]*whatsmeow.Client)
 
+// databases keeps the handle behind each client's store for the bulk store exports
+var databases = make(map[string]*sql.DB)
+
 func getByteByAddr(addr *C.uchar, size C.int) []byte {
 	return C.GoBytes(unsafe.Pointer(addr), size)
 	// var result []byte
@@ -99,13 +105,12 @@ func AcceptTOSNotice(id *C.char, noticeID *C.char, stage *C.char) *C.char {
 }
 
 //export SendMessage
-func SendMessage(id *C.char, JIDByte *C.uchar, JIDSize C.int, messageByte *C.uchar, messageSize C.int) C.struct_BytesReturn {
+func SendMessage(id *C.char, JIDByte *C.uchar, JIDSize C.int, messageByte *C.uchar, messageSize C.int, messageID *C.char) C.struct_BytesReturn {
 	client := clients[C.GoString(id)]
-	jid := getByteByAddr(JIDByte, JIDSize)
-	var snakechat_jid defproto.JID
-	err := proto.Unmarshal(jid, &snakechat_jid)
+	jid, err := utils.DecodeJID(getByteByAddr(JIDByte, JIDSize))
 	if err != nil {
-		panic(err)
+		return_buf, _ := proto.Marshal(&defproto.SendMessageReturnFunction{Error: proto.String(err.Error())})
+		return ReturnBytes(return_buf)
 	}
 	message_bytes := getByteByAddr(messageByte, messageSize)
 	var message waProto.Message
@@ -113,10 +118,16 @@ func SendMessage(id *C.char, JIDByte *C.uchar, JIDSize C.int, messageByte *C.uch
 	if err_message != nil {
 		panic(err)
 	}
-	sendresponse, err := client.SendMessage(context.Background(), utils.DecodeJidProto(&snakechat_jid), &message)
+	var extra []whatsmeow.SendRequestExtra
+	if msgID := C.GoString(messageID); msgID != "" {
+		extra = append(extra, whatsmeow.SendRequestExtra{ID: types.MessageID(msgID)})
+	}
+	sendresponse, err := client.SendMessage(context.Background(), jid, &message, extra...)
 	return_ := defproto.SendMessageReturnFunction{}
 	if err != nil {
 		return_.Error = proto.String(err.Error())
+	} else {
+		getSentCache(C.GoString(id)).put(jid, sendresponse.ID, &message)
 	}
 	return_.SendResponse = utils.EncodeSendResponse(sendresponse)
 	return_buf, err := proto.Marshal(&return_)
@@ -126,6 +137,36 @@ func SendMessage(id *C.char, JIDByte *C.uchar, JIDSize C.int, messageByte *C.uch
 	return ReturnBytes(return_buf)
 }
 
+// SendPeerMessage sends a message to the other devices of the account, such as
+// a history sync request built by BuildHistorySyncRequest.
+//
+//export SendPeerMessage
+func SendPeerMessage(id *C.char, messageByte *C.uchar, messageSize C.int) C.struct_BytesReturn {
+	client := clients[C.GoString(id)]
+	var message waProto.Message
+	err := proto.Unmarshal(getByteByAddr(messageByte, messageSize), &message)
+	if err != nil {
+		panic(err)
+	}
+	return_ := defproto.SendMessageReturnFunction{}
+	if client.Store.ID == nil {
+		return_.Error = proto.String(whatsmeow.ErrNotLoggedIn.Error())
+	} else {
+		sendresponse, err := client.SendMessage(context.Background(), client.Store.ID.ToNonAD(), &message, whatsmeow.SendRequestExtra{Peer: true})
+		if err != nil {
+			return_.Error = proto.String(err.Error())
+		} else {
+			getSentCache(C.GoString(id)).put(client.Store.ID.ToNonAD(), sendresponse.ID, &message)
+		}
+		return_.SendResponse = utils.EncodeSendResponse(sendresponse)
+	}
+	return_buf, err := proto.Marshal(&return_)
+	if err != nil {
+		panic(err)
+	}
+	return ReturnBytes(return_buf)
+}
+
 //export snakechat
 func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel *C.char, qrCb C.ptr_to_python_function_string, logStatus C.ptr_to_python_function_string, event C.ptr_to_python_function_bytes, subscribes *C.uchar, lenSubscriber C.int, blocking C.ptr_to_python_function, devicePropsBuf *C.uchar, devicePropsSize C.int, pairphone *C.uchar, pairphoneSize C.int) { // ,
 	subscribers := map[int]bool{}
@@ -140,10 +181,14 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 	}
 	dbLog := waLog.Stdout("Database", C.GoString(logLevel), true)
 	// Make sure you add appropriate DB connector imports, e.g. github.com/mattn/go-sqlite3 for SQLite
-	container, err := sqlstore.New("sqlite3", fmt.Sprintf("file:%s?_foreign_keys=on", C.GoString(db)), dbLog)
+	rawDB, err := sql.Open("sqlite3", fmt.Sprintf("file:%s?_foreign_keys=on", C.GoString(db)))
 	if err != nil {
 		panic(err)
 	}
+	container := sqlstore.NewWithDB(rawDB, "sqlite3", dbLog)
+	if err = container.Upgrade(); err != nil {
+		panic(err)
+	}
 	// If you want multiple sessions, remember their JIDs and use .GetDevice(jid) or .GetAllDevices() instead.
 	var deviceStore *store.Device
 	var err_device error
@@ -166,6 +211,28 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 	client := whatsmeow.NewClient(deviceStore, clientLog)
 	uuid := C.GoString(id)
 	clients[uuid] = client
+	databases[uuid] = rawDB
+	dedupersMu.Lock()
+	if _, ok := dedupers[uuid]; !ok {
+		dedupers[uuid] = newDedupeFilter(defaultDedupeCapacity, defaultDedupeWindow)
+	}
+	dedupersMu.Unlock()
+	sentCachesMu.Lock()
+	if _, ok := sentCaches[uuid]; !ok {
+		sentCaches[uuid] = newSentCache(defaultSentCacheBytes, defaultSentCacheTTL)
+	}
+	sentCachesMu.Unlock()
+	client.GetMessageForRetry = func(requester, to types.JID, id types.MessageID) *waProto.Message {
+		return getSentCache(uuid).get(to, id)
+	}
+	var offlineBatch *offlineBatcher
+	if _, ok := subscribers[offlineBatchEvent]; ok {
+		offlineBatch = ensureOfflineBatcher(uuid, func(chunk []byte) {
+			data, size := getBytesAndSize(chunk)
+			// called from the batcher's delivery goroutine, chunks must stay in order
+			C.call_c_func_callback_bytes(event, data, size, C.int(offlineBatchEvent))
+		})
+	}
 	eventHandler := func(evt interface{}) {
 		switch v := evt.(type) {
 		case *events.QR:
@@ -274,7 +341,7 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 					panic(err)
 				}
 				data, size := getBytesAndSize(failure_bytes)
-				go C.call_c_func_callback_bytes(event, data, size, C.int(8))
+				go C.call_c_func_callback_bytes(event, data, size, C.int(9))
 			}
 		case *events.ClientOutdated:
 			if _, ok := subscribers[10]; ok {
@@ -300,6 +367,7 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 				go C.call_c_func_callback_bytes(event, data, size, C.int(11))
 			}
 		case *events.Disconnected:
+			offlineBatch.finish()
 			if _, ok := subscribers[12]; ok {
 				disconnect := defproto.Disconnected{
 					Status: proto.Bool(true),
@@ -312,6 +380,15 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 				go C.call_c_func_callback_bytes(event, data, size, C.int(12))
 			}
 		case *events.HistorySync:
+			if _, ok := subscribers[historySyncChunkEvent]; ok {
+				chunks := splitHistorySync(v.Data, historyChunkSize(uuid))
+				queueHistorySync(uuid, func() {
+					sendHistoryChunks(chunks, func(payload []byte) {
+						data, size := getBytesAndSize(payload)
+						C.call_c_func_callback_bytes(event, data, size, C.int(historySyncChunkEvent))
+					})
+				})
+			}
 			if _, ok := subscribers[13]; ok {
 				data := defproto.HistorySync{
 					Data: v.Data,
@@ -324,12 +401,19 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 				go C.call_c_func_callback_bytes(event, data_b, size, C.int(13))
 			}
 		case *events.Message:
-			if _, ok := subscribers[17]; ok {
+			if getDedupeFilter(uuid).duplicate(v.Info.Chat, v.Info.Sender, v.Info.ID) {
+				return
+			}
+			_, subscribed := subscribers[17]
+			if subscribed || offlineBatch != nil {
 				messageSource := utils.EncodeEventTypesMessage(v)
 				messageSourceBytes, err := proto.Marshal(messageSource)
 				if err != nil {
 					panic(err)
 				}
+				if offlineBatch.add(messageSourceBytes) || !subscribed {
+					return
+				}
 				data, size := getBytesAndSize(messageSourceBytes)
 				go C.call_c_func_callback_bytes(event, data, size, C.int(17))
 			}
@@ -432,6 +516,7 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 				go C.call_c_func_callback_bytes(event, data, size, C.int(25))
 			}
 		case *events.OfflineSyncPreview:
+			offlineBatch.start()
 			if _, ok := subscribers[26]; ok {
 				sync := defproto.OfflineSyncPreview{
 					Total:          proto.Int32(int32(v.Total)),
@@ -448,6 +533,7 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 				go C.call_c_func_callback_bytes(event, data, size, C.int(26))
 			}
 		case *events.OfflineSyncCompleted:
+			offlineBatch.finish()
 			if _, ok := subscribers[27]; ok {
 				sync := defproto.OfflineSyncCompleted{
 					Count: proto.Int32(int32(v.Count)),
@@ -701,6 +787,7 @@ func snakechat(db *C.char, id *C.char, JIDByte *C.uchar, JIDSize C.int, logLevel
 
 	// Listen to Ctrl+C (you can also do something else that prevents the program from exiting)
 	C.call_c_func(blocking, false)
+	releaseDedupeFilter(uuid)
 }
 
 //export Disconnect
@@ -708,6 +795,33 @@ func Disconnect(id *C.char) {
 	clients[C.GoString(id)].Disconnect()
 }
 
+//export Connect
+func Connect(id *C.char) *C.char {
+	err := clients[C.GoString(id)].Connect()
+	if err != nil {
+		return C.CString(err.Error())
+	}
+	return C.CString("")
+}
+
+//export SetAutoReconnect
+func SetAutoReconnect(id *C.char, enable C.bool) {
+	clients[C.GoString(id)].EnableAutoReconnect = bool(enable)
+}
+
+//export MemoryInUse
+func MemoryInUse() C.longlong {
+	var stats runtime.MemStats
+	runtime.ReadMemStats(&stats)
+	return C.longlong(stats.HeapSys - stats.HeapReleased)
+}
+
+//export ReleaseMemory
+func ReleaseMemory() C.longlong {
+	debug.FreeOSMemory()
+	return MemoryInUse()
+}
+
 //export DownloadAny
 func DownloadAny(id *C.char, messageProto *C.uchar, size C.int) C.struct_BytesReturn {
 	var message waProto.Message
@@ -817,13 +931,11 @@ func GetUserInfo(id *C.char, JIDSByte *C.uchar, JIDSSize C.int) C.struct_BytesRe
 //
 //export GetGroupInfo
 func GetGroupInfo(id *C.char, JIDByte *C.uchar, JIDSize C.int) C.struct_BytesReturn {
-	var neoJIDProto defproto.JID
-	jidbyte := getByteByAddr(JIDByte, JIDSize)
-	err := proto.Unmarshal(jidbyte, &neoJIDProto)
+	decodeJid, err := utils.DecodeJID(getByteByAddr(JIDByte, JIDSize))
 	if err != nil {
-		panic(err)
+		databuf, _ := proto.Marshal(&defproto.GetGroupInfoReturnFunction{Error: proto.String(err.Error())})
+		return ReturnBytes(databuf)
 	}
-	decodeJid := utils.DecodeJidProto(&neoJIDProto)
 	info, err_info := clients[C.GoString(id)].GetGroupInfo(decodeJid)
 	groupinfo := defproto.GetGroupInfoReturnFunction{}
 	if err_info != nil {
@@ -1069,18 +1181,16 @@ func LinkGroup(id *C.char, parent *C.uchar, parentSize C.int, child *C.uchar, ch
 
 //export SendChatPresence
 func SendChatPresence(id *C.char, JIDByte *C.uchar, JIDSize C.int, state C.int, media C.int) *C.char {
-	jidbyte := getByteByAddr(JIDByte, JIDSize)
-	var snakechat_jid defproto.JID
-	err := proto.Unmarshal(jidbyte, &snakechat_jid)
+	jid, err := utils.DecodeJID(getByteByAddr(JIDByte, JIDSize))
 	if err != nil {
-		panic(err)
+		return C.CString(err.Error())
 	}
 	err_status := clients[C.GoString(id)].SendChatPresence(
-		utils.DecodeJidProto(&snakechat_jid),
+		jid,
 		utils.ChatPresence[int(state)],
 		utils.ChatPresenceMedia[int(media)],
 	)
-	if err != nil {
+	if err_status != nil {
 		return C.CString(err_status.Error())
 	}
 	return C.CString("")
@@ -1088,22 +1198,18 @@ func SendChatPresence(id *C.char, JIDByte *C.uchar, JIDSize C.int, state C.int,
 
 //export BuildRevoke
 func BuildRevoke(id *C.char, ChatByte *C.uchar, ChatSize C.int, SenderByte *C.uchar, SenderSize C.int, messageID *C.char) C.struct_BytesReturn {
-	chatByte := getByteByAddr(ChatByte, ChatSize)
-	senderByte := getByteByAddr(SenderByte, SenderSize)
-	var Chat defproto.JID
-	var Sender defproto.JID
-	err := proto.Unmarshal(chatByte, &Chat)
-
+	// an undecodable JID is answered with no bytes, which Python reports as an error
+	chat, err := utils.DecodeJID(getByteByAddr(ChatByte, ChatSize))
 	if err != nil {
-		panic(err)
+		return ReturnBytes([]byte{})
 	}
-	err_ := proto.Unmarshal(senderByte, &Sender)
+	sender, err_ := utils.DecodeJID(getByteByAddr(SenderByte, SenderSize))
 	if err_ != nil {
-		panic(err_)
+		return ReturnBytes([]byte{})
 	}
 	message := clients[C.GoString(id)].BuildRevoke(
-		utils.DecodeJidProto(&Chat),
-		utils.DecodeJidProto(&Sender),
+		chat,
+		sender,
 		C.GoString(messageID),
 	)
 	messageByte, err_marshal := proto.Marshal(message)
@@ -1273,21 +1379,21 @@ func Logout(id *C.char) *C.char {
 	if err != nil {
 		return C.CString(err.Error())
 	}
+	releaseDedupeFilter(C.GoString(id))
 	return C.CString("")
 }
 
 //export MarkRead
 func MarkRead(id *C.char, ids *C.char, timestamp C.int, chatByte *C.uchar, chatSize C.int, senderByte *C.uchar, senderSize C.int, receiptType *C.char) *C.char {
-	var chatJID, senderJID defproto.JID
-	chat_err := proto.Unmarshal(getByteByAddr(chatByte, chatSize), &chatJID)
+	chatJID, chat_err := utils.DecodeJID(getByteByAddr(chatByte, chatSize))
 	if chat_err != nil {
-		panic(chat_err)
+		return C.CString(chat_err.Error())
 	}
-	sender_err := proto.Unmarshal(getByteByAddr(senderByte, senderSize), &senderJID)
+	senderJID, sender_err := utils.DecodeJID(getByteByAddr(senderByte, senderSize))
 	if sender_err != nil {
-		panic(sender_err)
+		return C.CString(sender_err.Error())
 	}
-	err := clients[C.GoString(id)].MarkRead(strings.Split(C.GoString(ids), " "), time.Unix(int64(timestamp), 0), utils.DecodeJidProto(&chatJID), utils.DecodeJidProto(&senderJID), types.ReceiptType(C.GoString(receiptType)))
+	err := clients[C.GoString(id)].MarkRead(strings.Split(C.GoString(ids), " "), time.Unix(int64(timestamp), 0), chatJID, senderJID, types.ReceiptType(C.GoString(receiptType)))
 	if err != nil {
 		return C.CString(err.Error())
 	}
@@ -1514,12 +1620,11 @@ func SetStatusMessage(id *C.char, msg *C.char) *C.char {
 
 //export SubscribePresence
 func SubscribePresence(id *C.char, JIDByte *C.uchar, JIDSize C.int) *C.char {
-	var JID defproto.JID
-	err := proto.Unmarshal(getByteByAddr(JIDByte, JIDSize), &JID)
+	jid, err := utils.DecodeJID(getByteByAddr(JIDByte, JIDSize))
 	if err != nil {
-		panic(err)
+		return C.CString(err.Error())
 	}
-	err_ := clients[C.GoString(id)].SubscribePresence(utils.DecodeJidProto(&JID))
+	err_ := clients[C.GoString(id)].SubscribePresence(jid)
 	if err_ != nil {
 		return C.CString(err_.Error())
 	}
@@ -1626,19 +1731,19 @@ func GetPrivacySettings(id *C.char) C.struct_BytesReturn {
 
 //export GetProfilePicture
 func GetProfilePicture(id *C.char, JIDByte *C.uchar, JIDSize C.int, paramsByte *C.uchar, paramsSize C.int) C.struct_BytesReturn {
-	var snakechatJID defproto.JID
 	var snakechatParams defproto.GetProfilePictureParams
-	err := proto.Unmarshal(getByteByAddr(JIDByte, JIDSize), &snakechatJID)
+	snakechatJID, err := utils.DecodeJID(getByteByAddr(JIDByte, JIDSize))
 	if err != nil {
-		panic(err)
+		return_buf, _ := proto.Marshal(&defproto.GetProfilePictureReturnFunction{Error: proto.String(err.Error())})
+		return ReturnBytes(return_buf)
 	}
 	err_params := proto.Unmarshal(getByteByAddr(paramsByte, paramsSize), &snakechatParams)
 	if err_params != nil {
 		panic(err_params)
 	}
 	return_ := defproto.GetProfilePictureReturnFunction{}
-	picture, err_pict := clients[C.GoString(id)].GetProfilePictureInfo(utils.DecodeJidProto(&snakechatJID), utils.DecodeGetProfilePictureParams(&snakechatParams))
-	if err_params != nil {
+	picture, err_pict := clients[C.GoString(id)].GetProfilePictureInfo(snakechatJID, utils.DecodeGetProfilePictureParams(&snakechatParams))
+	if err_pict != nil {
 		return_.Error = proto.String(err_pict.Error())
 	}
 	if picture != nil {
@@ -0,0 +1,158 @@
+package main
+
+import (
+	"C"
+)
+import (
+	"encoding/binary"
+	"sync"
+	"time"
+)
+
+// offlineBatchEvent is the event code of a chunk of messages received during an offline sync.
+const offlineBatchEvent = 44
+
+// flag of the first byte of a chunk, set on the chunk sent when the sync completes
+const offlineBatchFinal = 1
+
+const (
+	defaultOfflineBatchSize  = 500
+	defaultOfflineBatchFlush = 250 * time.Millisecond
+	// chunks waiting for delivery before a flush blocks the event handler
+	offlineBatchBacklog = 16
+)
+
+// offlineBatcher collects the messages delivered between OfflineSyncPreview
+// and OfflineSyncCompleted and emits them in chunks: a flags byte followed by
+// uvarint-length-prefixed defproto.Message records. Chunks are delivered one
+// at a time, in the order they were flushed, by a single goroutine per client.
+type offlineBatcher struct {
+	mu         sync.Mutex
+	active     bool
+	maxEvents  int
+	flushEvery time.Duration
+	buf        []byte
+	count      int
+	timer      *time.Timer
+	emit       func(chunk []byte)
+	out        chan func()
+}
+
+var (
+	offlineBatchers   = make(map[string]*offlineBatcher)
+	offlineBatchersMu sync.RWMutex
+)
+
+func getOfflineBatcher(uuid string) *offlineBatcher {
+	offlineBatchersMu.RLock()
+	defer offlineBatchersMu.RUnlock()
+	return offlineBatchers[uuid]
+}
+
+func ensureOfflineBatcher(uuid string, emit func(chunk []byte)) *offlineBatcher {
+	offlineBatchersMu.Lock()
+	defer offlineBatchersMu.Unlock()
+	b, ok := offlineBatchers[uuid]
+	if !ok {
+		b = &offlineBatcher{
+			maxEvents:  defaultOfflineBatchSize,
+			flushEvery: defaultOfflineBatchFlush,
+			out:        make(chan func(), offlineBatchBacklog),
+		}
+		offlineBatchers[uuid] = b
+		go b.deliver()
+	}
+	if emit != nil {
+		b.mu.Lock()
+		b.emit = emit
+		b.mu.Unlock()
+	}
+	return b
+}
+
+func (b *offlineBatcher) deliver() {
+	for send := range b.out {
+		send()
+	}
+}
+
+func (b *offlineBatcher) start() {
+	if b == nil {
+		return
+	}
+	b.mu.Lock()
+	b.active = true
+	b.mu.Unlock()
+}
+
+// add buffers a marshalled message and reports false when no offline sync is running.
+func (b *offlineBatcher) add(message []byte) bool {
+	if b == nil {
+		return false
+	}
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	if !b.active || b.emit == nil {
+		return false
+	}
+	b.buf = binary.AppendUvarint(b.buf, uint64(len(message)))
+	b.buf = append(b.buf, message...)
+	b.count++
+	if b.count >= b.maxEvents {
+		b.flushLocked(false)
+	} else if b.timer == nil {
+		b.timer = time.AfterFunc(b.flushEvery, b.flush)
+	}
+	return true
+}
+
+// finish emits what is left, marked as the final chunk, and ends the offline sync.
+func (b *offlineBatcher) finish() {
+	if b == nil {
+		return
+	}
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	if b.active {
+		b.flushLocked(true)
+	}
+	b.active = false
+}
+
+func (b *offlineBatcher) flush() {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	b.flushLocked(false)
+}
+
+func (b *offlineBatcher) flushLocked(final bool) {
+	if b.timer != nil {
+		b.timer.Stop()
+		b.timer = nil
+	}
+	if b.emit == nil || (b.count == 0 && !final) {
+		return
+	}
+	var flags byte
+	if final {
+		flags |= offlineBatchFinal
+	}
+	chunk := append([]byte{flags}, b.buf...)
+	b.buf = b.buf[:0:0]
+	b.count = 0
+	emit := b.emit
+	b.out <- func() { emit(chunk) }
+}
+
+//export SetOfflineBatch
+func SetOfflineBatch(id *C.char, maxEvents C.int, flushMillis C.int) {
+	b := ensureOfflineBatcher(C.GoString(id), nil)
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	if maxEvents > 0 {
+		b.maxEvents = int(maxEvents)
+	}
+	if flushMillis > 0 {
+		b.flushEvery = time.Duration(flushMillis) * time.Millisecond
+	}
+}
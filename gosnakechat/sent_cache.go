@@ -0,0 +1,148 @@
+package main
+
+import (
+	"C"
+)
+import (
+	"container/list"
+	"encoding/binary"
+	"sync"
+	"time"
+
+	waProto "go.mau.fi/whatsmeow/binary/proto"
+	"go.mau.fi/whatsmeow/types"
+	"google.golang.org/protobuf/proto"
+)
+
+const (
+	defaultSentCacheBytes = 32 << 20
+	defaultSentCacheTTL   = 6 * time.Hour
+)
+
+type sentKey struct {
+	to types.JID
+	id types.MessageID
+}
+
+type sentEntry struct {
+	key     sentKey
+	message *waProto.Message
+	size    int
+	sentAt  time.Time
+}
+
+// sentCache keeps the messages sent by a client so retry receipts are answered
+// from memory. whatsmeow only remembers its last 256 messages and then falls
+// back to Client.GetMessageForRetry, which is served from here. Entries expire
+// after ttl and the oldest are evicted once the marshalled size passes maxBytes.
+type sentCache struct {
+	mu       sync.Mutex
+	ttl      time.Duration
+	maxBytes int
+	size     int
+	entries  map[sentKey]*list.Element
+	order    *list.List
+	hits     uint64
+	misses   uint64
+	evicted  uint64
+}
+
+var (
+	sentCaches   = make(map[string]*sentCache)
+	sentCachesMu sync.RWMutex
+)
+
+func newSentCache(maxBytes int, ttl time.Duration) *sentCache {
+	return &sentCache{
+		ttl:      ttl,
+		maxBytes: maxBytes,
+		entries:  make(map[sentKey]*list.Element),
+		order:    list.New(),
+	}
+}
+
+func getSentCache(uuid string) *sentCache {
+	sentCachesMu.RLock()
+	defer sentCachesMu.RUnlock()
+	return sentCaches[uuid]
+}
+
+func (c *sentCache) put(to types.JID, id types.MessageID, message *waProto.Message) {
+	if c == nil || message == nil {
+		return
+	}
+	key := sentKey{to.ToNonAD(), id}
+	entry := &sentEntry{key, message, proto.Size(message), time.Now()}
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if c.maxBytes <= 0 || entry.size > c.maxBytes {
+		return
+	}
+	if element, ok := c.entries[key]; ok {
+		c.removeLocked(element)
+	}
+	c.entries[key] = c.order.PushBack(entry)
+	c.size += entry.size
+	for c.size > c.maxBytes {
+		c.removeLocked(c.order.Front())
+		c.evicted++
+	}
+}
+
+func (c *sentCache) get(to types.JID, id types.MessageID) *waProto.Message {
+	if c == nil {
+		return nil
+	}
+	key := sentKey{to.ToNonAD(), id}
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.expireLocked(time.Now())
+	element, ok := c.entries[key]
+	if !ok {
+		c.misses++
+		return nil
+	}
+	c.hits++
+	return element.Value.(*sentEntry).message
+}
+
+func (c *sentCache) expireLocked(now time.Time) {
+	for front := c.order.Front(); front != nil; front = c.order.Front() {
+		if now.Sub(front.Value.(*sentEntry).sentAt) < c.ttl {
+			return
+		}
+		c.removeLocked(front)
+		c.evicted++
+	}
+}
+
+func (c *sentCache) removeLocked(element *list.Element) {
+	entry := c.order.Remove(element).(*sentEntry)
+	delete(c.entries, entry.key)
+	c.size -= entry.size
+}
+
+//export SetSentMessageCache
+func SetSentMessageCache(id *C.char, maxBytes C.longlong, ttlSeconds C.longlong) {
+	sentCachesMu.Lock()
+	defer sentCachesMu.Unlock()
+	sentCaches[C.GoString(id)] = newSentCache(int(maxBytes), time.Duration(ttlSeconds)*time.Second)
+}
+
+// GetSentMessageCacheStats returns hits, misses, evicted, held entries and held
+// bytes as five little-endian uint64.
+//
+//export GetSentMessageCacheStats
+func GetSentMessageCacheStats(id *C.char) C.struct_BytesReturn {
+	stats := make([]byte, 40)
+	if c := getSentCache(C.GoString(id)); c != nil {
+		c.mu.Lock()
+		binary.LittleEndian.PutUint64(stats[0:], c.hits)
+		binary.LittleEndian.PutUint64(stats[8:], c.misses)
+		binary.LittleEndian.PutUint64(stats[16:], c.evicted)
+		binary.LittleEndian.PutUint64(stats[24:], uint64(len(c.entries)))
+		binary.LittleEndian.PutUint64(stats[32:], uint64(c.size))
+		c.mu.Unlock()
+	}
+	return ReturnBytes(stats)
+}
@@ -9,8 +9,23 @@ import (
 	waVname "go.mau.fi/whatsmeow/proto/waVnameCert"
 	"go.mau.fi/whatsmeow/store"
 	"go.mau.fi/whatsmeow/types"
+	"google.golang.org/protobuf/proto"
 )
 
+// DecodeJID reads a JID sent from Python. A leading zero byte marks the
+// user.agent:device@server string form, which is parsed without a protobuf
+// round-trip; anything else is a serialized defproto.JID.
+func DecodeJID(data []byte) (types.JID, error) {
+	if len(data) > 0 && data[0] == 0 {
+		return types.ParseJID(string(data[1:]))
+	}
+	var jid defproto.JID
+	if err := proto.Unmarshal(data, &jid); err != nil {
+		return types.JID{}, err
+	}
+	return DecodeJidProto(&jid), nil
+}
+
 func DecodeJidProto(data *defproto.JID) types.JID {
 	return types.JID{
 		User:       *data.User,
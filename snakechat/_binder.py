@@ -119,8 +119,11 @@ if not os.environ.get("SPHINX"):
         ctypes.c_int,
         ctypes.c_char_p,
         ctypes.c_int,
+        ctypes.c_char_p,
     ]
     gocode.SendMessage.restype = Bytes
+    gocode.SendPeerMessage.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    gocode.SendPeerMessage.restype = Bytes
     gocode.SendChatPresence.argtypes = [
         ctypes.c_char_p,
         ctypes.c_char_p,
@@ -313,6 +316,13 @@ if not os.environ.get("SPHINX"):
     ]
     gocode.NewsletterToggleMute.restype = ctypes.c_char_p
     gocode.Disconnect.argtypes = [ctypes.c_char_p]
+    gocode.Connect.argtypes = [ctypes.c_char_p]
+    gocode.Connect.restype = ctypes.c_char_p
+    gocode.SetAutoReconnect.argtypes = [ctypes.c_char_p, ctypes.c_bool]
+    gocode.MemoryInUse.argtypes = []
+    gocode.MemoryInUse.restype = ctypes.c_longlong
+    gocode.ReleaseMemory.argtypes = []
+    gocode.ReleaseMemory.restype = ctypes.c_longlong
     gocode.ResolveContactQRLink.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
     gocode.ResolveContactQRLink.restype = Bytes
     gocode.ResolveBusinessMessageLink.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
@@ -418,7 +428,7 @@ if not os.environ.get("SPHINX"):
         ctypes.c_char_p,
         ctypes.c_char_p,
     ]
-    gocode.PutPushName.restype = ctypes.c_char_p
+    gocode.PutContactName.restype = ctypes.c_char_p
     gocode.PutAllContactNames.argtypes = [
         ctypes.c_char_p,
         ctypes.c_char_p,
@@ -429,6 +439,8 @@ if not os.environ.get("SPHINX"):
     gocode.GetContact.restype = Bytes
     gocode.GetAllContacts.argtypes = [ctypes.c_char_p]
     gocode.GetAllContacts.restype = Bytes
+    gocode.GetContacts.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+    gocode.GetContacts.restype = Bytes
     gocode.PutMutedUntil.argtypes = [
         ctypes.c_char_p,
         ctypes.c_char_p,
@@ -452,6 +464,34 @@ if not os.environ.get("SPHINX"):
     gocode.PutArchived.restype = ctypes.c_char_p
     gocode.GetChatSettings.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
     gocode.GetChatSettings.restype = Bytes
+    gocode.PutChatSettingsMany.argtypes = [
+        ctypes.c_char_p,
+        ctypes.c_char_p,
+        ctypes.c_int,
+    ]
+    gocode.PutChatSettingsMany.restype = ctypes.c_char_p
+    gocode.GetChatSettingsMany.argtypes = [
+        ctypes.c_char_p,
+        ctypes.c_char_p,
+        ctypes.c_int,
+    ]
+    gocode.GetChatSettingsMany.restype = Bytes
+    gocode.SetInboundDedupe.argtypes = [
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_longlong,
+    ]
+    gocode.GetInboundDedupeStats.argtypes = [ctypes.c_char_p]
+    gocode.GetInboundDedupeStats.restype = Bytes
+    gocode.SetOfflineBatch.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int]
+    gocode.SetHistorySyncChunkSize.argtypes = [ctypes.c_char_p, ctypes.c_int]
+    gocode.SetSentMessageCache.argtypes = [
+        ctypes.c_char_p,
+        ctypes.c_longlong,
+        ctypes.c_longlong,
+    ]
+    gocode.GetSentMessageCacheStats.argtypes = [ctypes.c_char_p]
+    gocode.GetSentMessageCacheStats.restype = Bytes
     gocode.GetAllDevices.argtypes = [ctypes.c_char_p]
     gocode.GetAllDevices.restype = ctypes.c_char_p
 else:
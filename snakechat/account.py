@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Iterable, Optional, Set
+
+from google.protobuf.internal.containers import RepeatedCompositeFieldContainer
+
+from .events import BlocklistChangeEv, BlocklistEv, ConnectedEv, PrivacySettingsEv
+from .proto.snakechat_pb2 import (
+    JID,
+    Blocklist,
+    BlocklistChange,
+    Device,
+    PrivacySettings,
+    StatusPrivacy,
+)
+from .utils import log
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+
+def _key(jid: JID) -> str:
+    return f"{jid.User}@{jid.Server}"
+
+
+class AccountState:
+    def __init__(self, client: NewClient) -> None:
+        """
+        In-memory snapshot of the account: own device, privacy settings, status privacy and
+        blocklist. Each part is fetched on first use and kept current from
+        ``PrivacySettingsEv``, ``BlocklistEv`` and ``BlocklistChangeEv``. A reconnect only drops
+        the parts whose change events may have been missed while offline, so the next read
+        fetches them again; set ``refresh_on_connect`` to fetch everything in the background
+        on every ``ConnectedEv`` instead.
+
+        :param client: The client whose account is tracked.
+        :type client: NewClient
+        """
+        self.client = client
+        self.refresh_on_connect = False
+        self.me: Optional[Device] = None
+        self.privacy: Optional[PrivacySettings] = None
+        self.status_privacy: Optional[RepeatedCompositeFieldContainer[StatusPrivacy]] = (
+            None
+        )
+        self.blocklist: Optional[Blocklist] = None
+        self._blocked: Set[str] = set()
+        self._lock = threading.RLock()
+        self._connected_once = False
+        client.event.add_listener(ConnectedEv, self._on_connected)
+        client.event.add_listener(PrivacySettingsEv, self._on_privacy_settings)
+        client.event.add_listener(BlocklistEv, self._on_blocklist)
+        client.event.add_listener(BlocklistChangeEv, self._on_blocklist_change)
+
+    @property
+    def own_jid(self) -> JID:
+        """The JID of this account, read through FFI only until it is known."""
+        me = self.me
+        if me is None:
+            me = self.client.get_me(refresh=True)
+        return me.JID
+
+    def is_blocked(self, jid: JID) -> bool:
+        """
+        Tells whether a user is on the blocklist. The blocklist is fetched once if it is not
+        known yet, every later check is a set lookup.
+
+        :param jid: The user.
+        :type jid: JID
+        :return: True if the user is blocked.
+        :rtype: bool
+        """
+        if self.blocklist is None:
+            self.client.get_blocklist(refresh=True)
+        return _key(jid) in self._blocked
+
+    def refresh(self):
+        """Fetches the whole snapshot again."""
+        self.client.get_me(refresh=True)
+        self.client.get_privacy_settings(refresh=True)
+        self.client.get_status_privacy(refresh=True)
+        self.client.get_blocklist(refresh=True)
+
+    def set_blocklist(self, blocklist: Blocklist):
+        with self._lock:
+            self.blocklist = blocklist
+            self._blocked = {_key(jid) for jid in blocklist.JIDs}
+
+    def apply_changes(self, changes: Iterable[BlocklistChange], dhash: str = ""):
+        with self._lock:
+            if self.blocklist is None:
+                return
+            for change in changes:
+                key = _key(change.JID)
+                if change.BlockAction == BlocklistChange.BLOCK:
+                    if key not in self._blocked:
+                        self._blocked.add(key)
+                        self.blocklist.JIDs.append(change.JID)
+                elif key in self._blocked:
+                    self._blocked.discard(key)
+                    jids = [j for j in self.blocklist.JIDs if _key(j) != key]
+                    del self.blocklist.JIDs[:]
+                    self.blocklist.JIDs.extend(jids)
+            if dhash:
+                self.blocklist.DHash = dhash
+
+    def _refresh_safe(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            log.warning("Refreshing the account state failed: %s", e)
+
+    def _on_connected(self, client: NewClient, _: ConnectedEv):
+        self.me = None
+        if self.refresh_on_connect:
+            threading.Thread(target=self._refresh_safe, daemon=True).start()
+        elif self._connected_once:
+            # events sent while the session was offline may be lost, read these lazily again
+            with self._lock:
+                self.privacy = None
+                self.status_privacy = None
+                self.blocklist = None
+                self._blocked = set()
+        self._connected_once = True
+
+    def _on_privacy_settings(self, client: NewClient, event: PrivacySettingsEv):
+        self.privacy = event.NewSettings
+
+    def _on_blocklist(self, client: NewClient, event: BlocklistEv):
+        with self._lock:
+            in_sync = (
+                self.blocklist is not None
+                and event.Action == BlocklistEv.MODIFY
+                and event.PrevDHash == self.blocklist.DHash
+            )
+            if in_sync:
+                self.apply_changes(event.Changes, event.DHASH)
+                return
+            self.blocklist = None
+        # a full list or a delta against a version we never saw, fetch the list again
+        threading.Thread(
+            target=self._fetch_blocklist, daemon=True, name="snakechat-blocklist"
+        ).start()
+
+    def _fetch_blocklist(self):
+        try:
+            self.client.get_blocklist(refresh=True)
+        except Exception as e:
+            log.warning("Fetching the blocklist failed: %s", e)
+
+    def _on_blocklist_change(self, client: NewClient, change: BlocklistChangeEv):
+        self.apply_changes([change])
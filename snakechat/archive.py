@@ -0,0 +1,461 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Tuple
+
+from .events import HistorySyncChunk, MessageEv
+from .proto.snakechat_pb2 import JID, MessageInfo
+from .proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from .proto.waHistorySync.WAWebProtobufsHistorySync_pb2 import HistorySync
+from .proto.waWeb.WAWebProtobufsWeb_pb2 import WebMessageInfo
+from .utils import log
+from .utils.jid import JIDValue
+from .utils.message import extract_text
+
+if TYPE_CHECKING:
+    from .backfill import HistoryBackfill
+    from .client import NewClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    chat TEXT NOT NULL,
+    id TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    from_me INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    text TEXT NOT NULL,
+    push_name TEXT NOT NULL,
+    message BLOB NOT NULL,
+    UNIQUE (chat, id)
+);
+CREATE INDEX IF NOT EXISTS messages_chat_time ON messages (chat, timestamp, rowid);
+CREATE INDEX IF NOT EXISTS messages_sender_time ON messages (sender, timestamp, rowid);
+CREATE INDEX IF NOT EXISTS messages_id ON messages (id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, content='messages', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages
+WHEN new.text != '' BEGIN
+    INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages
+WHEN old.text != '' BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+"""
+
+COLUMNS = "m.rowid, chat, id, sender, timestamp, from_me, type, m.text, push_name, message"
+
+# chat, id, sender, timestamp, from_me, type, text, push_name, message
+Row = Tuple[str, str, str, int, int, str, str, str, bytes]
+# rows queued together and the callback told how many of them were new
+Write = Tuple[List[Row], Optional[Callable[[int], None]]]
+
+
+def _jid_key(jid: JID) -> str:
+    return f"{jid.User}@{jid.Server}"
+
+
+def _string_key(jid: str) -> str:
+    return JIDValue.parse(jid).key if jid else ""
+
+
+def _message_type(message: Message) -> str:
+    fields = message.ListFields()
+    return fields[0][0].name if fields else ""
+
+
+@dataclass
+class ArchivedMessage:
+    rowid: int
+    chat: str
+    id: str
+    sender: str
+    timestamp: int
+    from_me: bool
+    type: str
+    text: str
+    push_name: str
+    raw: bytes
+
+    @property
+    def message(self) -> Message:
+        return Message.FromString(self.raw)
+
+
+@dataclass
+class ArchivePage:
+    messages: List[ArchivedMessage]
+    # pass it back to get the next page, None on the last page
+    cursor: Optional[str]
+
+
+class MessageArchive:
+    def __init__(
+        self,
+        client: NewClient,
+        path: str = "archive.db",
+        batch_size: int = 1000,
+        flush_interval: float = 0.5,
+        history: bool = True,
+    ) -> None:
+        """
+        Local SQLite archive of the messages of a client, with indexes on (chat, timestamp),
+        sender and message ID and an FTS5 index of the text. Live messages, offline-sync batches
+        and history syncs are queued from the event path and written by one thread in batched
+        transactions. Messages already archived are ignored. Create it before the client
+        connects.
+
+        :param client: The client whose messages are archived.
+        :type client: NewClient
+        :param path: Path of the SQLite database, defaults to "archive.db"
+        :type path: str, optional
+        :param batch_size: Maximum messages per transaction, defaults to 1000
+        :type batch_size: int, optional
+        :param flush_interval: Time a write waits for others to join its transaction, defaults to 0.5
+        :type flush_interval: float, optional
+        :param history: Archive history syncs, received through :meth:`Event.history_sync_chunk`, defaults to True
+        :type history: bool, optional
+        """
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.history = history
+        self.backfill: Optional[HistoryBackfill] = None
+        self.written = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            try:
+                self._db.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                log.warning("FTS5 is not available, search falls back to LIKE: %s", e)
+                self.fts = False
+        self._writes: queue.Queue[Optional[Write]] = queue.Queue()
+        self._pending = 0
+        self._committed = threading.Condition()
+        self._writer = threading.Thread(
+            target=self._write_loop, daemon=True, name="snakechat-archive"
+        )
+        self._writer.start()
+        client.event.add_listener(MessageEv, self._on_message)
+        if history:
+            client.event.history_listeners.append(self._on_history_chunk)
+
+    def add(self, info: MessageInfo, message: Message):
+        """Archives a message received or sent by the client."""
+        source = info.MessageSource
+        self._queue(
+            [
+                (
+                    _jid_key(source.Chat),
+                    info.ID,
+                    _jid_key(source.Sender),
+                    info.Timestamp,
+                    int(source.IsFromMe),
+                    _message_type(message),
+                    extract_text(message),
+                    info.Pushname,
+                    message.SerializeToString(),
+                )
+            ]
+        )
+
+    def add_web_messages(
+        self,
+        chat: str,
+        messages: Iterable[WebMessageInfo],
+        on_added: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Archives messages in the format of history syncs.
+
+        :param chat: The chat JID as a string.
+        :type chat: str
+        :param messages: The messages of the chat.
+        :type messages: Iterable[WebMessageInfo]
+        :param on_added: Called from the writer thread with the number of messages that were not archived yet, before :meth:`flush` returns, defaults to None
+        :type on_added: Optional[Callable[[int], None]], optional
+        """
+        chat_key = _string_key(chat)
+        rows = []
+        for info in messages:
+            key = info.key
+            if not key.ID or not info.HasField("message"):
+                continue
+            if key.fromMe:
+                sender = _jid_key(self.client.account.own_jid)
+            else:
+                sender = _string_key(key.participant or info.participant or chat)
+            rows.append(
+                (
+                    chat_key,
+                    key.ID,
+                    sender,
+                    info.messageTimestamp * 1000,
+                    int(key.fromMe),
+                    _message_type(info.message),
+                    extract_text(info.message),
+                    info.pushName,
+                    info.message.SerializeToString(),
+                )
+            )
+        self._queue(rows, on_added)
+
+    def add_history(self, data: HistorySync):
+        for conversation in data.conversations:
+            self.add_web_messages(
+                conversation.ID, (msg.message for msg in conversation.messages)
+            )
+
+    def has(self, chat: JID, message_id: str) -> bool:
+        with self._db_lock:
+            return (
+                self._db.execute(
+                    "SELECT 1 FROM messages WHERE chat = ? AND id = ?",
+                    (_jid_key(chat), message_id),
+                ).fetchone()
+                is not None
+            )
+
+    def get(self, chat: JID, message_id: str) -> Optional[ArchivedMessage]:
+        rows = self._select(
+            f"SELECT {COLUMNS} FROM messages m WHERE chat = ? AND id = ?",
+            (_jid_key(chat), message_id),
+        )
+        return rows[0] if rows else None
+
+    def recent(
+        self, chat: JID, limit: int = 50, cursor: Optional[str] = None
+    ) -> ArchivePage:
+        """
+        Returns the messages of a chat, newest first.
+
+        :param chat: The chat.
+        :type chat: JID
+        :param limit: Messages per page, defaults to 50
+        :type limit: int, optional
+        :param cursor: The cursor of the previous page, defaults to None
+        :type cursor: Optional[str], optional
+        :return: A page of messages.
+        :rtype: ArchivePage
+        """
+        return self.between(chat, limit=limit, cursor=cursor)
+
+    def between(
+        self,
+        chat: JID,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> ArchivePage:
+        """
+        Returns the messages of a chat sent in [start, end), newest first.
+
+        :param chat: The chat.
+        :type chat: JID
+        :param start: Lower bound, in milliseconds since the epoch, defaults to None
+        :type start: Optional[int], optional
+        :param end: Upper bound, in milliseconds since the epoch, defaults to None
+        :type end: Optional[int], optional
+        :param limit: Messages per page, defaults to 50
+        :type limit: int, optional
+        :param cursor: The cursor of the previous page, defaults to None
+        :type cursor: Optional[str], optional
+        :return: A page of messages.
+        :rtype: ArchivePage
+        """
+        where, params = ["chat = ?"], [_jid_key(chat)]
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("timestamp < ?")
+            params.append(end)
+        return self._page(f"SELECT {COLUMNS} FROM messages m", where, params, limit, cursor)
+
+    def from_sender(
+        self, sender: JID, limit: int = 50, cursor: Optional[str] = None
+    ) -> ArchivePage:
+        return self._page(
+            f"SELECT {COLUMNS} FROM messages m",
+            ["sender = ?"],
+            [_jid_key(sender)],
+            limit,
+            cursor,
+        )
+
+    def search(
+        self,
+        query: str,
+        chat: Optional[JID] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> ArchivePage:
+        """
+        Full-text search over the message texts, newest first.
+
+        :param query: An FTS5 query, e.g. ``invoice NOT paid`` or ``"exact phrase"``.
+        :type query: str
+        :param chat: Only search this chat, defaults to None
+        :type chat: Optional[JID], optional
+        :param limit: Messages per page, defaults to 50
+        :type limit: int, optional
+        :param cursor: The cursor of the previous page, defaults to None
+        :type cursor: Optional[str], optional
+        :return: A page of messages.
+        :rtype: ArchivePage
+        """
+        if self.fts:
+            base = f"SELECT {COLUMNS} FROM messages_fts f JOIN messages m ON m.rowid = f.rowid"
+            where, params = ["messages_fts MATCH ?"], [query]
+        else:
+            base = f"SELECT {COLUMNS} FROM messages m"
+            where, params = ["m.text LIKE ?"], [f"%{query}%"]
+        if chat is not None:
+            where.append("chat = ?")
+            params.append(_jid_key(chat))
+        return self._page(base, where, params, limit, cursor)
+
+    def count(self, chat: Optional[JID] = None) -> int:
+        with self._db_lock:
+            if chat is None:
+                return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            return self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE chat = ?", (_jid_key(chat),)
+            ).fetchone()[0]
+
+    def chats(self) -> List[str]:
+        """Returns the archived chats, the one with the oldest message first."""
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT chat FROM messages GROUP BY chat ORDER BY MIN(timestamp)"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def oldest(self, chat: JID) -> Optional[ArchivedMessage]:
+        rows = self._select(
+            f"SELECT {COLUMNS} FROM messages m WHERE chat = ? "
+            "ORDER BY timestamp, m.rowid LIMIT 1",
+            (_jid_key(chat),),
+        )
+        return rows[0] if rows else None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued message is written."""
+        with self._committed:
+            return self._committed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        self._writes.put(None)
+        self._writer.join()
+        with self._db_lock:
+            self._db.close()
+
+    def _queue(self, rows: List[Row], on_added: Optional[Callable[[int], None]] = None):
+        if not rows:
+            if on_added is not None:
+                on_added(0)
+            return
+        with self._committed:
+            self._pending += len(rows)
+        self._writes.put((rows, on_added))
+
+    def _page(
+        self,
+        base: str,
+        where: List[str],
+        params: list,
+        limit: int,
+        cursor: Optional[str],
+    ) -> ArchivePage:
+        if cursor:
+            timestamp, rowid = cursor.split(":")
+            where.append("(timestamp, m.rowid) < (?, ?)")
+            params.extend((int(timestamp), int(rowid)))
+        rows = self._select(
+            f"{base} WHERE {' AND '.join(where)} "
+            "ORDER BY timestamp DESC, m.rowid DESC LIMIT ?",
+            (*params, limit + 1),
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1].timestamp}:{rows[-1].rowid}"
+        return ArchivePage(rows, next_cursor)
+
+    def _select(self, sql: str, params: tuple) -> List[ArchivedMessage]:
+        with self._db_lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            ArchivedMessage(r[0], r[1], r[2], r[3], r[4], bool(r[5]), *r[6:])
+            for r in rows
+        ]
+
+    def _commit(self, writes: List[Write]) -> List[int]:
+        # one statement per write in a single transaction, so the rows each write added are known
+        with self._db_lock:
+            with self._db:
+                return [
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO messages (chat, id, sender, timestamp, "
+                        "from_me, type, text, push_name, message) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    ).rowcount
+                    for rows, _ in writes
+                ]
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            writes = [] if item is None else [item]
+            count = 0 if item is None else len(item[0])
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None and count < self.batch_size:
+                try:
+                    item = self._writes.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is not None:
+                    writes.append(item)
+                    count += len(item[0])
+            if writes:
+                try:
+                    added = self._commit(writes)
+                    self.written += count
+                except Exception as e:
+                    log.exception("Archiving %d messages failed: %s", count, e)
+                    added = [0] * len(writes)
+                for (_, on_added), n in zip(writes, added):
+                    if on_added is not None:
+                        on_added(n)
+            with self._committed:
+                self._pending -= count
+                self._committed.notify_all()
+            if item is None:
+                return
+
+    def _on_message(self, client: NewClient, message: MessageEv):
+        self.add(message.Info, message.Message)
+
+    def _on_history_chunk(self, client: NewClient, chunk: HistorySyncChunk):
+        if self.backfill is not None and chunk.data.syncType == HistorySync.ON_DEMAND:
+            # the backfill archives on-demand syncs itself, to count what each page adds
+            return
+        self.add_history(chunk.data)
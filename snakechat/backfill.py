@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Tuple
+
+from .archive import MessageArchive, _jid_key
+from .builder import build_history_sync_request
+from .events import HistorySyncChunk
+from .proto.snakechat_pb2 import MessageInfo, MessageSource
+from .proto.waHistorySync.WAWebProtobufsHistorySync_pb2 import (
+    Conversation,
+    HistorySync,
+)
+from .ratelimit import TokenBucket, is_rate_limited
+from .utils import log
+from .utils.jid import JIDLike, JIDValue, as_jid
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backfill (
+    chat TEXT PRIMARY KEY,
+    oldest_id TEXT NOT NULL,
+    oldest_timestamp INTEGER NOT NULL,
+    oldest_from_me INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    received INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def _chat_key(chat: JIDLike) -> str:
+    jid = as_jid(chat)
+    return jid.key if isinstance(jid, JIDValue) else _jid_key(jid)
+
+
+@dataclass
+class BackfillCursor:
+    chat: str
+    # the oldest message known in the chat, the next page is requested before it
+    oldest_id: str
+    oldest_timestamp: int
+    oldest_from_me: bool
+    pages: int = 0
+    received: int = 0
+    added: int = 0
+    done: bool = False
+
+
+@dataclass
+class BackfillProgress:
+    chats: int
+    chats_done: int
+    pages: int
+    received: int
+    added: int
+    failed_pages: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        """Messages added to the archive per second."""
+        return self.added / self.elapsed if self.elapsed else 0.0
+
+
+class _PendingPage:
+    __slots__ = ("received", "added", "oldest", "end", "touched", "answered")
+
+    def __init__(self) -> None:
+        self.received = 0
+        # messages of the page the archive did not have, counted by the archive's writer
+        self.added = 0
+        self.oldest: Optional[Tuple[int, str, bool]] = None
+        self.end = False
+        self.touched = False
+        self.answered = threading.Event()
+
+    def count_added(self, added: int):
+        self.added += added
+
+
+class HistoryBackfill:
+    def __init__(
+        self,
+        client: NewClient,
+        archive: MessageArchive,
+        path: Optional[str] = None,
+        page_size: int = 50,
+        concurrency: int = 2,
+        rate: float = 0.2,
+        page_timeout: float = 60.0,
+        max_attempts: int = 3,
+    ) -> None:
+        """
+        Fetches the older history of chats from the phone with on-demand history sync
+        requests. Each chat is walked backwards in pages of ``page_size`` messages, starting
+        from its oldest archived message, until the phone has nothing older. Requests run for
+        a few chats at once under a rate limit, answers are written to ``archive`` (which
+        ignores messages it already has), and the position of every chat is committed after
+        each page so an interrupted run picks up where it stopped. On-demand history syncs are
+        archived by the backfill instead of the archive's own history handler.
+        Create it before the client connects, the answers arrive as history syncs.
+
+        :param client: The client used for the requests.
+        :type client: NewClient
+        :param archive: The archive the chats are read from and written to.
+        :type archive: MessageArchive
+        :param path: Path of the SQLite database of the cursors, defaults to the archive database
+        :type path: Optional[str], optional
+        :param page_size: Messages requested per page, defaults to 50
+        :type page_size: int, optional
+        :param concurrency: Chats walked at once, defaults to 2
+        :type concurrency: int, optional
+        :param rate: Requests per second, defaults to 0.2
+        :type rate: float, optional
+        :param page_timeout: Time to wait for the answer to a request, defaults to 60.0
+        :type page_timeout: float, optional
+        :param max_attempts: Attempts per page before the chat is left for a later run, defaults to 3
+        :type max_attempts: int, optional
+        """
+        self.client = client
+        self.archive = archive
+        self.path = path or archive.path
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.rate = rate
+        self.page_timeout = page_timeout
+        self.max_attempts = max_attempts
+        self.last_progress: Optional[BackfillProgress] = None
+        self._stopped = threading.Event()
+        self._bucket = TokenBucket(rate, 1.0, time.monotonic())
+        self._bucket_lock = threading.Lock()
+        self._pending: Dict[str, _PendingPage] = {}
+        self._pending_lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        client.event.history_listeners.append(self._on_history_chunk)
+        archive.backfill = self
+
+    def run(
+        self,
+        chats: Optional[Iterable[JIDLike]] = None,
+        max_pages: Optional[int] = None,
+        on_progress: Optional[Callable[[BackfillProgress], None]] = None,
+    ) -> BackfillProgress:
+        """
+        Walks the history of ``chats`` until every chat is complete, :meth:`stop` is called or
+        ``max_pages`` pages were fetched per chat.
+
+        :param chats: The chats to backfill, defaults to every archived chat, the one with the oldest message first
+        :type chats: Optional[Iterable[JIDLike]], optional
+        :param max_pages: Pages fetched per chat in this run, defaults to None
+        :type max_pages: Optional[int], optional
+        :param on_progress: Called after every page, defaults to None
+        :type on_progress: Optional[Callable[[BackfillProgress], None]], optional
+        :return: The progress of the run.
+        :rtype: BackfillProgress
+        """
+        start = time.monotonic()
+        self._stopped.clear()
+        self.archive.flush()
+        if chats is None:
+            keys = self.archive.chats()
+        else:
+            keys = list(dict.fromkeys(_chat_key(chat) for chat in chats))
+        progress = BackfillProgress(len(keys), 0, 0, 0, 0, 0, 0.0)
+        progress_lock = threading.Lock()
+
+        def report(pages: int, received: int, added: int, failed: bool, done: bool):
+            with progress_lock:
+                progress.pages += pages
+                progress.received += received
+                progress.added += added
+                progress.failed_pages += failed
+                progress.chats_done += done
+                progress.elapsed = time.monotonic() - start
+            if on_progress:
+                on_progress(progress)
+
+        def walk(chat: str):
+            cursor = self.cursor(chat) or self._start_cursor(chat)
+            if cursor is None:
+                log.debug("Nothing archived in %s to backfill from", chat)
+                report(0, 0, 0, False, False)
+                return
+            if cursor.done:
+                report(0, 0, 0, False, True)
+                return
+            pages = 0
+            while not self._stopped.is_set() and (max_pages is None or pages < max_pages):
+                page = self._fetch_page(cursor)
+                pages += 1
+                if page is None:
+                    report(1, 0, 0, True, False)
+                    return
+                added = self._advance(cursor, page)
+                report(1, page.received, added, False, cursor.done)
+                if cursor.done:
+                    return
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            list(executor.map(walk, keys))
+        progress.elapsed = time.monotonic() - start
+        self.last_progress = progress
+        log.debug(
+            "📜 Backfilled %d messages in %d pages over %d chats in %.1fs (%.0f/s)",
+            progress.added,
+            progress.pages,
+            progress.chats,
+            progress.elapsed,
+            progress.throughput,
+        )
+        return progress
+
+    def stop(self):
+        """Makes :meth:`run` return once the pages in flight are answered."""
+        self._stopped.set()
+
+    def cursor(self, chat: JIDLike) -> Optional[BackfillCursor]:
+        """
+        Returns the recorded position of a chat.
+
+        :param chat: The chat.
+        :type chat: JIDLike
+        :return: The cursor, None if the chat was never backfilled.
+        :rtype: Optional[BackfillCursor]
+        """
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT chat, oldest_id, oldest_timestamp, oldest_from_me, pages, "
+                "received, added, done FROM backfill WHERE chat = ?",
+                (_chat_key(chat),),
+            ).fetchone()
+        if row is None:
+            return None
+        return BackfillCursor(
+            row[0], row[1], row[2], bool(row[3]), row[4], row[5], row[6], bool(row[7])
+        )
+
+    def reset(self, chat: Optional[JIDLike] = None):
+        """Forgets the position of a chat, or of every chat, so it is walked again."""
+        with self._db_lock:
+            with self._db:
+                if chat is None:
+                    self._db.execute("DELETE FROM backfill")
+                else:
+                    self._db.execute(
+                        "DELETE FROM backfill WHERE chat = ?", (_chat_key(chat),)
+                    )
+
+    def _start_cursor(self, chat: str) -> Optional[BackfillCursor]:
+        oldest = self.archive.oldest(JIDValue.parse(chat).proto)
+        if oldest is None:
+            return None
+        return BackfillCursor(chat, oldest.id, oldest.timestamp, oldest.from_me)
+
+    def _save(self, cursor: BackfillCursor):
+        with self._db_lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO backfill (chat, oldest_id, oldest_timestamp, "
+                    "oldest_from_me, pages, received, added, done, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        cursor.chat,
+                        cursor.oldest_id,
+                        cursor.oldest_timestamp,
+                        int(cursor.oldest_from_me),
+                        cursor.pages,
+                        cursor.received,
+                        cursor.added,
+                        int(cursor.done),
+                        time.time(),
+                    ),
+                )
+
+    def _throttle(self):
+        while True:
+            with self._bucket_lock:
+                wait = self._bucket.wait_time(time.monotonic())
+                if wait <= 0:
+                    self._bucket.tokens -= 1
+                    return
+            time.sleep(wait)
+
+    def _fetch_page(self, cursor: BackfillCursor) -> Optional[_PendingPage]:
+        info = MessageInfo(
+            MessageSource=MessageSource(
+                Chat=JIDValue.parse(cursor.chat).proto,
+                IsFromMe=cursor.oldest_from_me,
+            ),
+            ID=cursor.oldest_id,
+            Timestamp=cursor.oldest_timestamp,
+        )
+        request = build_history_sync_request(info, self.page_size)
+        for attempt in range(1, self.max_attempts + 1):
+            page = _PendingPage()
+            with self._pending_lock:
+                self._pending[cursor.chat] = page
+            try:
+                self._throttle()
+                self.client.send_peer_message(request)
+                if page.answered.wait(self.page_timeout):
+                    return page
+                log.warning(
+                    "No history for %s within %.0fs (attempt %d)",
+                    cursor.chat,
+                    self.page_timeout,
+                    attempt,
+                )
+            except Exception as e:
+                log.warning(
+                    "Requesting history for %s failed (attempt %d): %s",
+                    cursor.chat,
+                    attempt,
+                    e,
+                )
+                if attempt < self.max_attempts:
+                    delay = min(60.0, 2.0**attempt)
+                    if is_rate_limited(str(e)):
+                        delay *= 4
+                    time.sleep(delay)
+            finally:
+                with self._pending_lock:
+                    if self._pending.get(cursor.chat) is page:
+                        del self._pending[cursor.chat]
+        return None
+
+    def _advance(self, cursor: BackfillCursor, page: _PendingPage) -> int:
+        # once flushed, the archive reported the rows the page's inserts added
+        self.archive.flush()
+        cursor.pages += 1
+        cursor.received += page.received
+        cursor.added += page.added
+        # an answer without anything older than the cursor ends the chat
+        if page.oldest is None or page.oldest[:2] >= (
+            cursor.oldest_timestamp,
+            cursor.oldest_id,
+        ):
+            cursor.done = True
+        else:
+            cursor.oldest_timestamp, cursor.oldest_id, cursor.oldest_from_me = page.oldest
+            cursor.done = page.end
+        self._save(cursor)
+        return page.added
+
+    def _on_history_chunk(self, client: NewClient, chunk: HistorySyncChunk):
+        if chunk.data.syncType != HistorySync.ON_DEMAND:
+            return
+        with self._pending_lock:
+            pending = dict(self._pending)
+        for conversation in chunk.data.conversations:
+            page = pending.get(JIDValue.parse(conversation.ID).key)
+            messages = [msg.message for msg in conversation.messages]
+            if page is None:
+                # an on-demand sync requested by someone else, archived as usual
+                if self.archive.history:
+                    self.archive.add_web_messages(conversation.ID, messages)
+                continue
+            page.touched = True
+            self.archive.add_web_messages(conversation.ID, messages, page.count_added)
+            for info in messages:
+                if not info.key.ID:
+                    continue
+                page.received += 1
+                oldest = (info.messageTimestamp * 1000, info.key.ID, info.key.fromMe)
+                if page.oldest is None or oldest[0] < page.oldest[0]:
+                    page.oldest = oldest
+            if (
+                conversation.endOfHistoryTransferType
+                == Conversation.COMPLETE_AND_NO_MORE_MESSAGE_REMAIN_ON_PRIMARY
+            ):
+                page.end = True
+        if chunk.last:
+            for page in pending.values():
+                if page.touched:
+                    page.answered.set()
@@ -9,7 +9,7 @@ from types import NoneType
 import typing
 from datetime import timedelta
 from io import BytesIO
-from typing import Any, Optional, List, Sequence, overload
+from typing import Any, Callable, Iterable, Optional, List, Sequence, overload
 
 import magic
 from PIL import Image
@@ -21,13 +21,30 @@ from .utils.calc import AspectRatioMethod, auto_sticker
 
 
 from ._binder import gocode, func_string, func_callback_bytes, func
+from .account import AccountState
 from .builder import build_edit, build_revoke
+from .contacts import ContactDirectory
+from .dedupe import InboundDedupe
 from .events import Event, EventsManager
+from .groups import GroupCache
+from .hibernation import Hibernation
+from .pool import SessionPool
+from .presence import TypingIndicator
+from .profiles import ProfileCache
+from .ratelimit import SendScheduler
+from .streaming import MessageStream
+from .receipts import ReadReceiptCoalescer
+from .scheduled import MessageScheduler, SendAt
+from .recent import RecentMessages
+from .retry import SentMessageCache
+from .supervisor import Supervisor
 from .exc import (
+    ConnectError,
     ContactStoreError,
     DownloadError,
     GetChatSettingsError,
     PutArchivedError,
+    PutChatSettingsError,
     PutMutedUntilError,
     PutPinnedError,
     ResolveContactQRLinkError,
@@ -79,6 +96,7 @@ from .exc import (
     GetUserDevicesError,
     JoinGroupWithInviteError,
     LinkGroupError,
+    MessageNotFoundError,
     NewsletterSubscribeLiveUpdatesError,
     NewsletterToggleMuteError,
 )
@@ -148,15 +166,52 @@ from .utils.enum import (
     ClientName,
     PrivacySetting,
     PrivacySettingType,
+    SendPriority,
 )
 from .utils.ffmpeg import FFmpeg, ImageFormat
 from .utils.iofile import get_bytes_from_name_or_url
-from .utils.jid import Jid2String, JIDToNonAD, build_jid
+from .utils.jid import JIDLike, Jid2String, JIDToNonAD, as_jid, build_jid, jid_wire
+
+
+class _GoBridge:
+    """
+    Forwards calls to ``gocode`` on behalf of a single :class:`NewClient`,
+    running the client's outbound hooks before anything that reaches the network.
+    """
+
+    LOCAL_CALLS = frozenset(
+        {
+            "snakechat",
+            "Connect",
+            "Disconnect",
+            "SetAutoReconnect",
+            "IsConnected",
+            "IsLoggedIn",
+            "GetMe",
+            "GenerateMessageID",
+            "BuildPollVoteCreation",
+            "BuildPollVote",
+            "BuildReaction",
+            "BuildRevoke",
+            "GetMessageForRetry",
+        }
+    )
+
+    def __init__(self, client: NewClient) -> None:
+        self._client = client
+
+    def __getattr__(self, name: str):
+        if name not in self.LOCAL_CALLS:
+            self._client._before_outbound()
+        return getattr(gocode, name)
 
 
 class ContactStore:
-    def __init__(self, uuid: bytes) -> None:
+    def __init__(
+        self, uuid: bytes, directory: Optional[ContactDirectory] = None
+    ) -> None:
         self.uuid = uuid
+        self.directory = directory
         self.__client = gocode
 
     def put_pushname(
@@ -165,11 +220,13 @@ class ContactStore:
         user_bytes = user.SerializeToString()
         model = ContactsPutPushNameReturnFunction.FromString(
             self.__client.PutPushName(
-                user_bytes, len(user_bytes), pushname.encode()
+                self.uuid, user_bytes, len(user_bytes), pushname.encode()
             ).get_bytes()
         )
         if model.Error:
             raise ContactStoreError(model.Error)
+        if self.directory is not None:
+            self.directory.update_push_name(user, pushname)
         return model
 
     def put_contact_name(self, user: JID, fullname: str, firstname: str):
@@ -183,12 +240,17 @@ class ContactStore:
         ).decode()
         if err:
             return ContactStoreError(err)
+        if self.directory is not None:
+            self.directory.invalidate(user)
 
     def put_all_contact_name(self, contact_entry: List[ContactEntry]):
         entry = ContactEntryArray(ContactEntry=contact_entry).SerializeToString()
         err = self.__client.PutAllContactNames(self.uuid, entry, len(entry)).decode()
         if err:
             raise ContactStoreError(err)
+        if self.directory is not None:
+            for contact in contact_entry:
+                self.directory.invalidate(contact.JID)
 
     def get_contact(self, user: JID) -> ContactInfo:
         jid = user.SerializeToString()
@@ -207,6 +269,33 @@ class ContactStore:
             raise ContactStoreError(model.Error)
         return model.Contact
 
+    def get_contacts(
+        self, users: Sequence[JID]
+    ) -> RepeatedCompositeFieldContainer[Contact]:
+        jids = JIDArray(JIDS=users).SerializeToString()
+        model = snakechat_proto.ContactsGetAllContactsReturnFunction.FromString(
+            self.__client.GetContacts(self.uuid, jids, len(jids)).get_bytes()
+        )
+        if model.Error:
+            raise ContactStoreError(model.Error)
+        return model.Contact
+
+
+# flags of the packed records exchanged with PutChatSettingsMany/GetChatSettingsMany
+CHAT_MUTED_SET = 1
+CHAT_PINNED_SET = 2
+CHAT_PINNED = 4
+CHAT_ARCHIVED_SET = 8
+CHAT_ARCHIVED = 16
+CHAT_FOUND = 1
+CHAT_IS_PINNED = 2
+CHAT_IS_ARCHIVED = 4
+
+
+def _pack_chat_jid(jid: JID) -> bytes:
+    raw = Jid2String(jid).encode()
+    return struct.pack("<H", len(raw)) + raw
+
 
 class ChatSettingsStore:
     def __init__(self, uuid: bytes) -> None:
@@ -246,6 +335,70 @@ class ChatSettingsStore:
             raise GetChatSettingsError(return_.Error)
         return return_.LocalChatSettings
 
+    def put_many(
+        self,
+        users: Iterable[JID],
+        muted_until: Optional[timedelta] = None,
+        pinned: Optional[bool] = None,
+        archived: Optional[bool] = None,
+    ):
+        """
+        Applies the same settings to many chats inside a single store transaction.
+        Settings left as None are not touched.
+
+        :param users: The chats to update.
+        :type users: Iterable[JID]
+        :param muted_until: Mute end, same meaning as in :meth:`put_muted_until`, defaults to None
+        :type muted_until: Optional[timedelta], optional
+        :param pinned: New pinned state, defaults to None
+        :type pinned: Optional[bool], optional
+        :param archived: New archived state, defaults to None
+        :type archived: Optional[bool], optional
+        :raises PutChatSettingsError: If the transaction failed, nothing is written then.
+        """
+        flags = 0
+        if muted_until is not None:
+            flags |= CHAT_MUTED_SET
+        if pinned is not None:
+            flags |= CHAT_PINNED_SET | (CHAT_PINNED if pinned else 0)
+        if archived is not None:
+            flags |= CHAT_ARCHIVED_SET | (CHAT_ARCHIVED if archived else 0)
+        settings = struct.pack(
+            "<Bq", flags, int(muted_until.total_seconds()) if muted_until else 0
+        )
+        buf = b"".join(_pack_chat_jid(user) + settings for user in users)
+        if not buf:
+            return
+        err = self.__client.PutChatSettingsMany(self.uuid, buf, len(buf)).decode()
+        if err:
+            raise PutChatSettingsError(err)
+
+    def get_many(self, users: Sequence[JID]) -> List[LocalChatSettings]:
+        """
+        Reads the settings of many chats inside a single store transaction.
+
+        :param users: The chats.
+        :type users: Sequence[JID]
+        :raises GetChatSettingsError: If the store could not be read.
+        :return: The settings of every chat, in the order of ``users``.
+        :rtype: List[LocalChatSettings]
+        """
+        buf = b"".join(_pack_chat_jid(user) for user in users)
+        if not buf:
+            return []
+        result = self.__client.GetChatSettingsMany(self.uuid, buf, len(buf)).get_bytes()
+        if result[:1] != b"\x00":
+            raise GetChatSettingsError(result[1:].decode())
+        return [
+            LocalChatSettings(
+                Found=bool(flags & CHAT_FOUND),
+                MutedUntil=float(muted_until),
+                Pinned=bool(flags & CHAT_IS_PINNED),
+                Archived=bool(flags & CHAT_IS_ARCHIVED),
+            )
+            for flags, muted_until in struct.iter_unpack("<Bq", result[1:])
+        ]
+
 
 class NewClient:
     def __init__(
@@ -259,14 +412,33 @@ class NewClient:
         self.device_props = props
         self.jid = jid
         self.uuid = ((jid.User if jid else None) or uuid or name).encode()
-        self.__client = gocode
+        self.__client = _GoBridge(self)
+        self.last_activity = self.last_event = time.monotonic()
+        self.hibernated = False
+        self.outbound_hooks: List[Callable[[NewClient], None]] = []
         self.event = Event(self)
         self.blocking = self.event.blocking
         self.qr = self.event.qr
-        self.contact = ContactStore(self.uuid)
+        self.contacts = ContactDirectory(self)
+        self.contact = ContactStore(self.uuid, self.contacts)
         self.chat_settings = ChatSettingsStore(self.uuid)
+        self.scheduler = SendScheduler(self)
+        self.groups = GroupCache(self)
+        self.profiles = ProfileCache(self)
+        self.account = AccountState(self)
+        self.dedupe = InboundDedupe(self)
+        self.recent = RecentMessages(self)
+        self.sent_cache = SentMessageCache(self)
+        self.read_receipts = ReadReceiptCoalescer(self)
+        self.typing_indicator = TypingIndicator(self)
+        self.scheduled: Optional[MessageScheduler] = None
         log.debug("Creando una nueva sesión para el cliente 🐍")
 
+    def _before_outbound(self):
+        self.last_activity = time.monotonic()
+        for hook in self.outbound_hooks:
+            hook(self)
+
     def __onLoginStatus(self, s: str):
         print(s)
 
@@ -336,28 +508,92 @@ class NewClient:
             else None,
         )
 
+    def build_text_message(self, text: str, link_preview: bool = False) -> Message:
+        mentioned_jid = self._parse_mention(text)
+        partial_msg = ExtendedTextMessage(
+            text=text, contextInfo=ContextInfo(mentionedJID=mentioned_jid)
+        )
+        if link_preview:
+            preview = self._generate_link_preview(text)
+            if preview:
+                partial_msg.MergeFrom(preview)
+        if partial_msg.previewType is None and not mentioned_jid:
+            return Message(conversation=text)
+        return Message(extendedTextMessage=partial_msg)
+
     def send_message(
-        self, to: JID, message: typing.Union[Message, str], link_preview: bool = False
+        self,
+        to: JIDLike,
+        message: typing.Union[Message, str],
+        link_preview: bool = False,
+        message_id: Optional[str] = None,
+        priority: Optional[SendPriority] = None,
     ) -> SendResponse:
-        to_bytes = to.SerializeToString()
+        to = as_jid(to)
+        to_bytes = jid_wire(to)
         if isinstance(message, str):
-            mentioned_jid = self._parse_mention(message)
-            partial_msg = ExtendedTextMessage(
-                text=message, contextInfo=ContextInfo(mentionedJID=mentioned_jid)
-            )
-            if link_preview:
-                preview = self._generate_link_preview(message)
-                if preview:
-                    partial_msg.MergeFrom(preview)
-            if partial_msg.previewType is None and not mentioned_jid:
-                msg = Message(conversation=message)
-            else:
-                msg = Message(extendedTextMessage=partial_msg)
+            msg = self.build_text_message(message, link_preview)
         else:
             msg = message
         message_bytes = msg.SerializeToString()
+        self.scheduler.acquire(to, priority)
         sendresponse = self.__client.SendMessage(
-            self.uuid, to_bytes, len(to_bytes), message_bytes, len(message_bytes)
+            self.uuid,
+            to_bytes,
+            len(to_bytes),
+            message_bytes,
+            len(message_bytes),
+            (message_id or "").encode(),
+        ).get_bytes()
+        model = SendMessageReturnFunction.FromString(sendresponse)
+        self.scheduler.on_result(to, model.Error)
+        if model.Error:
+            raise SendMessageError(model.Error)
+        self.recent.add_sent(to, msg, model.SendResponse)
+        return model.SendResponse
+
+    def schedule(
+        self,
+        send_at: SendAt,
+        to: JIDLike,
+        message: typing.Union[Message, str],
+        priority: SendPriority = SendPriority.BULK,
+    ) -> str:
+        """
+        Sends a message at a later time through :attr:`scheduled`, which is created with the
+        defaults of :class:`MessageScheduler` on first use.
+
+        :param send_at: When to send it, as a datetime or a Unix timestamp.
+        :type send_at: SendAt
+        :param to: The recipient.
+        :type to: JIDLike
+        :param message: The message or its text.
+        :type message: typing.Union[Message, str]
+        :param priority: The priority class of the send, defaults to SendPriority.BULK
+        :type priority: SendPriority, optional
+        :return: The ID of the schedule, to pass to :meth:`MessageScheduler.cancel`.
+        :rtype: str
+        """
+        scheduled = self.scheduled
+        if scheduled is None:
+            scheduled = MessageScheduler(self)
+        return scheduled.schedule(send_at, to, message, priority)
+
+    def send_peer_message(self, message: Message) -> SendResponse:
+        """
+        Sends a message to the other devices of the account, e.g. a request built by
+        :func:`snakechat.builder.build_history_sync_request`. The answer to a history sync
+        request arrives as an ON_DEMAND history sync.
+
+        :param message: The message to send.
+        :type message: Message
+        :raises SendMessageError: If the message could not be sent.
+        :return: The response of the server.
+        :rtype: SendResponse
+        """
+        message_bytes = message.SerializeToString()
+        sendresponse = self.__client.SendPeerMessage(
+            self.uuid, message_bytes, len(message_bytes)
         ).get_bytes()
         model = SendMessageReturnFunction.FromString(sendresponse)
         if model.Error:
@@ -417,13 +653,125 @@ class NewClient:
             link_preview,
         )
 
+    def reply_to_id(
+        self,
+        chat: JIDLike,
+        message_id: str,
+        message: typing.Union[str, MessageWithContextInfo],
+        link_preview: bool = False,
+        reply_privately: bool = False,
+    ) -> SendResponse:
+        """
+        Replies to a message found in :attr:`recent` by its chat and ID. Buffering has to be turned
+        on with :meth:`RecentMessages.enable` first.
+
+        :param chat: The chat of the quoted message.
+        :type chat: JIDLike
+        :param message_id: The ID of the quoted message.
+        :type message_id: str
+        :param message: The reply.
+        :type message: typing.Union[str, MessageWithContextInfo]
+        :param link_preview: Whether to generate a link preview, defaults to False
+        :type link_preview: bool, optional
+        :param reply_privately: Whether to reply to the sender in private, defaults to False
+        :type reply_privately: bool, optional
+        :raises MessageNotFoundError: If the message is not in :attr:`recent`.
+        :return: The response of the server.
+        :rtype: SendResponse
+        """
+        quoted = self._recent_message(chat, message_id)
+        return self.reply_message(
+            message,
+            quoted,
+            link_preview=link_preview,
+            reply_privately=reply_privately,
+        )
+
     def edit_message(
         self, chat: JID, message_id: str, new_message: Message
     ) -> SendResponse:
-        return self.send_message(chat, build_edit(chat, message_id, new_message))
+        response = self.send_message(chat, build_edit(chat, message_id, new_message))
+        self.recent.update(chat, message_id, new_message)
+        return response
+
+    def edit_by_id(
+        self,
+        chat: JIDLike,
+        message_id: str,
+        new_message: typing.Union[Message, str],
+        link_preview: bool = False,
+    ) -> SendResponse:
+        """
+        Edits a message sent by this account, checking it in :attr:`recent` first.
+
+        :param chat: The chat of the message.
+        :type chat: JIDLike
+        :param message_id: The ID of the message.
+        :type message_id: str
+        :param new_message: The new content.
+        :type new_message: typing.Union[Message, str]
+        :param link_preview: Whether to generate a link preview for a text, defaults to False
+        :type link_preview: bool, optional
+        :raises MessageNotFoundError: If the message is not in :attr:`recent` or was not sent by this account.
+        :return: The response of the server.
+        :rtype: SendResponse
+        """
+        original = self._recent_message(chat, message_id)
+        if not original.Info.MessageSource.IsFromMe:
+            raise MessageNotFoundError(f"{message_id} was not sent by this account")
+        if isinstance(new_message, str):
+            new_message = self.build_text_message(new_message, link_preview)
+        return self.edit_message(original.Info.MessageSource.Chat, message_id, new_message)
+
+    def stream_message(
+        self, chat: JIDLike, interval: float = 1.0, link_preview: bool = False
+    ) -> MessageStream:
+        """
+        Returns a writer for a message whose text grows over time. The first text is sent
+        right away and later ones are sent as edits of it, at most one every ``interval``
+        seconds; closing the writer sends the final text. Use it as a context manager.
+
+        :param chat: The chat the message is sent to.
+        :type chat: JIDLike
+        :param interval: Minimum seconds between two edits, defaults to 1.0
+        :type interval: float, optional
+        :param link_preview: Whether to generate a link preview for the first message, defaults to False
+        :type link_preview: bool, optional
+        :return: The writer, with the counts of updates and edits sent.
+        :rtype: MessageStream
+        """
+        return MessageStream(self, chat, interval, link_preview)
 
     def revoke_message(self, chat: JID, sender: JID, message_id: str) -> SendResponse:
-        return self.send_message(chat, self.build_revoke(chat, sender, message_id))
+        response = self.send_message(chat, self.build_revoke(chat, sender, message_id))
+        self.recent.forget(chat, message_id)
+        return response
+
+    def revoke_by_id(self, chat: JIDLike, message_id: str) -> SendResponse:
+        """
+        Revokes a message found in :attr:`recent`, taking its sender from there.
+
+        :param chat: The chat of the message.
+        :type chat: JIDLike
+        :param message_id: The ID of the message.
+        :type message_id: str
+        :raises MessageNotFoundError: If the message is not in :attr:`recent`.
+        :return: The response of the server.
+        :rtype: SendResponse
+        """
+        original = self._recent_message(chat, message_id)
+        source = original.Info.MessageSource
+        return self.revoke_message(source.Chat, source.Sender, message_id)
+
+    def _recent_message(self, chat: JIDLike, message_id: str) -> snakechat_proto.Message:
+        if not self.recent.enabled:
+            raise MessageNotFoundError(
+                "recent messages are not buffered, call recent.enable() before connecting"
+            )
+        message = self.recent.get(chat, message_id)
+        if message is None:
+            raise MessageNotFoundError(f"{message_id} is not among the recent messages")
+        return message
 
     def build_poll_vote_creation(
         self, name: str, options: List[str], selectable_count: int
@@ -478,21 +826,23 @@ class NewClient:
     def build_revoke(
         self, chat: JID, sender: JID, message_id: str, with_go: bool = False
     ) -> Message:
+        chat, sender = as_jid(chat), as_jid(sender)
         if with_go:
-            chat_buf = chat.SerializeToString()
-            sender_buf = sender.SerializeToString()
-            return Message.FromString(
-                self.__client.BuildRevoke(
-                    self.uuid,
-                    chat_buf,
-                    len(chat_buf),
-                    sender_buf,
-                    len(sender_buf),
-                    message_id.encode(),
-                ).get_bytes()
-            )
+            chat_buf = jid_wire(chat)
+            sender_buf = jid_wire(sender)
+            data = self.__client.BuildRevoke(
+                self.uuid,
+                chat_buf,
+                len(chat_buf),
+                sender_buf,
+                len(sender_buf),
+                message_id.encode(),
+            ).get_bytes()
+            if not data:
+                raise ValueError(f"Go could not decode the JIDs of revoke {message_id}")
+            return Message.FromString(data)
         else:
-            return build_revoke(chat, sender, message_id, self.get_me().JID)
+            return build_revoke(chat, sender, message_id, self.account.own_jid)
 
     def build_sticker_message(
         self,
@@ -844,9 +1194,9 @@ class NewClient:
         return self.__client.GenerateMessageID(self.uuid).decode()
 
     def send_chat_presence(
-        self, jid: JID, state: ChatPresence, media: ChatPresenceMedia
+        self, jid: JIDLike, state: ChatPresence, media: ChatPresenceMedia
     ) -> str:
-        jidbyte = jid.SerializeToString()
+        jidbyte = jid_wire(as_jid(jid))
         return self.__client.SendChatPresence(
             self.uuid, jidbyte, len(jidbyte), state.value, media.value
         ).decode()
@@ -872,7 +1222,12 @@ class NewClient:
         return self.__client.IsLoggedIn(self.uuid)
 
     def get_user_info(
-        self, *jid: JID
+        self, *jid: JID, refresh: bool = False
+    ) -> List[GetUserInfoSingleReturnFunction]:
+        return self.profiles.get_user_info(jid, refresh)
+
+    def _fetch_user_info(
+        self, jid: Sequence[JID]
     ) -> RepeatedCompositeFieldContainer[GetUserInfoSingleReturnFunction]:
         jidbuf = JIDArray(JIDS=jid).SerializeToString()
         getUser = self.__client.GetUserInfo(self.uuid, jidbuf, len(jidbuf)).get_bytes()
@@ -881,8 +1236,13 @@ class NewClient:
             raise GetUserInfoError(model.Error)
         return model.UsersInfo
 
-    def get_group_info(self, jid: JID) -> GroupInfo:
-        jidbuf = jid.SerializeToString()
+    def get_group_info(self, jid: JIDLike, refresh: bool = False) -> GroupInfo:
+        jid = as_jid(jid)
+        if not refresh:
+            cached = self.groups.lookup(jid)
+            if cached is not None:
+                return cached
+        jidbuf = jid_wire(jid)
         group_info_buf = self.__client.GetGroupInfo(
             self.uuid,
             jidbuf,
@@ -891,6 +1251,7 @@ class NewClient:
         model = GetGroupInfoReturnFunction.FromString(group_info_buf.get_bytes())
         if model.Error:
             raise GetGroupInfoError(model.Error)
+        self.groups.put(model.GroupInfo)
         return model.GroupInfo
 
     def get_group_info_from_link(self, code: str) -> GroupInfo:
@@ -986,6 +1347,7 @@ class NewClient:
             raise LinkGroupError(err)
 
     def logout(self):
+        self.read_receipts.flush()
         err = self.__client.Logout(self.uuid).decode()
         if err:
             raise LogoutError(err)
@@ -993,13 +1355,41 @@ class NewClient:
     def mark_read(
         self,
         *message_ids: str,
-        chat: JID,
-        sender: JID,
+        chat: JIDLike,
+        sender: JIDLike,
         receipt: ReceiptType,
         timestamp: Optional[int] = None,
+        coalesce: bool = False,
     ):
-        chat_proto = chat.SerializeToString()
-        sender_proto = sender.SerializeToString()
+        """
+        Marks messages of a sender in a chat as read, played or delivered.
+
+        :param chat: The chat of the messages.
+        :type chat: JIDLike
+        :param sender: The sender of the messages.
+        :type sender: JIDLike
+        :param receipt: The receipt type.
+        :type receipt: ReceiptType
+        :param timestamp: Time of the receipt in seconds, defaults to now
+        :type timestamp: Optional[int], optional
+        :param coalesce: Queue the marks in :attr:`read_receipts` to send them with others, defaults to False
+        :type coalesce: bool, optional
+        :raises MarkReadError: If the receipt could not be sent.
+        :raises ValueError: If ``chat`` or ``sender`` is not a valid JID string.
+        """
+        chat = as_jid(chat)
+        sender = as_jid(sender)
+        if coalesce:
+            self.read_receipts.mark(
+                *message_ids,
+                chat=chat,
+                sender=sender,
+                receipt=receipt,
+                timestamp=timestamp,
+            )
+            return
+        chat_proto = jid_wire(chat)
+        sender_proto = jid_wire(sender)
         timestamp_args = int(time.time()) if timestamp is None else timestamp
         err = self.__client.MarkRead(
             self.uuid,
@@ -1151,6 +1541,8 @@ class NewClient:
         ).decode()
         if err:
             raise SetPrivacySettingError(err)
+        # the next read fetches the settings again
+        self.account.privacy = None
 
     def set_passive(self, passive: bool):
         err = self.__client.SetPassive(self.uuid, passive)
@@ -1162,8 +1554,8 @@ class NewClient:
         if err:
             raise SetStatusMessageError(err)
 
-    def subscribe_presence(self, jid: JID):
-        jid_proto = jid.SerializeToString()
+    def subscribe_presence(self, jid: JIDLike):
+        jid_proto = jid_wire(as_jid(jid))
         err = self.__client.SubscribePresence(
             self.uuid, jid_proto, len(jid_proto)
         ).decode()
@@ -1196,6 +1588,7 @@ class NewClient:
         )
         if model.Error:
             raise UpdateBlocklistError(model.Error)
+        self.account.set_blocklist(model.Blocklist)
         return model.Blocklist
 
     def update_group_participants(
@@ -1269,6 +1662,7 @@ class NewClient:
         )
         if model.Error:
             raise GetJoinedGroupsError(model.Error)
+        self.groups.put_all(model.Group)
         return model.Group
 
     def create_newsletter(
@@ -1332,17 +1726,26 @@ class NewClient:
             raise GetNewsletterMessagesError(model.Error)
         return model.NewsletterMessage
 
-    def get_privacy_settings(self) -> PrivacySettings:
-        return snakechat_proto.PrivacySettings.FromString(
+    def get_privacy_settings(self, refresh: bool = False) -> PrivacySettings:
+        if not refresh and self.account.privacy is not None:
+            return self.account.privacy
+        self.account.privacy = snakechat_proto.PrivacySettings.FromString(
             self.__client.GetPrivacySettings(self.uuid).get_bytes()
         )
+        return self.account.privacy
 
     def get_profile_picture(
         self,
-        jid: JID,
+        jid: JIDLike,
         extra: snakechat_proto.GetProfilePictureParams = snakechat_proto.GetProfilePictureParams(),
+        refresh: bool = False,
     ) -> ProfilePictureInfo:
-        jid_bytes = jid.SerializeToString()
+        return self.profiles.get_profile_picture(as_jid(jid), extra, refresh)
+
+    def _fetch_profile_picture(
+        self, jid: JID, extra: snakechat_proto.GetProfilePictureParams
+    ) -> ProfilePictureInfo:
+        jid_bytes = jid_wire(jid)
         extra_bytes = extra.SerializeToString()
         model = snakechat_proto.GetProfilePictureReturnFunction.FromString(
             self.__client.GetProfilePicture(
@@ -1358,14 +1761,17 @@ class NewClient:
         return model.Picture
 
     def get_status_privacy(
-        self,
+        self, refresh: bool = False
     ) -> RepeatedCompositeFieldContainer[StatusPrivacy]:
+        if not refresh and self.account.status_privacy is not None:
+            return self.account.status_privacy
         model = snakechat_proto.GetStatusPrivacyReturnFunction.FromString(
             self.__client.GetStatusPrivacy(self.uuid).get_bytes()
         )
         if model.Error:
             raise GetStatusPrivacyError(model.Error)
-        return model.StatusPrivacy
+        self.account.status_privacy = model.StatusPrivacy
+        return self.account.status_privacy
 
     def get_sub_groups(
         self, community: JID
@@ -1397,16 +1803,24 @@ class NewClient:
             raise GetUserDevicesError(model.Error)
         return model.JID
 
-    def get_blocklist(self) -> Blocklist:
+    def get_blocklist(self, refresh: bool = False) -> Blocklist:
+        if not refresh and self.account.blocklist is not None:
+            return self.account.blocklist
         model = snakechat_proto.GetBlocklistReturnFunction.FromString(
             self.__client.GetBlocklist(self.uuid).get_bytes()
         )
         if model.Error:
             raise GetBlocklistError(model.Error)
+        self.account.set_blocklist(model.Blocklist)
         return model.Blocklist
 
-    def get_me(self) -> Device:
-        return Device.FromString(self.__client.GetMe(self.uuid).get_bytes())
+    def get_me(self, refresh: bool = False) -> Device:
+        if not refresh and self.account.me is not None:
+            return self.account.me
+        me = Device.FromString(self.__client.GetMe(self.uuid).get_bytes())
+        if me.HasField("JID"):
+            self.account.me = me
+        return me
 
     def get_contact_qr_link(self, revoke: bool = False) -> str:
         model = snakechat_proto.GetContactQRLinkReturnFunction.FromString(
@@ -1464,7 +1878,7 @@ class NewClient:
             showPushNotification=show_push_notification,
         )
         payload = pl.SerializeToString()
-        d = bytearray(list(self.event.list_func))
+        d = self.event.subscriptions()
 
         log.debug("trying connect to whatsapp servers")
 
@@ -1489,7 +1903,7 @@ class NewClient:
             func_string(self.__onQr),
             func_string(self.__onLoginStatus),
             func_callback_bytes(self.event.execute),
-            (ctypes.c_char * self.event.list_func.__len__()).from_buffer(d),
+            (ctypes.c_char * len(d)).from_buffer(d),
             len(d),
             func(self.event.blocking_func),
             deviceprops,
@@ -1517,8 +1931,8 @@ class NewClient:
             return model.Message
 
     def connect(self):
-        # Convert the list of functions to a bytearray
-        d = bytearray(list(self.event.list_func))
+        # Convert the subscribed event codes to a bytearray
+        d = self.event.subscriptions()
         log.debug("Intentando conectarse a WhatsApp.")
         # Set device properties
         deviceprops = (
@@ -1543,7 +1957,7 @@ class NewClient:
             func_string(self.__onQr),
             func_string(self.__onLoginStatus),
             func_callback_bytes(self.event.execute),
-            (ctypes.c_char * len(self.event.list_func)).from_buffer(d),
+            (ctypes.c_char * len(d)).from_buffer(d),
             len(d),
             func(self.event.blocking_func),
             deviceprops,
@@ -1553,8 +1967,37 @@ class NewClient:
         )
 
     def disconnect(self) -> None:
+        self.read_receipts.flush()
         self.__client.Disconnect(self.uuid)
 
+    def reconnect(self) -> None:
+        """Reconnects a session that was started with :meth:`connect` and later disconnected."""
+        err = self.__client.Connect(self.uuid).decode()
+        if err:
+            raise ConnectError(err)
+
+    def set_auto_reconnect(self, enable: bool) -> None:
+        self.__client.SetAutoReconnect(self.uuid, enable)
+
+    def typing(
+        self,
+        chat: JIDLike,
+        media: ChatPresenceMedia = ChatPresenceMedia.CHAT_PRESENCE_MEDIA_TEXT,
+    ) -> typing.ContextManager[None]:
+        """
+        Shows "typing…" (or "recording audio…") in a chat while the ``with`` block runs. Blocks
+        of many threads in the same chat share one indicator, refreshed and paused by
+        :attr:`typing_indicator`.
+
+        :param chat: The chat.
+        :type chat: JIDLike
+        :param media: The kind of message being composed, defaults to ChatPresenceMedia.CHAT_PRESENCE_MEDIA_TEXT
+        :type media: ChatPresenceMedia, optional
+        :return: The context manager.
+        :rtype: typing.ContextManager[None]
+        """
+        return self.typing_indicator.hold(chat, media)
+
 
 
 class ClientFactory:
@@ -1562,6 +2005,9 @@ class ClientFactory:
         self.database_name = database_name
         self.clients: list[NewClient] = []
         self.event = EventsManager(self)
+        self.hibernation = Hibernation(self)
+        self.supervisor = Supervisor(self)
+        self.pool = SessionPool(self)
 
     @staticmethod
     def get_all_devices_from_db(db: str) -> List["Device"]:
@@ -1598,6 +2044,11 @@ class ClientFactory:
             raise Exception("JID and UUID cannot be none")
 
         client = NewClient(self.database_name, jid, props, uuid)
+        client.outbound_hooks.append(self.hibernation.on_outbound)
+        if self.supervisor.enabled:
+            self.supervisor.attach(client)
+        if self.pool.enabled:
+            self.pool.attach(client)
         self.clients.append(client)    
         return client
 
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from .events import MessageEv
+from .proto.snakechat_pb2 import JID, ContactInfo
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+
+def _key(jid: JID) -> str:
+    return f"{jid.User}@{jid.Server}"
+
+
+class CachedContact:
+    __slots__ = ("found", "first_name", "full_name", "push_name", "business_name")
+
+    def __init__(
+        self,
+        found: bool = False,
+        first_name: str = "",
+        full_name: str = "",
+        push_name: str = "",
+        business_name: str = "",
+    ) -> None:
+        self.found = found
+        self.first_name = first_name
+        self.full_name = full_name
+        self.push_name = push_name
+        self.business_name = business_name
+
+    @classmethod
+    def from_info(cls, info: ContactInfo) -> CachedContact:
+        return cls(
+            info.Found,
+            info.FirstName,
+            info.FullName,
+            info.PushName,
+            info.BusinessName,
+        )
+
+    @property
+    def name(self) -> str:
+        """The best display name: address book name, then push name, then business name."""
+        return self.full_name or self.push_name or self.business_name
+
+    def __repr__(self) -> str:
+        return f"CachedContact(name={self.name!r}, found={self.found})"
+
+
+class ContactDirectory:
+    def __init__(self, client: NewClient, maxsize: int = 50_000) -> None:
+        """
+        LRU-bounded in-memory view of the :class:`ContactStore`. Contacts are loaded on first
+        use, misses of a bulk lookup are fetched in one FFI call, and push names are kept
+        current from :meth:`ContactStore.put_pushname`. Push names seen in ``MessageEv`` are
+        only followed after :meth:`enable`, as listening makes Go marshal every message.
+
+        :param client: The client whose contacts are held.
+        :type client: NewClient
+        :param maxsize: Maximum contacts kept in memory, defaults to 50000
+        :type maxsize: int, optional
+        """
+        self.client = client
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.enabled = False
+        self._entries: OrderedDict[str, CachedContact] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def enable(self):
+        """Follows push names from incoming messages, call it before the client connects."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.client.event.add_listener(MessageEv, self._on_message)
+
+    def get(self, jid: JID) -> CachedContact:
+        """
+        Returns a contact, reading it from the store only the first time.
+
+        :param jid: The user.
+        :type jid: JID
+        :return: The contact.
+        :rtype: CachedContact
+        """
+        key = _key(jid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = CachedContact.from_info(self.client.contact.get_contact(jid))
+        self._store(key, entry)
+        return entry
+
+    def get_contacts(self, jids: Iterable[JID]) -> List[CachedContact]:
+        """
+        Returns the contacts of ``jids`` in order, fetching every miss in a single FFI call.
+
+        :param jids: The users.
+        :type jids: Iterable[JID]
+        :return: One contact per JID.
+        :rtype: List[CachedContact]
+        """
+        jids = list(jids)
+        keys = [_key(jid) for jid in jids]
+        found: Dict[str, CachedContact] = {}
+        missing: Dict[str, JID] = {}
+        with self._lock:
+            for key, jid in zip(keys, jids):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found[key] = entry
+                elif key not in missing:
+                    self.misses += 1
+                    missing[key] = jid
+        if missing:
+            for contact in self.client.contact.get_contacts(list(missing.values())):
+                key = _key(contact.JID)
+                found[key] = CachedContact.from_info(contact.Info)
+                self._store(key, found[key])
+        return [found.get(key) or CachedContact() for key in keys]
+
+    def name(self, jid: JID) -> str:
+        return self.get(jid).name
+
+    def preload(self) -> int:
+        """
+        Loads the whole store at once, up to ``maxsize`` contacts.
+
+        :return: The number of contacts held afterwards.
+        :rtype: int
+        """
+        for contact in self.client.contact.get_all_contacts():
+            self._store(_key(contact.JID), CachedContact.from_info(contact.Info))
+        return len(self._entries)
+
+    def update_push_name(self, jid: JID, push_name: str):
+        """
+        Records a push name for a user that is already held in memory.
+
+        :param jid: The user.
+        :type jid: JID
+        :param push_name: The new push name.
+        :type push_name: str
+        """
+        entry = self._entries.get(_key(jid))
+        if entry is not None and push_name:
+            entry.push_name = push_name
+
+    def invalidate(self, jid: Optional[JID] = None):
+        with self._lock:
+            if jid is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(_key(jid), None)
+
+    def _store(self, key: str, entry: CachedContact):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _on_message(self, client: NewClient, message: MessageEv):
+        info = message.Info
+        if info.Pushname and not info.MessageSource.IsFromMe:
+            self.update_push_name(info.MessageSource.Sender, info.Pushname)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, Union
+
+from ._binder import gocode
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+DEFAULT_CAPACITY = 50_000
+DEFAULT_WINDOW = timedelta(hours=24)
+
+
+@dataclass
+class DedupeStats:
+    checked: int
+    dropped: int
+    size: int
+
+    @property
+    def drop_rate(self) -> float:
+        return self.dropped / self.checked if self.checked else 0.0
+
+
+class InboundDedupe:
+    def __init__(self, client: NewClient) -> None:
+        """
+        Controls the filter Go runs over inbound messages before they are marshalled. A message
+        whose (chat, sender, message ID) was already delivered within the window is dropped
+        without reaching Python, so redeliveries after a reconnect or an offline sync never
+        reach a handler twice. The filter is on by default with up to 50000 entries and a 24
+        hour window; its memory grows with the messages seen and is freed on logout.
+
+        :param client: The client whose inbound messages are filtered.
+        :type client: NewClient
+        """
+        self.client = client
+        self.capacity = DEFAULT_CAPACITY
+        self.window = DEFAULT_WINDOW
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def enable(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        window: Union[timedelta, float] = DEFAULT_WINDOW,
+    ):
+        """
+        Sets the size and window of the filter. Reconfiguring it forgets the messages seen so far.
+
+        :param capacity: Messages remembered, about 200 bytes each, defaults to 50000
+        :type capacity: int, optional
+        :param window: How long a message counts as a duplicate, defaults to 24 hours
+        :type window: Union[timedelta, float], optional
+        """
+        if not isinstance(window, timedelta):
+            window = timedelta(seconds=window)
+        self.capacity = capacity
+        self.window = window
+        gocode.SetInboundDedupe(self.client.uuid, capacity, int(window.total_seconds()))
+
+    def disable(self):
+        self.enable(0, self.window)
+
+    def stats(self) -> DedupeStats:
+        checked, dropped, size = struct.unpack(
+            "<QQQ", gocode.GetInboundDedupeStats(self.client.uuid).get_bytes()
+        )
+        return DedupeStats(checked, dropped, size)
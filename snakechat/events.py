@@ -2,10 +2,15 @@ from __future__ import annotations
 import logging
 
 from snakechat.exc import UnsupportedEvent
+from ._binder import gocode
+from .lanes import EventLanes
 from .proto import snakechat_pb2 as snakechat
+from .proto.waHistorySync.WAWebProtobufsHistorySync_pb2 import HistorySync
 import ctypes
+import struct
+import time
 import segno
-from typing import TypeVar, Type, Callable, TYPE_CHECKING, Dict
+from typing import TypeVar, Type, Callable, TYPE_CHECKING, Dict, Iterator, List, Optional
 from google.protobuf.message import Message
 from dataclasses import dataclass
 from threading import Event as EventThread
@@ -98,6 +103,60 @@ EVENT_TO_INT: Dict[Type[Message], int] = {
     UnknownCallEventEV: 43,
 }
 INT_TO_EVENT: Dict[int, Type[Message]] = {code: ev for ev, code in EVENT_TO_INT.items()}
+# chunk of messages received during an offline sync, see Event.offline_batch
+OFFLINE_BATCH = 44
+OFFLINE_BATCH_FINAL = 1
+# part of a history sync, see Event.history_sync_chunk
+HISTORY_SYNC_CHUNK = 45
+_CHUNK_HEADER = struct.Struct("<IIII")
+
+
+class OfflineBatch(List[MessageEv]):
+    """Messages received during an offline sync, ``final`` is set on the chunk sent when it completes."""
+
+    final: bool = False
+
+
+@dataclass
+class HistorySyncChunk:
+    """
+    A part of a history sync. The first part holds every field besides the conversations,
+    every part keeps ``syncType``, ``chunkOrder`` and ``progress``, and a long conversation
+    may be split across consecutive parts.
+    """
+
+    index: int
+    count: int
+    conversations_done: int
+    conversations_total: int
+    data: HistorySync
+
+    @property
+    def last(self) -> bool:
+        return self.index + 1 == self.count
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the conversations of this history sync delivered so far."""
+        if not self.conversations_total:
+            return 1.0
+        return self.conversations_done / self.conversations_total
+
+
+def iter_frames(data: bytes, offset: int = 0) -> Iterator[bytes]:
+    """Yields the uvarint-length-prefixed records Go packs into a single event."""
+    end = len(data)
+    while offset < end:
+        size = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            size |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        yield data[offset : offset + size]
+        offset += size
 
 event = EventThread()
 
@@ -123,6 +182,22 @@ class EventsManager:
 
         return callback
 
+    def offline_batch(
+        self, func: Callable[[NewClient, OfflineBatch], None]
+    ) -> Callable[[NewClient, OfflineBatch], None]:
+        """Registers the offline batch handler of every client, see :meth:`Event.offline_batch`."""
+        for client in self.client_factory.clients:
+            client.event.offline_batch(func)
+        return func
+
+    def history_sync_chunk(
+        self, func: Callable[[NewClient, HistorySyncChunk], None]
+    ) -> Callable[[NewClient, HistorySyncChunk], None]:
+        """Registers the history sync handler of every client, see :meth:`Event.history_sync_chunk`."""
+        for client in self.client_factory.clients:
+            client.event.history_sync_chunk(func)
+        return func
+
 
 class Event:
     def __init__(self, client: NewClient):
@@ -135,11 +210,15 @@ class Event:
         """
         self.client = client
         self.blocking_func = self.blocking(self.default_blocking)
-        self.list_func: Dict[int, Callable[[int, int], None]] = {}
+        self.list_func: Dict[int, Callable[[Message], None]] = {}
+        self.listeners: Dict[int, List[Callable[[NewClient, Message], None]]] = {}
         self._qr = self.__onqr
+        self.offline_batch_func: Optional[Callable[[OfflineBatch], None]] = None
+        self.history_listeners: List[Callable[[NewClient, HistorySyncChunk], None]] = []
+        self.lanes = EventLanes(self.deliver)
 
     def execute(self, binary: int, size: int, code: int):
-        """Executes a function from the list of functions based on the given code.
+        """Decodes an event delivered by Go and dispatches it.
 
         :param binary: The binary data to be processed by the function.
         :type binary: int
@@ -148,29 +227,179 @@ class Event:
         :param code: The index of the function to be executed from the list of functions.
         :type code: int
         """
-        self.list_func[code](binary, size)
+        self.client.last_activity = self.client.last_event = time.monotonic()
+        data = ctypes.string_at(binary, size)
+        if not self.lanes.submit(code, data):
+            self.deliver(code, data)
+
+    def deliver(self, code: int, data: bytes):
+        """Decodes a serialized event and dispatches it.
+
+        :param code: The event code.
+        :type code: int
+        :param data: The serialized event.
+        :type data: bytes
+        """
+        if code == OFFLINE_BATCH:
+            self.deliver_offline_batch(data)
+            return
+        if code == HISTORY_SYNC_CHUNK:
+            self.deliver_history_chunk(data)
+            return
+        self.dispatch(code, INT_TO_EVENT[code].FromString(data))
+
+    def deliver_offline_batch(self, data: bytes):
+        """Decodes a chunk of offline messages, runs the ``MessageEv`` listeners on each one and
+        hands the whole chunk to the offline batch handler.
+
+        :param data: A flags byte followed by the framed messages.
+        :type data: bytes
+        """
+        batch = OfflineBatch(MessageEv.FromString(frame) for frame in iter_frames(data, 1))
+        batch.final = bool(data[0] & OFFLINE_BATCH_FINAL)
+        listeners = self.listeners.get(EVENT_TO_INT[MessageEv], ())
+        for message in batch:
+            for listener in listeners:
+                try:
+                    listener(self.client, message)
+                except Exception as e:
+                    log.exception("Event listener %r failed: %s", listener, e)
+        if self.offline_batch_func is not None:
+            self.offline_batch_func(batch)
+
+    def deliver_history_chunk(self, data: bytes):
+        """Decodes a part of a history sync and runs the history listeners with it.
+
+        :param data: The chunk header followed by the serialized part.
+        :type data: bytes
+        """
+        index, count, done, total = _CHUNK_HEADER.unpack_from(data)
+        chunk = HistorySyncChunk(
+            index, count, done, total, HistorySync.FromString(data[_CHUNK_HEADER.size :])
+        )
+        for listener in self.history_listeners:
+            try:
+                listener(self.client, chunk)
+            except Exception as e:
+                log.exception("History listener %r failed: %s", listener, e)
+
+    def dispatch(self, code: int, event: Message):
+        """Runs the internal listeners and then the user handler registered for ``code``.
+
+        :param code: The event code.
+        :type code: int
+        :param event: The decoded event.
+        :type event: Message
+        """
+        for listener in self.listeners.get(code, ()):
+            try:
+                listener(self.client, event)
+            except Exception as e:
+                log.exception("Event listener %r failed: %s", listener, e)
+        func = self.list_func.get(code)
+        if func is not None:
+            func(event)
+
+    def add_listener(
+        self, event: Type[EventType], f: Callable[[NewClient, EventType], None]
+    ):
+        """
+        Registers an internal listener that runs before, and independently of, the user handler.
+        Listeners must be added before the client connects.
+
+        :param event: Type of the event.
+        :type event: Type[EventType]
+        :param f: Function called with the client and the decoded event.
+        :type f: Callable[[NewClient, EventType], None]
+        :raises UnsupportedEvent: If the provided event is not supported.
+        """
+        if event not in EVENT_TO_INT:
+            raise UnsupportedEvent()
+        self.listeners.setdefault(EVENT_TO_INT[event], []).append(f)  # type: ignore
+
+    def subscriptions(self) -> bytearray:
+        """Returns the event codes Go has to deliver, as expected by the ``snakechat`` entry point."""
+        codes = set(self.list_func) | set(self.listeners)
+        if self.offline_batch_func is not None:
+            codes.add(OFFLINE_BATCH)
+        if self.history_listeners:
+            codes.add(HISTORY_SYNC_CHUNK)
+        return bytearray(codes)
+
+    def history_sync_chunk(
+        self,
+        f: Callable[[NewClient, HistorySyncChunk], None],
+        max_messages: Optional[int] = None,
+    ) -> Callable[[NewClient, HistorySyncChunk], None]:
+        """
+        Receives history syncs in parts instead of as one ``HistorySyncEv``. Go splits every
+        history sync into parts of at most ``max_messages`` messages and sends them one after
+        the other, one history sync at a time, so only one part is decoded at a time and
+        processing starts with the first one. A ``HistorySyncEv`` handler, if any, still gets the whole history sync. Must be set
+        before the client connects.
+
+        :param f: Function called with the client and every part.
+        :type f: Callable[[NewClient, HistorySyncChunk], None]
+        :param max_messages: Messages per part, defaults to 500 in Go
+        :type max_messages: Optional[int], optional
+        :return: The handler, so this can be used as a decorator.
+        :rtype: Callable[[NewClient, HistorySyncChunk], None]
+        """
+        self.history_listeners.append(f)
+        if max_messages is not None:
+            gocode.SetHistorySyncChunkSize(self.client.uuid, max_messages)
+        return f
+
+    def offline_batch(
+        self,
+        f: Callable[[NewClient, OfflineBatch], None],
+        max_events: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ) -> Callable[[NewClient, OfflineBatch], None]:
+        """
+        Registers the handler of offline-sync messages. Once set, the messages received between
+        ``OfflineSyncPreviewEv`` and ``OfflineSyncCompletedEv`` are buffered in Go and handed
+        over in chunks instead of going one by one to the ``MessageEv`` handler. Internal
+        ``MessageEv`` listeners still see every message. Must be set before the client connects.
+
+        :param f: Function called with the client and a chunk of messages.
+        :type f: Callable[[NewClient, OfflineBatch], None]
+        :param max_events: Messages per chunk, defaults to 500 in Go
+        :type max_events: Optional[int], optional
+        :param flush_interval: Seconds a partial chunk waits for more messages, defaults to 0.25 in Go
+        :type flush_interval: Optional[float], optional
+        :return: The handler, so this can be used as a decorator.
+        :rtype: Callable[[NewClient, OfflineBatch], None]
+        """
+        self.offline_batch_func = lambda batch: f(self.client, batch)
+        if max_events is not None or flush_interval is not None:
+            gocode.SetOfflineBatch(
+                self.client.uuid,
+                max_events or 0,
+                int((flush_interval or 0) * 1000),
+            )
+        return f
 
     def wrap(self, f: Callable[[NewClient, EventType], None], event: Type[EventType]):
         """
-        This method wraps the function 'f' and returns a new function 'serialization' that
-        takes two parameters - binary and size. The 'serialization' function calls 'f' with
-        the client and an event deserialized from a string.
+        This method wraps the function 'f' and returns a new function that takes the decoded
+        event and calls 'f' with the client and that event.
 
         :param f: Function to be wrapped. It should accept two parameters - a NewClient object and an EventType object.
         :type f: Callable[[NewClient, EventType], None]
         :param event: Type of the event.
         :type event: Type[EventType]
         :raises UnsupportedEvent: If the provided event is not supported.
-        :return: Returns a function 'serialization' that accepts two parameters - binary and size.
-        :rtype: Callable[[int, int], None]
+        :return: Returns a function that accepts the decoded event.
+        :rtype: Callable[[Message], None]
         """
         if event not in EVENT_TO_INT:
             raise UnsupportedEvent()
 
-        def serialization(binary: int, size: int):
-            f(self.client, event.FromString(ctypes.string_at(binary, size)))
+        def handler(decoded: Message):
+            f(self.client, decoded)  # type: ignore
 
-        return serialization
+        return handler
 
     def __onqr(self, _: NewClient, data_qr: bytes):
         """
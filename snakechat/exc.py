@@ -234,3 +234,23 @@ class PutArchivedError(Exception):
 
 class GetChatSettingsError(Exception):
     pass
+
+
+class ConnectError(Exception):
+    pass
+
+
+class NoSessionAvailableError(Exception):
+    pass
+
+
+class PutChatSettingsError(Exception):
+    pass
+
+
+class MessageNotFoundError(Exception):
+    pass
+
+
+class OutboxCommitError(Exception):
+    pass
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+
+from .events import ConnectedEv, GroupInfoEv, JoinedGroupEv
+from .proto.snakechat_pb2 import JID, GroupInfo, GroupParticipant
+from .utils import log
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+
+def _key(jid: JID) -> str:
+    return f"{jid.User}@{jid.Server}"
+
+
+def _participant_keys(participant: GroupParticipant) -> List[str]:
+    keys = []
+    if participant.HasField("JID") and participant.JID.User:
+        keys.append(_key(participant.JID))
+    if participant.LID.User:
+        keys.append(_key(participant.LID))
+    return keys
+
+
+class GroupCache:
+    def __init__(self, client: NewClient) -> None:
+        """
+        In-memory copy of the :class:`GroupInfo` of every known group, kept up to date from
+        ``JoinedGroupEv`` and the participant deltas of ``GroupInfoEv``. Holds an admin set per
+        group and a reverse index from users to the groups they are in.
+
+        :param client: The client whose groups are cached.
+        :type client: NewClient
+        """
+        self.client = client
+        self.warm_on_connect = True
+        self._warmed = False
+        self.hits = 0
+        self.misses = 0
+        self._groups: Dict[str, GroupInfo] = {}
+        self._admins: Dict[str, Set[str]] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._user_groups: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        client.event.add_listener(ConnectedEv, self._on_connected)
+        client.event.add_listener(JoinedGroupEv, self._on_joined)
+        client.event.add_listener(GroupInfoEv, self._on_group_info)
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def __contains__(self, group: JID) -> bool:
+        return _key(group) in self._groups
+
+    def lookup(self, group: JID) -> Optional[GroupInfo]:
+        """
+        Returns the cached info of a group without asking the server. The message is shared
+        with the cache and must be treated as read-only; events replace it instead of changing
+        it, so it stays a consistent snapshot.
+
+        :param group: The group JID.
+        :type group: JID
+        :return: The cached group info, None on a miss.
+        :rtype: Optional[GroupInfo]
+        """
+        info = self._groups.get(_key(group))
+        if info is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return info
+
+    def get(self, group: JID) -> GroupInfo:
+        """
+        Returns the info of a group, asking the server only on a miss.
+
+        :param group: The group JID.
+        :type group: JID
+        :return: The group info.
+        :rtype: GroupInfo
+        """
+        return self.client.get_group_info(group)
+
+    def warm(self) -> int:
+        """
+        Replaces the cache with the groups returned by :meth:`NewClient.get_joined_groups`.
+
+        :return: The number of cached groups.
+        :rtype: int
+        """
+        self.client.get_joined_groups()
+        self._warmed = True
+        return len(self._groups)
+
+    def put(self, info: GroupInfo):
+        with self._lock:
+            self._drop(_key(info.JID))
+            self._index(info)
+
+    def put_all(self, infos: Iterable[GroupInfo]):
+        with self._lock:
+            self.clear()
+            for info in infos:
+                self._index(info)
+
+    def invalidate(self, group: JID):
+        with self._lock:
+            self._drop(_key(group))
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
+            self._admins.clear()
+            self._members.clear()
+            self._user_groups.clear()
+
+    def is_admin(self, group: JID, user: JID) -> bool:
+        """
+        Tells whether a user is an admin of a group. Answered from memory once the group is cached.
+
+        :param group: The group JID.
+        :type group: JID
+        :param user: The user JID, phone number or LID based.
+        :type user: JID
+        :return: True if the user is an admin or the super admin.
+        :rtype: bool
+        """
+        key = _key(group)
+        if key not in self._groups:
+            self.get(group)
+        return _key(user) in self._admins.get(key, ())
+
+    def is_member(self, group: JID, user: JID) -> bool:
+        key = _key(group)
+        if key not in self._groups:
+            self.get(group)
+        return _key(user) in self._members.get(key, ())
+
+    def groups_of(self, user: JID) -> List[JID]:
+        """
+        Returns the cached groups a user is a participant of.
+
+        :param user: The user JID.
+        :type user: JID
+        :return: The JIDs of the groups.
+        :rtype: List[JID]
+        """
+        with self._lock:
+            keys = list(self._user_groups.get(_key(user), ()))
+            return [self._groups[key].JID for key in keys if key in self._groups]
+
+    def _index(self, info: GroupInfo):
+        key = _key(info.JID)
+        # keep a copy, the caller still holds the message it passed in
+        self._groups[key] = GroupInfo()
+        self._groups[key].CopyFrom(info)
+        admins = self._admins[key] = set()
+        members = self._members[key] = set()
+        for participant in info.Participants:
+            self._add_participant(key, participant, admins, members)
+
+    def _add_participant(
+        self,
+        key: str,
+        participant: GroupParticipant,
+        admins: Set[str],
+        members: Set[str],
+    ):
+        for user in _participant_keys(participant):
+            members.add(user)
+            self._user_groups.setdefault(user, set()).add(key)
+            if participant.IsAdmin or participant.IsSuperAdmin:
+                admins.add(user)
+
+    def _drop(self, key: str):
+        self._groups.pop(key, None)
+        self._admins.pop(key, None)
+        for user in self._members.pop(key, ()):
+            groups = self._user_groups.get(user)
+            if groups is not None:
+                groups.discard(key)
+                if not groups:
+                    del self._user_groups[user]
+
+    def _on_connected(self, client: NewClient, _: ConnectedEv):
+        # reconnects and wakes keep the cache current from events, only the first connect
+        # (or one after a failed warm) pays for the full group list
+        if self.warm_on_connect and not self._warmed:
+            threading.Thread(target=self._warm_safe, daemon=True).start()
+
+    def _warm_safe(self):
+        try:
+            self.warm()
+        except Exception as e:
+            log.warning("Warming the group cache failed: %s", e)
+
+    def _on_joined(self, client: NewClient, joined: JoinedGroupEv):
+        self.put(joined.GroupInfo)
+
+    def _on_group_info(self, client: NewClient, event: GroupInfoEv):
+        key = _key(event.JID)
+        with self._lock:
+            cached = self._groups.get(key)
+            if cached is None:
+                return
+            own = _key(client.account.own_jid) if event.Leave else None
+            if event.HasField("Delete") or any(_key(j) == own for j in event.Leave):
+                self._drop(key)
+                return
+            if (
+                event.PrevParticipantsVersionID
+                and cached.ParticipantVersionID
+                and event.PrevParticipantsVersionID != cached.ParticipantVersionID
+            ):
+                # a participant delta was missed, the next lookup refetches the group
+                self._drop(key)
+                return
+            # copy on write, readers may still hold the cached message
+            info = GroupInfo()
+            info.CopyFrom(cached)
+            self._groups[key] = info
+            if event.HasField("Name"):
+                info.GroupName.CopyFrom(event.Name)
+            if event.HasField("Topic"):
+                info.GroupTopic.CopyFrom(event.Topic)
+            if event.HasField("Locked"):
+                info.GroupLocked.CopyFrom(event.Locked)
+            if event.HasField("Announce"):
+                info.GroupAnnounce.CopyFrom(event.Announce)
+            if event.HasField("Ephemeral"):
+                info.GroupEphemeral.CopyFrom(event.Ephemeral)
+            if event.ParticipantVersionID:
+                info.ParticipantVersionID = event.ParticipantVersionID
+            if event.Leave:
+                self._apply_leave(key, info, {_key(jid) for jid in event.Leave})
+            for jid in event.Join:
+                participant = info.Participants.add(
+                    IsAdmin=False, IsSuperAdmin=False, DisplayName="", Error=0
+                )
+                participant.JID.CopyFrom(jid)
+                participant.LID.CopyFrom(
+                    JID(
+                        User="",
+                        RawAgent=0,
+                        Device=0,
+                        Integrator=0,
+                        Server="",
+                        IsEmpty=True,
+                    )
+                )
+                self._add_participant(
+                    key, participant, self._admins[key], self._members[key]
+                )
+            if event.Promote or event.Demote:
+                self._apply_roles(key, info, event.Promote, event.Demote)
+
+    def _apply_leave(self, key: str, info: GroupInfo, left: Set[str]):
+        members, admins = self._members[key], self._admins[key]
+        for i in reversed(range(len(info.Participants))):
+            keys = _participant_keys(info.Participants[i])
+            if not left.intersection(keys):
+                continue
+            del info.Participants[i]
+            for user in keys:
+                members.discard(user)
+                admins.discard(user)
+                groups = self._user_groups.get(user)
+                if groups is not None:
+                    groups.discard(key)
+
+    def _apply_roles(
+        self, key: str, info: GroupInfo, promote: Iterable[JID], demote: Iterable[JID]
+    ):
+        promoted = {_key(jid) for jid in promote}
+        demoted = {_key(jid) for jid in demote}
+        admins = self._admins[key]
+        for participant in info.Participants:
+            keys = _participant_keys(participant)
+            if promoted.intersection(keys):
+                participant.IsAdmin = True
+                admins.update(keys)
+            elif demoted.intersection(keys):
+                participant.IsAdmin = False
+                participant.IsSuperAdmin = False
+                admins.difference_update(keys)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, Deque, Dict, Optional, Union
+
+from ._binder import gocode
+from .exc import ConnectError
+from .utils import log
+
+if TYPE_CHECKING:
+    from .client import ClientFactory, NewClient
+
+
+def _seconds(value: Union[timedelta, float, None]) -> Optional[float]:
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return value
+
+
+@dataclass
+class HibernationStats:
+    hibernated: int
+    awake: int
+    memory_saved: int
+    wake_count: int
+    wake_latency_avg: float
+    wake_latency_max: float
+
+
+class Hibernation:
+    def __init__(self, client_factory: ClientFactory) -> None:
+        """
+        Disconnects idle sessions of a :class:`ClientFactory` and wakes them on demand.
+        Hibernation is disabled until :meth:`enable` is called.
+
+        :param client_factory: The factory whose clients are managed.
+        :type client_factory: ClientFactory
+        """
+        self.client_factory = client_factory
+        self.idle_timeout: Optional[float] = None
+        self.drain_interval: Optional[float] = None
+        self.wake_timeout = 30.0
+        self.memory_saved = 0
+        self.wake_latencies: Deque[float] = deque(maxlen=512)
+        self._hibernated_at: Dict[bytes, float] = {}
+        self._locks: Dict[bytes, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def enable(
+        self,
+        idle_timeout: Union[timedelta, float],
+        drain_interval: Union[timedelta, float, None] = None,
+        wake_timeout: Union[timedelta, float] = 30.0,
+        check_interval: float = 1.0,
+    ):
+        """
+        Starts hibernating sessions that had no inbound or outbound traffic for ``idle_timeout``.
+
+        :param idle_timeout: Idle period after which a session is disconnected.
+        :type idle_timeout: Union[timedelta, float]
+        :param drain_interval: If set, hibernated sessions are woken on this period to receive offline messages, defaults to None
+        :type drain_interval: Union[timedelta, float, None], optional
+        :param wake_timeout: Maximum time an outbound call waits for a session to wake, defaults to 30 seconds
+        :type wake_timeout: Union[timedelta, float], optional
+        :param check_interval: Seconds between idle checks, defaults to 1.0
+        :type check_interval: float, optional
+        """
+        self.idle_timeout = _seconds(idle_timeout)
+        self.drain_interval = _seconds(drain_interval)
+        self.wake_timeout = _seconds(wake_timeout) or 0.0
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(check_interval,),
+                daemon=True,
+                name="snakechat-hibernation",
+            )
+            self._thread.start()
+
+    def disable(self):
+        """Stops hibernating sessions and wakes every session that is currently hibernated."""
+        self._stop.set()
+        self._thread = None
+        for client in list(self.client_factory.clients):
+            if client.hibernated:
+                self.wake(client)
+
+    def hibernate(self, client: NewClient) -> int:
+        """
+        Disconnects a session and returns the memory released to the OS, in bytes.
+
+        :param client: The session to hibernate.
+        :type client: NewClient
+        :return: Bytes released by the Go runtime after the disconnect.
+        :rtype: int
+        """
+        with self._client_lock(client):
+            if client.hibernated:
+                return 0
+            before = gocode.MemoryInUse()
+            client.hibernated = True
+            client.disconnect()
+            self._hibernated_at[client.uuid] = time.monotonic()
+            saved = max(0, before - gocode.ReleaseMemory())
+            self.memory_saved += saved
+        log.debug("💤 Session %s hibernated, %d bytes released", client.uuid, saved)
+        return saved
+
+    def wake(self, client: NewClient) -> float:
+        """
+        Reconnects a hibernated session and waits until it is logged in again.
+
+        :param client: The session to wake.
+        :type client: NewClient
+        :raises ConnectError: If the session is not logged in after ``wake_timeout``, it stays hibernated.
+        :return: The wake latency in seconds, 0 if the session was awake already.
+        :rtype: float
+        """
+        with self._client_lock(client):
+            if not client.hibernated:
+                return 0.0
+            start = time.monotonic()
+            client.reconnect()
+            deadline = start + self.wake_timeout
+            while not client.is_logged_in and time.monotonic() < deadline:
+                time.sleep(0.01)
+            latency = time.monotonic() - start
+            if not client.is_logged_in:
+                # drop the half-open connection, the next outbound call tries again
+                client.disconnect()
+                raise ConnectError(
+                    f"session {client.uuid} did not wake up within {self.wake_timeout}s"
+                )
+            client.hibernated = False
+            client.last_activity = time.monotonic()
+            self._hibernated_at.pop(client.uuid, None)
+            self.wake_latencies.append(latency)
+        log.debug("⏰ Session %s woke up in %.3fs", client.uuid, latency)
+        return latency
+
+    def _client_lock(self, client: NewClient) -> threading.Lock:
+        return self._locks.setdefault(client.uuid, threading.Lock())
+
+    def on_outbound(self, client: NewClient):
+        if client.hibernated:
+            self.wake(client)
+
+    def stats(self) -> HibernationStats:
+        latencies = list(self.wake_latencies)
+        hibernated = sum(1 for c in self.client_factory.clients if c.hibernated)
+        return HibernationStats(
+            hibernated=hibernated,
+            awake=len(self.client_factory.clients) - hibernated,
+            memory_saved=self.memory_saved,
+            wake_count=len(latencies),
+            wake_latency_avg=sum(latencies) / len(latencies) if latencies else 0.0,
+            wake_latency_max=max(latencies, default=0.0),
+        )
+
+    def _run(self, check_interval: float):
+        while not self._stop.wait(check_interval):
+            now = time.monotonic()
+            for client in list(self.client_factory.clients):
+                try:
+                    if client.hibernated:
+                        since = self._hibernated_at.get(client.uuid, now)
+                        if self.drain_interval and now - since >= self.drain_interval:
+                            self.wake(client)
+                    elif (
+                        self.idle_timeout is not None
+                        and now - client.last_activity >= self.idle_timeout
+                        and client.is_connected
+                    ):
+                        self.hibernate(client)
+                except Exception as e:
+                    log.warning("Hibernation check failed for %s: %s", client.uuid, e)
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional, Tuple
+
+from .utils import log
+from .utils.enum import EventPriority
+
+# event codes of EVENT_TO_INT, codes missing here are NORMAL
+DEFAULT_LANES: Dict[int, EventPriority] = {
+    **{code: EventPriority.CONTROL for code in range(1, 13)},
+    18: EventPriority.LOW,  # Receipt
+    19: EventPriority.LOW,  # ChatPresence
+    20: EventPriority.LOW,  # Presence
+}
+
+# events split in chunks that only make sense in order: OfflineBatch and HistorySyncChunk
+ORDERED_EVENTS: FrozenSet[int] = frozenset({44, 45})
+
+
+@dataclass
+class LaneStats:
+    queued: Dict[EventPriority, int]
+    dispatched: Dict[EventPriority, int]
+    shed: Dict[EventPriority, int]
+    oldest_wait: float
+    ordered: int
+
+
+class EventLanes:
+    def __init__(self, deliver: Callable[[int, bytes], None]) -> None:
+        """
+        Priority lanes between Go callbacks and event handlers. Once enabled, events are queued
+        by lane and handled by a fixed set of worker threads that always drain the highest lane
+        first, so ``NORMAL`` and ``LOW`` handlers run concurrently and may finish out of order.
+        ``CONTROL`` events bypass the queues and are handled on arrival. Chunked events, see
+        ``ORDERED_EVENTS``, go to a single extra worker that handles them one at a time in
+        arrival order and never sheds them. When the backlog passes the threshold of a lane, the
+        oldest events of that lane are dropped. Lanes are disabled until :meth:`enable` is called.
+
+        :param deliver: Decodes and dispatches a raw event.
+        :type deliver: Callable[[int, bytes], None]
+        """
+        self.deliver = deliver
+        self.lanes: Dict[int, EventPriority] = dict(DEFAULT_LANES)
+        self.shed_thresholds: Dict[EventPriority, Optional[int]] = {}
+        self.ordered: FrozenSet[int] = ORDERED_EVENTS
+        self._ordered: Deque[Tuple[int, bytes]] = deque()
+        self._ordered_cond = threading.Condition()
+        self._ordered_worker: Optional[threading.Thread] = None
+        self._queues: Dict[EventPriority, Deque[Tuple[float, int, bytes]]] = {
+            priority: deque() for priority in EventPriority
+        }
+        self._dispatched = {priority: 0 for priority in EventPriority}
+        self._shed = {priority: 0 for priority in EventPriority}
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._stop = False
+        self._ordered_stop = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def enable(
+        self,
+        workers: int = 4,
+        shed_low: Optional[int] = 2_000,
+        shed_normal: Optional[int] = None,
+        lanes: Optional[Dict[int, EventPriority]] = None,
+    ):
+        """
+        Starts dispatching events through the lanes.
+
+        :param workers: Threads running handlers besides the one of the ordered events, defaults to 4
+        :type workers: int, optional
+        :param shed_low: Backlog above which ``LOW`` events are shed, None never sheds them, defaults to 2000
+        :type shed_low: Optional[int], optional
+        :param shed_normal: Backlog above which ``NORMAL`` events are shed, None never sheds them, defaults to None
+        :type shed_normal: Optional[int], optional
+        :param lanes: Lane overrides by event code, defaults to None
+        :type lanes: Optional[Dict[int, EventPriority]], optional
+        """
+        with self._cond:
+            if lanes:
+                self.lanes.update(lanes)
+            self.shed_thresholds = {
+                EventPriority.LOW: shed_low,
+                EventPriority.NORMAL: shed_normal,
+            }
+            self._stop = False
+            while len(self._workers) < workers:
+                worker = threading.Thread(
+                    target=self._run,
+                    daemon=True,
+                    name=f"snakechat-events-{len(self._workers)}",
+                )
+                self._workers.append(worker)
+                worker.start()
+        with self._ordered_cond:
+            self._ordered_stop = False
+            if self._ordered_worker is None:
+                self._ordered_worker = threading.Thread(
+                    target=self._run_ordered,
+                    daemon=True,
+                    name="snakechat-events-ordered",
+                )
+                self._ordered_worker.start()
+
+    def disable(self):
+        """Stops the workers after they delivered every queued event."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            workers, self._workers = self._workers, []
+        with self._ordered_cond:
+            self._ordered_stop = True
+            self._ordered_cond.notify_all()
+            if self._ordered_worker is not None:
+                workers.append(self._ordered_worker)
+                self._ordered_worker = None
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join()
+
+    def submit(self, code: int, data: bytes) -> bool:
+        """
+        Queues an event in its lane.
+
+        :param code: The event code.
+        :type code: int
+        :param data: The serialized event.
+        :type data: bytes
+        :return: False if the event must be delivered by the caller right away.
+        :rtype: bool
+        """
+        priority = self.lanes.get(code, EventPriority.NORMAL)
+        if priority == EventPriority.CONTROL or not self._workers:
+            return False
+        if code in self.ordered:
+            with self._ordered_cond:
+                self._ordered.append((code, data))
+                self._ordered_cond.notify()
+            return True
+        with self._cond:
+            self._queues[priority].append((time.monotonic(), code, data))
+            self._shed_overload()
+            self._cond.notify()
+        return True
+
+    def stats(self) -> LaneStats:
+        with self._cond:
+            now = time.monotonic()
+            heads = [queue[0][0] for queue in self._queues.values() if queue]
+            return LaneStats(
+                queued={p: len(q) for p, q in self._queues.items()},
+                dispatched=dict(self._dispatched),
+                shed=dict(self._shed),
+                oldest_wait=now - min(heads) if heads else 0.0,
+                ordered=len(self._ordered),
+            )
+
+    def _shed_overload(self):
+        backlog = self.backlog
+        # the lowest lanes are shed first
+        for priority in sorted(EventPriority, reverse=True):
+            threshold = self.shed_thresholds.get(priority)
+            if threshold is None:
+                continue
+            queue = self._queues[priority]
+            while backlog > threshold and queue:
+                queue.popleft()
+                self._shed[priority] += 1
+                backlog -= 1
+
+    def _next(self) -> Optional[Tuple[EventPriority, int, bytes]]:
+        with self._cond:
+            while True:
+                for priority, queue in self._queues.items():
+                    if queue:
+                        _, code, data = queue.popleft()
+                        self._dispatched[priority] += 1
+                        return priority, code, data
+                if self._stop:
+                    return None
+                self._cond.wait()
+
+    def _next_ordered(self) -> Optional[Tuple[int, bytes]]:
+        with self._ordered_cond:
+            while not self._ordered:
+                if self._ordered_stop:
+                    return None
+                self._ordered_cond.wait()
+            return self._ordered.popleft()
+
+    def _run_ordered(self):
+        while True:
+            item = self._next_ordered()
+            if item is None:
+                return
+            code, data = item
+            try:
+                self.deliver(code, data)
+            except Exception as e:
+                log.exception("Event handler for code %d failed: %s", code, e)
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            _, code, data = item
+            try:
+                self.deliver(code, data)
+            except Exception as e:
+                log.exception("Event handler for code %d failed: %s", code, e)
@@ -0,0 +1,464 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from .exc import OutboxCommitError
+from .proto.snakechat_pb2 import JID
+from .proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from .utils import log
+from .utils.enum import OutboxState
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+PENDING_STATES = (OutboxState.QUEUED, OutboxState.SENDING, OutboxState.RETRY)
+
+# IDs of messages lost to a failed commit that state() still reports as FAILED
+MAX_LOST = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    recipient BLOB NOT NULL,
+    message BLOB NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_state ON outbox (state);
+"""
+
+
+def _seconds(value: Union[timedelta, float]) -> float:
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+@dataclass
+class OutboxStats:
+    queued: int
+    in_flight: int
+    sent: int
+    retried: int
+    failed: int
+    pending_writes: int
+
+
+class _Entry:
+    __slots__ = ("id", "to", "message", "attempts", "link_preview")
+
+    def __init__(
+        self,
+        id: str,
+        to: bytes,
+        message: bytes,
+        attempts: int = 0,
+        link_preview: bool = False,
+    ) -> None:
+        self.id = id
+        self.to = to
+        self.message = message
+        self.attempts = attempts
+        # the preview is fetched by the sender thread, not by the caller of enqueue
+        self.link_preview = link_preview
+
+
+class Outbox:
+    def __init__(
+        self,
+        client: NewClient,
+        path: str = "outbox.db",
+        workers: int = 4,
+        max_attempts: int = 10,
+        base_delay: Union[timedelta, float] = 1.0,
+        max_delay: Union[timedelta, float] = 300.0,
+        flush_interval: Union[timedelta, float] = 0.05,
+    ) -> None:
+        """
+        Durable outbound queue backed by SQLite. Every message gets its ID before it is
+        persisted, so a retry after a crash or a failed attempt reuses the same ID and the
+        server drops the duplicate instead of delivering it twice.
+
+        Writes are group-committed by a single writer thread, :meth:`enqueue` never touches
+        the disk. A message is handed to the workers only once the batch holding it is
+        committed, call :meth:`flush` to wait for that.
+
+        :param client: The client used to send the messages.
+        :type client: NewClient
+        :param path: Path of the SQLite database, defaults to "outbox.db"
+        :type path: str, optional
+        :param workers: Number of sender threads, defaults to 4
+        :type workers: int, optional
+        :param max_attempts: Attempts before a message is marked as failed, defaults to 10
+        :type max_attempts: int, optional
+        :param base_delay: Delay before the first retry, doubled on every failure, defaults to 1 second
+        :type base_delay: Union[timedelta, float], optional
+        :param max_delay: Upper bound of the retry delay, defaults to 300 seconds
+        :type max_delay: Union[timedelta, float], optional
+        :param flush_interval: Maximum time a write waits to be group-committed, defaults to 0.05 seconds
+        :type flush_interval: Union[timedelta, float], optional
+        """
+        self.client = client
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = _seconds(base_delay)
+        self.max_delay = _seconds(max_delay)
+        self.flush_interval = _seconds(flush_interval)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._states: Dict[str, OutboxState] = {}
+        self._lost: OrderedDict[str, None] = OrderedDict()
+        self._writes: queue.SimpleQueue = queue.SimpleQueue()
+        self._ready: List[Tuple[float, int, _Entry]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._committed = threading.Condition()
+        self._write_seq = 0
+        self._commit_seq = 0
+        self._commit_error: Optional[Exception] = None
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+
+    def start(self):
+        """Reloads the messages left pending by a previous run and starts the writer and sender threads."""
+        if self._threads:
+            return
+        self._stop.clear()
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id, recipient, message, attempts, next_attempt FROM outbox "
+                "WHERE state IN (?, ?, ?)",
+                tuple(state.value for state in PENDING_STATES),
+            ).fetchall()
+        now, wall = time.monotonic(), time.time()
+        with self._cond:
+            for id, to, message, attempts, next_attempt in rows:
+                self._states[id] = OutboxState.RETRY if attempts else OutboxState.QUEUED
+                due = now + max(0.0, next_attempt - wall)
+                entry = _Entry(id, to, message, attempts)
+                heapq.heappush(self._ready, (due, next(self._seq), entry))
+        if rows:
+            log.info("📤 Recovered %d pending outbox messages", len(rows))
+        self._threads.append(
+            threading.Thread(
+                target=self._write_loop, daemon=True, name="snakechat-outbox-writer"
+            )
+        )
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(
+                    target=self._send_loop, daemon=True, name=f"snakechat-outbox-{i}"
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops the sender threads and commits every pending write. Messages that are not sent
+        yet stay in the database and are picked up by the next :meth:`start`.
+
+        :param timeout: Maximum time to wait for each thread, defaults to None
+        :type timeout: Optional[float], optional
+        """
+        if not self._threads:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        writer, *senders = self._threads
+        for thread in senders:
+            thread.join(timeout)
+        self._writes.put(None)
+        writer.join(timeout)
+        self._threads.clear()
+
+    def enqueue(
+        self,
+        to: JID,
+        message: Union[Message, str],
+        message_id: Optional[str] = None,
+        link_preview: bool = False,
+    ) -> str:
+        """
+        Queues a message for delivery and returns its ID right away.
+
+        :param to: The recipient.
+        :type to: JID
+        :param message: The message, a string is turned into a text message.
+        :type message: Union[Message, str]
+        :param message_id: A message ID to use instead of a newly generated one, defaults to None
+        :type message_id: Optional[str], optional
+        :param link_preview: Whether a text message gets a link preview, fetched by a sender thread
+            before the first attempt; a message recovered by :meth:`start` before that is sent
+            without one, defaults to False
+        :type link_preview: bool, optional
+        :return: The message ID, stable across retries and restarts.
+        :rtype: str
+        """
+        preview = isinstance(message, str) and link_preview
+        if isinstance(message, str):
+            message = self.client.build_text_message(message)
+        entry = _Entry(
+            message_id or self.client.generate_message_id(),
+            to.SerializeToString(),
+            message.SerializeToString(),
+            link_preview=preview,
+        )
+        self._states[entry.id] = OutboxState.QUEUED
+        self._write((OutboxState.QUEUED, entry, None, 0.0))
+        return entry.id
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every write issued so far is committed.
+
+        :param timeout: Maximum time to wait, defaults to None
+        :type timeout: Optional[float], optional
+        :raises OutboxCommitError: A commit failed since the last flush, its new messages are marked as failed.
+        :return: True if everything was committed in time.
+        :rtype: bool
+        """
+        with self._committed:
+            target = self._write_seq
+            done = self._committed.wait_for(
+                lambda: self._commit_seq >= target, timeout
+            )
+            error, self._commit_error = self._commit_error, None
+        if error is not None:
+            raise OutboxCommitError(error) from error
+        return done
+
+    def state(self, message_id: str) -> Optional[OutboxState]:
+        """
+        Returns the delivery state of a message, None if the outbox does not know it.
+
+        :param message_id: The message ID returned by :meth:`enqueue`.
+        :type message_id: str
+        :return: The delivery state.
+        :rtype: Optional[OutboxState]
+        """
+        state = self._states.get(message_id)
+        if state is not None:
+            return state
+        if message_id in self._lost:
+            return OutboxState.FAILED
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT state FROM outbox WHERE id = ?", (message_id,)
+            ).fetchone()
+        return OutboxState(row[0]) if row else None
+
+    def purge(self, older_than: Union[timedelta, float] = 0.0) -> int:
+        """
+        Deletes sent and failed messages from the database.
+
+        :param older_than: Only delete messages last updated before this long ago, defaults to 0
+        :type older_than: Union[timedelta, float], optional
+        :return: The number of deleted rows.
+        :rtype: int
+        """
+        cutoff = time.time() - _seconds(older_than)
+        with self._db_lock:
+            with self._db:
+                deleted = self._db.execute(
+                    "DELETE FROM outbox WHERE state IN (?, ?) AND updated <= ?",
+                    (OutboxState.SENT.value, OutboxState.FAILED.value, cutoff),
+                ).rowcount
+        return deleted
+
+    def stats(self) -> OutboxStats:
+        with self._cond:
+            queued = len(self._ready)
+            in_flight = self._in_flight
+        return OutboxStats(
+            queued=queued,
+            in_flight=in_flight,
+            sent=self.sent,
+            retried=self.retried,
+            failed=self.failed,
+            pending_writes=self._write_seq - self._commit_seq,
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _update(
+        self,
+        state: OutboxState,
+        entry: _Entry,
+        error: Optional[str] = None,
+        delay: float = 0.0,
+    ):
+        self._states[entry.id] = state
+        self._write((state, entry, error, delay))
+
+    def _write(self, item: tuple):
+        with self._committed:
+            self._write_seq += 1
+        self._writes.put(item)
+
+    def _commit(self, batch: list):
+        wall = time.time()
+        inserts, updates = [], []
+        for state, entry, error, delay in batch:
+            if state is OutboxState.QUEUED:
+                inserts.append(
+                    (entry.id, entry.to, entry.message, state.value, wall, wall, wall)
+                )
+            else:
+                updates.append(
+                    (
+                        state.value,
+                        entry.message,
+                        entry.attempts,
+                        wall + delay,
+                        error,
+                        wall,
+                        entry.id,
+                    )
+                )
+        with self._db_lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO outbox (id, recipient, message, state, "
+                    "next_attempt, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    inserts,
+                )
+                self._db.executemany(
+                    "UPDATE outbox SET state = ?, message = ?, attempts = ?, "
+                    "next_attempt = ?, last_error = ?, updated = ? WHERE id = ?",
+                    updates,
+                )
+        now = time.monotonic()
+        with self._cond:
+            for state, entry, _, _ in batch:
+                if state is OutboxState.QUEUED:
+                    heapq.heappush(self._ready, (now, next(self._seq), entry))
+                elif state in (OutboxState.SENT, OutboxState.FAILED):
+                    self._states.pop(entry.id, None)
+            self._cond.notify_all()
+
+    def _fail(self, batch: list, error: Exception):
+        # messages whose insert was lost are never sent, updates of stored rows only lose
+        # their state change and the row is picked up again by the next start
+        lost = 0
+        for state, entry, _, _ in batch:
+            if state is OutboxState.QUEUED:
+                self._lost[entry.id] = None
+                lost += 1
+            if state in (OutboxState.QUEUED, OutboxState.SENT, OutboxState.FAILED):
+                self._states.pop(entry.id, None)
+        while len(self._lost) > MAX_LOST:
+            self._lost.popitem(last=False)
+        self.failed += lost
+        with self._committed:
+            self._commit_error = error
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            batch = [] if item is None else [item]
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                try:
+                    remaining = max(0.0, deadline - time.monotonic())
+                    item = self._writes.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is not None:
+                    batch.append(item)
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    log.exception("Outbox commit of %d writes failed: %s", len(batch), e)
+                    self._fail(batch, e)
+            with self._committed:
+                self._commit_seq += len(batch)
+                self._committed.notify_all()
+            if item is None:
+                return
+
+    def _next(self) -> Optional[_Entry]:
+        with self._cond:
+            while not self._stop.is_set():
+                if self._ready:
+                    due = self._ready[0][0]
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        self._in_flight += 1
+                        return heapq.heappop(self._ready)[2]
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+        return None
+
+    def _send_loop(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            try:
+                self._send(entry)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+
+    def _send(self, entry: _Entry):
+        entry.attempts += 1
+        try:
+            if entry.link_preview:
+                message = Message.FromString(entry.message)
+                text = message.conversation or message.extendedTextMessage.text
+                entry.message = self.client.build_text_message(
+                    text, True
+                ).SerializeToString()
+                entry.link_preview = False
+            self._update(OutboxState.SENDING, entry)
+            self.client.send_message(
+                JID.FromString(entry.to),
+                Message.FromString(entry.message),
+                message_id=entry.id,
+            )
+        except Exception as e:
+            if entry.attempts >= self.max_attempts:
+                self.failed += 1
+                self._update(OutboxState.FAILED, entry, str(e))
+                log.warning("📤 Outbox message %s failed for good: %s", entry.id, e)
+                return
+            delay = self._backoff(entry.attempts)
+            self.retried += 1
+            self._update(OutboxState.RETRY, entry, str(e), delay)
+            with self._cond:
+                heapq.heappush(
+                    self._ready, (time.monotonic() + delay, next(self._seq), entry)
+                )
+                self._cond.notify()
+            return
+        self.sent += 1
+        self._update(OutboxState.SENT, entry)
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Union
+
+from .events import (
+    ConnectFailureEv,
+    DisconnectedEv,
+    LoggedOutEv,
+    StreamReplacedEv,
+    TemporaryBanEv,
+)
+from .exc import NoSessionAvailableError
+from .proto.snakechat_pb2 import JID, SendResponse
+from .proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from .utils import log
+from .utils.enum import RoutingStrategy, SendPriority, SessionHealth
+
+if TYPE_CHECKING:
+    from .client import ClientFactory, NewClient
+
+AVAILABLE_HEALTH = frozenset(
+    {SessionHealth.HEALTHY, SessionHealth.DEGRADED, SessionHealth.HIBERNATED}
+)
+
+
+@dataclass
+class SessionLoad:
+    queued: int
+    in_flight: int
+    sent: int
+    available: bool
+
+
+@dataclass
+class PoolStats:
+    sessions: Dict[str, SessionLoad]
+    sent: int
+    failed: int
+    rebalanced: int
+
+
+class _Job:
+    __slots__ = ("to", "message", "kwargs", "future", "attempts", "tried")
+
+    def __init__(self, to: JID, message: Union[Message, str], kwargs: dict) -> None:
+        self.to = to
+        self.message = message
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.attempts = 0
+        self.tried: List[bytes] = []
+
+
+class _Lane:
+    __slots__ = ("client", "jobs", "in_flight", "sent", "threads")
+
+    def __init__(self, client: NewClient) -> None:
+        self.client = client
+        self.jobs: Deque[_Job] = deque()
+        self.in_flight = 0
+        self.sent = 0
+        self.threads: List[threading.Thread] = []
+
+
+class SessionPool:
+    def __init__(self, client_factory: ClientFactory) -> None:
+        """
+        Spreads outbound messages over the sessions of a :class:`ClientFactory`. Each session
+        gets its own queue drained by ``concurrency`` sender threads, so throughput grows with
+        the number of attached numbers. Disabled until :meth:`enable` is called.
+
+        A message whose send fails while its session drops is moved to another session. That
+        session is a different sender, so if the first attempt did reach the server the
+        recipient gets the message twice.
+
+        :param client_factory: The factory whose sessions send the messages.
+        :type client_factory: ClientFactory
+        """
+        self.client_factory = client_factory
+        self.strategy = RoutingStrategy.LEAST_LOADED
+        self.concurrency = 2
+        self.max_attempts = 3
+        self.max_sticky = 100_000
+        self.failed = 0
+        self.rebalanced = 0
+        self._lanes: Dict[bytes, _Lane] = {}
+        self._sticky: OrderedDict[str, bytes] = OrderedDict()
+        self._cursor = 0
+        self._cond = threading.Condition()
+        self._running = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._running
+
+    def enable(
+        self,
+        strategy: RoutingStrategy = RoutingStrategy.LEAST_LOADED,
+        concurrency: int = 2,
+        max_attempts: int = 3,
+        max_sticky: int = 100_000,
+    ):
+        """
+        Starts the sender threads of every session. Must be called before :meth:`ClientFactory.run`
+        so the disconnect events are subscribed.
+
+        :param strategy: How the sending session is picked, defaults to RoutingStrategy.LEAST_LOADED
+        :type strategy: RoutingStrategy, optional
+        :param concurrency: Sender threads per session, defaults to 2
+        :type concurrency: int, optional
+        :param max_attempts: Sessions a message is tried on before its future fails, defaults to 3
+        :type max_attempts: int, optional
+        :param max_sticky: Recipients remembered by the sticky strategy, defaults to 100000
+        :type max_sticky: int, optional
+        """
+        self.strategy = strategy
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.max_sticky = max_sticky
+        self._running = True
+        for client in self.client_factory.clients:
+            self.attach(client)
+
+    def disable(self):
+        """Stops the sender threads once their current send is done. Queued messages fail."""
+        with self._cond:
+            self._running = False
+            jobs = [job for lane in self._lanes.values() for job in lane.jobs]
+            for lane in self._lanes.values():
+                lane.jobs.clear()
+                lane.threads.clear()
+            self._cond.notify_all()
+        for job in jobs:
+            job.future.set_exception(NoSessionAvailableError("session pool disabled"))
+
+    def attach(self, client: NewClient):
+        """
+        Adds a session to the pool. Called by :meth:`enable` and by :meth:`ClientFactory.new_client`.
+
+        :param client: The session to add.
+        :type client: NewClient
+        """
+        with self._cond:
+            lane = self._lanes.get(client.uuid)
+            if lane is None:
+                lane = self._lanes[client.uuid] = _Lane(client)
+                client.event.add_listener(DisconnectedEv, self._on_dropped)
+                client.event.add_listener(LoggedOutEv, self._on_dropped)
+                client.event.add_listener(StreamReplacedEv, self._on_dropped)
+                client.event.add_listener(ConnectFailureEv, self._on_dropped)
+                client.event.add_listener(TemporaryBanEv, self._on_dropped)
+            while len(lane.threads) < self.concurrency:
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(lane,),
+                    daemon=True,
+                    name=f"snakechat-pool-{client.uuid.decode()}-{len(lane.threads)}",
+                )
+                lane.threads.append(thread)
+                thread.start()
+
+    def is_available(self, client: NewClient) -> bool:
+        """
+        Tells whether a session can take new messages: it is connected (or hibernated and
+        able to wake) and the server is not throttling it.
+
+        :param client: The session.
+        :type client: NewClient
+        :return: True if the session can send.
+        :rtype: bool
+        """
+        if client.scheduler.is_throttled:
+            return False
+        supervisor = self.client_factory.supervisor
+        if supervisor.enabled:
+            return supervisor.health(client) in AVAILABLE_HEALTH
+        return client.hibernated or client.is_connected
+
+    def submit(
+        self,
+        to: JID,
+        message: Union[Message, str],
+        priority: Optional[SendPriority] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """
+        Routes a message to a session and returns a future resolved with its :class:`SendResponse`.
+        A message failed over to another session may be delivered twice, see :class:`SessionPool`.
+
+        :param to: The recipient.
+        :type to: JID
+        :param message: The message, a string is sent as a text message.
+        :type message: Union[Message, str]
+        :param priority: The priority class used by the session's send scheduler, defaults to None
+        :type priority: Optional[SendPriority], optional
+        :return: A future of the send response.
+        :rtype: Future
+        """
+        job = _Job(to, message, dict(kwargs, priority=priority))
+        available = self._availability()
+        with self._cond:
+            if not self._running:
+                raise NoSessionAvailableError("session pool is not enabled")
+            self._route(job, available).jobs.append(job)
+            self._cond.notify_all()
+        return job.future
+
+    def send(
+        self,
+        to: JID,
+        message: Union[Message, str],
+        priority: Optional[SendPriority] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> SendResponse:
+        """
+        Same as :meth:`submit` but waits for the send response.
+
+        :param timeout: Maximum time to wait, defaults to None
+        :type timeout: Optional[float], optional
+        :return: The send response.
+        :rtype: SendResponse
+        """
+        return self.submit(to, message, priority, **kwargs).result(timeout)
+
+    def session_for(self, to: JID) -> Optional[NewClient]:
+        """
+        Returns the session the sticky strategy has bound to a recipient, if any.
+
+        :param to: The recipient.
+        :type to: JID
+        :return: The session or None.
+        :rtype: Optional[NewClient]
+        """
+        uuid = self._sticky.get(f"{to.User}@{to.Server}")
+        lane = self._lanes.get(uuid) if uuid else None
+        return lane.client if lane else None
+
+    def stats(self) -> PoolStats:
+        available = self._availability()
+        with self._cond:
+            sessions = {
+                uuid.decode(): SessionLoad(
+                    queued=len(lane.jobs),
+                    in_flight=lane.in_flight,
+                    sent=lane.sent,
+                    available=available.get(uuid, False),
+                )
+                for uuid, lane in self._lanes.items()
+            }
+        return PoolStats(
+            sessions=sessions,
+            sent=sum(load.sent for load in sessions.values()),
+            failed=self.failed,
+            rebalanced=self.rebalanced,
+        )
+
+    def _availability(self) -> Dict[bytes, bool]:
+        # is_available may ask Go whether a session is connected, never call it under _cond
+        lanes = list(self._lanes.values())
+        return {lane.client.uuid: self.is_available(lane.client) for lane in lanes}
+
+    @staticmethod
+    def _load(lane: _Lane) -> int:
+        return len(lane.jobs) + lane.in_flight + lane.client.scheduler.backlog
+
+    def _route(self, job: _Job, available: Dict[bytes, bool]) -> _Lane:
+        lanes = [
+            lane
+            for lane in self._lanes.values()
+            if lane.client.uuid not in job.tried and available.get(lane.client.uuid)
+        ]
+        if not lanes:
+            raise NoSessionAvailableError("no session is available to send the message")
+        if self.strategy is RoutingStrategy.ROUND_ROBIN:
+            self._cursor = (self._cursor + 1) % len(lanes)
+            return lanes[self._cursor]
+        if self.strategy is RoutingStrategy.STICKY:
+            key = f"{job.to.User}@{job.to.Server}"
+            uuid = self._sticky.get(key)
+            for lane in lanes:
+                if lane.client.uuid == uuid:
+                    self._sticky.move_to_end(key)
+                    return lane
+            lane = min(lanes, key=self._load)
+            self._sticky[key] = lane.client.uuid
+            if len(self._sticky) > self.max_sticky:
+                self._sticky.popitem(last=False)
+            return lane
+        return min(lanes, key=self._load)
+
+    def _reroute(self, jobs: List[_Job], available: Dict[bytes, bool]):
+        for job in jobs:
+            try:
+                self._route(job, available).jobs.append(job)
+            except NoSessionAvailableError as e:
+                self.failed += 1
+                job.future.set_exception(e)
+        self._cond.notify_all()
+
+    def _on_dropped(self, client: NewClient, _):
+        lane = self._lanes.get(client.uuid)
+        if lane is None or not lane.jobs:
+            return
+        available = self._availability()
+        with self._cond:
+            jobs = list(lane.jobs)
+            lane.jobs.clear()
+            self.rebalanced += len(jobs)
+            self._reroute(jobs, available)
+        log.info("🔀 Moved %d queued messages off session %s", len(jobs), client.uuid)
+
+    def _next(self, lane: _Lane) -> Optional[_Job]:
+        thread = threading.current_thread()
+        # None until checked, the check may be an FFI call and runs outside the lock
+        available: Optional[bool] = None
+        while True:
+            with self._cond:
+                if not self._running or thread not in lane.threads:
+                    return None
+                if lane.jobs and available:
+                    lane.in_flight += 1
+                    return lane.jobs.popleft()
+                if not lane.jobs or available is False:
+                    self._cond.wait(1.0)
+            available = self.is_available(lane.client) if lane.jobs else None
+
+    def _run(self, lane: _Lane):
+        while True:
+            job = self._next(lane)
+            if job is None:
+                return
+            job.attempts += 1
+            job.tried.append(lane.client.uuid)
+            try:
+                if not job.kwargs.get("message_id"):
+                    # one ID per job for tracking; the server only dedupes per sender, so it
+                    # does not make a failover to another session idempotent
+                    job.kwargs["message_id"] = lane.client.generate_message_id()
+                response = lane.client.send_message(job.to, job.message, **job.kwargs)
+            except Exception as e:
+                available = self._availability()
+                with self._cond:
+                    lane.in_flight -= 1
+                    if job.attempts < self.max_attempts and not available.get(
+                        lane.client.uuid
+                    ):
+                        self.rebalanced += 1
+                        self._reroute([job], available)
+                        continue
+                    self.failed += 1
+                job.future.set_exception(e)
+                continue
+            with self._cond:
+                lane.in_flight -= 1
+                lane.sent += 1
+            job.future.set_result(response)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from .ratelimit import TokenBucket
+from .utils import log
+from .utils.enum import ChatPresence, ChatPresenceMedia
+from .utils.jid import JIDLike, JIDValue, as_jid
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+# recipients drop a composing state after about 25 seconds without a refresh
+DEFAULT_REFRESH = 10.0
+
+
+@dataclass
+class _ChatTyping:
+    chat: JIDLike
+    media: ChatPresenceMedia
+    holders: int = 0
+    # the state the chat was last sent, None before anything was sent
+    sent: Optional[ChatPresence] = None
+    sent_media: Optional[ChatPresenceMedia] = None
+    refresh_at: float = 0.0
+
+
+@dataclass
+class TypingStats:
+    typing: int
+    sent: int
+    coalesced: int
+    throttled: int
+
+
+class TypingIndicator:
+    def __init__(
+        self,
+        client: NewClient,
+        refresh: float = DEFAULT_REFRESH,
+        max_per_second: float = 5.0,
+    ) -> None:
+        """
+        Shows "typing…" in chats while code runs, see :meth:`NewClient.typing`. Every chat has a
+        count of the blocks typing in it; one thread sends ``composing`` when the first block
+        starts, refreshes it every ``refresh`` seconds and sends ``paused`` when the last block
+        ends. A block that ends before its ``composing`` was sent sends nothing. All presence
+        updates share a budget of ``max_per_second``.
+
+        :param client: The client sending the presence updates.
+        :type client: NewClient
+        :param refresh: Seconds between two ``composing`` updates of a chat, defaults to 10.0
+        :type refresh: float, optional
+        :param max_per_second: Presence updates per second across chats, defaults to 5.0
+        :type max_per_second: float, optional
+        """
+        self.client = client
+        self.refresh = refresh
+        self.max_per_second = max_per_second
+        self._chats: Dict[str, _ChatTyping] = {}
+        self._cond = threading.Condition()
+        self._bucket = TokenBucket(max_per_second, max_per_second, time.monotonic())
+        self._worker: Optional[threading.Thread] = None
+        self._sent = 0
+        self._coalesced = 0
+        self._throttled = 0
+
+    @contextlib.contextmanager
+    def hold(
+        self,
+        chat: JIDLike,
+        media: ChatPresenceMedia = ChatPresenceMedia.CHAT_PRESENCE_MEDIA_TEXT,
+    ) -> Iterator[None]:
+        self.start(chat, media)
+        try:
+            yield
+        finally:
+            self.stop(chat)
+
+    def start(
+        self,
+        chat: JIDLike,
+        media: ChatPresenceMedia = ChatPresenceMedia.CHAT_PRESENCE_MEDIA_TEXT,
+    ):
+        """Starts typing in a chat, until a matching :meth:`stop`."""
+        key = self._key(chat)
+        with self._cond:
+            state = self._chats.get(key)
+            if state is None:
+                state = self._chats[key] = _ChatTyping(chat, media)
+            elif state.holders:
+                self._coalesced += 1
+            state.holders += 1
+            state.media = media
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, daemon=True, name="snakechat-typing"
+                )
+                self._worker.start()
+            self._cond.notify()
+
+    def stop(self, chat: JIDLike):
+        key = self._key(chat)
+        with self._cond:
+            state = self._chats.get(key)
+            if state is None or not state.holders:
+                return
+            state.holders -= 1
+            if not state.holders and state.sent is None:
+                # ended before anything was sent
+                del self._chats[key]
+                self._coalesced += 1
+            self._cond.notify()
+
+    def stats(self) -> TypingStats:
+        with self._cond:
+            return TypingStats(
+                typing=sum(1 for state in self._chats.values() if state.holders),
+                sent=self._sent,
+                coalesced=self._coalesced,
+                throttled=self._throttled,
+            )
+
+    @staticmethod
+    def _key(chat: JIDLike) -> str:
+        jid = as_jid(chat)
+        if isinstance(jid, JIDValue):
+            return jid.key
+        return f"{jid.User}@{jid.Server}"
+
+    def _due(self, now: float) -> Tuple[List[Tuple[str, ChatPresence]], float]:
+        pauses, starts, refreshes = [], [], []
+        wake = now + self.refresh
+        for key, state in self._chats.items():
+            if not state.holders:
+                pauses.append((key, ChatPresence.CHAT_PRESENCE_PAUSED))
+            elif state.sent is None or state.sent_media != state.media:
+                starts.append((key, ChatPresence.CHAT_PRESENCE_COMPOSING))
+            elif state.refresh_at <= now:
+                refreshes.append((key, ChatPresence.CHAT_PRESENCE_COMPOSING))
+            else:
+                wake = min(wake, state.refresh_at)
+        return pauses + starts + refreshes, wake
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due, wake = self._due(now)
+                if not due:
+                    self._cond.wait(wake - now)
+                    continue
+                key, presence = due[0]
+                if not self._bucket.take(now):
+                    self._throttled += 1
+                    self._cond.wait(self._bucket.wait_time(now))
+                    continue
+                state = self._chats[key]
+                media = state.media
+                if presence == ChatPresence.CHAT_PRESENCE_PAUSED:
+                    del self._chats[key]
+                else:
+                    state.sent = presence
+                    state.sent_media = media
+                    state.refresh_at = now + self.refresh
+                self._sent += 1
+            try:
+                err = self.client.send_chat_presence(state.chat, presence, media)
+                if err:
+                    log.debug("Sending chat presence failed: %s", err)
+            except Exception as e:
+                log.warning("Sending chat presence failed: %s", e)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .events import IdentityChangeEv, PictureEv
+from .proto.snakechat_pb2 import (
+    JID,
+    GetProfilePictureParams,
+    GetUserInfoSingleReturnFunction,
+    ProfilePictureInfo,
+)
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+V = TypeVar("V")
+
+
+def _key(jid: JID) -> str:
+    return f"{jid.User}@{jid.Server}"
+
+
+class TTLCache(Generic[V]):
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """
+        Thread-safe LRU cache whose entries also expire ``ttl`` seconds after they were stored.
+
+        :param maxsize: Maximum number of entries, the least recently used one is evicted first.
+        :type maxsize: int
+        :param ttl: Lifetime of an entry in seconds.
+        :type ttl: float
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, Tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: V):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+@dataclass
+class ProfileCacheStats:
+    user_info_size: int
+    user_info_hit_rate: float
+    picture_size: int
+    picture_hit_rate: float
+    requests: int
+    coalesced: int
+
+
+class ProfileCache:
+    def __init__(
+        self,
+        client: NewClient,
+        maxsize: int = 10_000,
+        user_info_ttl: float = 600.0,
+        picture_ttl: float = 3600.0,
+        batch_window: float = 0.005,
+    ) -> None:
+        """
+        TTL+LRU cache for :meth:`NewClient.get_user_info` and :meth:`NewClient.get_profile_picture`,
+        keyed by the non-AD JID and invalidated by ``PictureEv`` and ``IdentityChangeEv``.
+        User info misses from concurrent callers are coalesced into a single request.
+
+        :param client: The client whose lookups are cached.
+        :type client: NewClient
+        :param maxsize: Maximum entries of each cache, defaults to 10000
+        :type maxsize: int, optional
+        :param user_info_ttl: Lifetime of a user info entry in seconds, defaults to 600
+        :type user_info_ttl: float, optional
+        :param picture_ttl: Lifetime of a profile picture entry in seconds, defaults to 3600
+        :type picture_ttl: float, optional
+        :param batch_window: Time a user info miss waits for other misses to join its request, defaults to 0.005
+        :type batch_window: float, optional
+        """
+        self.client = client
+        self.batch_window = batch_window
+        self.user_info: TTLCache[GetUserInfoSingleReturnFunction] = TTLCache(
+            maxsize, user_info_ttl
+        )
+        self.pictures: TTLCache[ProfilePictureInfo] = TTLCache(maxsize, picture_ttl)
+        self.requests = 0
+        self.coalesced = 0
+        self._pending: Dict[str, Future] = {}
+        self._batch: Dict[str, JID] = {}
+        self._collecting = False
+        self._lock = threading.Lock()
+        client.event.add_listener(PictureEv, self._on_picture)
+        client.event.add_listener(IdentityChangeEv, self._on_identity_change)
+
+    def get_user_info(
+        self, jids: Iterable[JID], refresh: bool = False
+    ) -> List[GetUserInfoSingleReturnFunction]:
+        """
+        Returns the user info of ``jids`` in the order they were given, skipping the ones the
+        server did not return. Cached entries are used unless ``refresh`` is set.
+
+        :param jids: The users.
+        :type jids: Iterable[JID]
+        :param refresh: Ask the server even for cached users, defaults to False
+        :type refresh: bool, optional
+        :return: The user info of every known user.
+        :rtype: List[GetUserInfoSingleReturnFunction]
+        """
+        keys: List[str] = []
+        results: Dict[str, Optional[GetUserInfoSingleReturnFunction]] = {}
+        missing: Dict[str, JID] = {}
+        for jid in jids:
+            key = _key(jid)
+            keys.append(key)
+            if key in results or key in missing:
+                continue
+            cached = None if refresh else self.user_info.get(key)
+            if cached is None:
+                missing[key] = jid
+            else:
+                results[key] = cached
+        if missing:
+            for key, future in self._request(missing, refresh).items():
+                results[key] = future.result()
+        return [results[key] for key in keys if results.get(key) is not None]
+
+    def get_profile_picture(
+        self, jid: JID, extra: GetProfilePictureParams, refresh: bool = False
+    ) -> ProfilePictureInfo:
+        key = f"{_key(jid)}|{int(extra.Preview)}|{int(extra.IsCommunity)}"
+        if not refresh and not extra.ExistingID:
+            cached = self.pictures.get(key)
+            if cached is not None:
+                return cached
+        picture = self.client._fetch_profile_picture(jid, extra)
+        if not extra.ExistingID:
+            self.pictures.put(key, picture)
+        return picture
+
+    def invalidate(self, jid: JID):
+        key = _key(jid)
+        self.user_info.pop(key)
+        self.pictures.pop_prefix(key + "|")
+
+    def stats(self) -> ProfileCacheStats:
+        def rate(cache: TTLCache) -> float:
+            total = cache.hits + cache.misses
+            return cache.hits / total if total else 0.0
+
+        return ProfileCacheStats(
+            user_info_size=len(self.user_info),
+            user_info_hit_rate=rate(self.user_info),
+            picture_size=len(self.pictures),
+            picture_hit_rate=rate(self.pictures),
+            requests=self.requests,
+            coalesced=self.coalesced,
+        )
+
+    def _request(self, missing: Dict[str, JID], refresh: bool) -> Dict[str, Future]:
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            for key, jid in missing.items():
+                future = self._pending.get(key)
+                # a refresh still joins a request that was not sent yet, its answer is fresh
+                if future is None or (refresh and key not in self._batch):
+                    future = Future()
+                    self._pending[key] = future
+                    self._batch[key] = jid
+                else:
+                    self.coalesced += 1
+                futures[key] = future
+            leader = bool(self._batch) and not self._collecting
+            if leader:
+                self._collecting = True
+        if leader:
+            # give concurrent handlers a moment to add their misses to this request
+            time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._batch = self._batch, {}
+                self._collecting = False
+                futures_batch = {key: self._pending[key] for key in batch}
+            self._resolve(batch, futures_batch)
+        return futures
+
+    def _resolve(self, batch: Dict[str, JID], futures: Dict[str, Future]):
+        self.requests += 1
+        try:
+            infos = self.client._fetch_user_info(list(batch.values()))
+        except Exception as e:
+            with self._lock:
+                for key in batch:
+                    if self._pending.get(key) is futures[key]:
+                        del self._pending[key]
+            for future in futures.values():
+                future.set_exception(e)
+            return
+        found = {_key(info.JID): info for info in infos if info.HasField("JID")}
+        for key, info in found.items():
+            self.user_info.put(key, info)
+        with self._lock:
+            for key in batch:
+                if self._pending.get(key) is futures[key]:
+                    del self._pending[key]
+        for key, future in futures.items():
+            future.set_result(found.get(key))
+
+    def _on_picture(self, client: NewClient, picture: PictureEv):
+        self.invalidate(picture.JID)
+
+    def _on_identity_change(self, client: NewClient, change: IdentityChangeEv):
+        self.invalidate(change.JID)
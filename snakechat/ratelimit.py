@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Deque, Dict, Iterator, List, Optional
+
+from .proto.snakechat_pb2 import JID
+from .utils import log
+from .utils.enum import SendPriority
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+RATE_LIMIT_ERRORS = ("rate-overlimit", "429")
+
+
+def is_rate_limited(error: str) -> bool:
+    """
+    Tells whether a send error means the server throttled the account.
+
+    :param error: The error returned by the server.
+    :type error: str
+    :return: True for rate-overlimit errors.
+    :rtype: bool
+    """
+    return any(marker in error for marker in RATE_LIMIT_ERRORS)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        self.refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait_time(self, now: float, needed: float = 1.0) -> float:
+        self.refill(now)
+        return max(0.0, (needed - self.tokens) / self.rate)
+
+
+@dataclass
+class SchedulerStats:
+    queued: Dict[SendPriority, int]
+    wait_avg: Dict[SendPriority, float]
+    wait_max: Dict[SendPriority, float]
+    throughput: float
+    sent: int
+    throttled: int
+    account_rate: float
+
+
+class _Waiter:
+    __slots__ = ("chat", "enqueued", "granted")
+
+    def __init__(self, chat: str, enqueued: float) -> None:
+        self.chat = chat
+        self.enqueued = enqueued
+        self.granted = threading.Event()
+
+
+class SendScheduler:
+    def __init__(self, client: NewClient) -> None:
+        """
+        Admission control in front of :meth:`NewClient.send_message`. Every send takes a token
+        from the account bucket and from the bucket of its chat, waiting senders are served by
+        priority class. Disabled until :meth:`enable` is called.
+
+        :param client: The client whose sends are scheduled.
+        :type client: NewClient
+        """
+        self.client = client
+        self.account_rate = 1.0
+        self.account_burst = 5.0
+        self.chat_rate = 0.5
+        self.chat_burst = 3.0
+        self.min_rate = 0.05
+        self.recovery = 0.02
+        self.cooldown = 5.0
+        self.bulk_reserve = 1.0
+        self.default_priority = SendPriority.NORMAL
+        self.sent = 0
+        self.throttled = 0
+        self._account: Optional[TokenBucket] = None
+        self._chats: Dict[str, TokenBucket] = {}
+        self._queues: Dict[SendPriority, Deque[_Waiter]] = {
+            priority: deque() for priority in SendPriority
+        }
+        self._waits: Dict[SendPriority, Deque[float]] = {
+            priority: deque(maxlen=1024) for priority in SendPriority
+        }
+        self._grants: Deque[float] = deque(maxlen=4096)
+        self._paused_until = 0.0
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def is_throttled(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(waiters) for waiters in self._queues.values())
+
+    def enable(
+        self,
+        account_rate: float = 1.0,
+        account_burst: float = 5.0,
+        chat_rate: float = 0.5,
+        chat_burst: float = 3.0,
+        min_rate: float = 0.05,
+        recovery: float = 0.02,
+        cooldown: float = 5.0,
+        bulk_reserve: float = 1.0,
+    ):
+        """
+        Starts scheduling the client's sends.
+
+        :param account_rate: Sustained messages per second for the whole account, defaults to 1.0
+        :type account_rate: float, optional
+        :param account_burst: Messages the account may send back to back, defaults to 5.0
+        :type account_burst: float, optional
+        :param chat_rate: Sustained messages per second to a single chat, defaults to 0.5
+        :type chat_rate: float, optional
+        :param chat_burst: Messages a single chat may receive back to back, defaults to 3.0
+        :type chat_burst: float, optional
+        :param min_rate: Floor of the account rate after repeated rate-overlimit errors, defaults to 0.05
+        :type min_rate: float, optional
+        :param recovery: Fraction of ``account_rate`` won back after every successful send, defaults to 0.02
+        :type recovery: float, optional
+        :param cooldown: Seconds every send is held back after a rate-overlimit error, defaults to 5.0
+        :type cooldown: float, optional
+        :param bulk_reserve: Account tokens bulk sends leave untouched for interactive replies, defaults to 1.0
+        :type bulk_reserve: float, optional
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.account_rate = account_rate
+            self.account_burst = account_burst
+            self.chat_rate = chat_rate
+            self.chat_burst = chat_burst
+            self.min_rate = min_rate
+            self.recovery = recovery
+            self.cooldown = cooldown
+            self.bulk_reserve = bulk_reserve
+            self._account = TokenBucket(account_rate, account_burst, now)
+            self._chats.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="snakechat-scheduler"
+                )
+                self._thread.start()
+
+    def disable(self):
+        """Stops scheduling and releases every waiting sender."""
+        with self._cond:
+            self._thread = None
+            for waiters in self._queues.values():
+                for waiter in waiters:
+                    waiter.granted.set()
+                waiters.clear()
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def priority(self, priority: SendPriority) -> Iterator[None]:
+        """
+        Sets the priority of every send made by the current thread inside the block, including
+        the ones made by helpers such as :meth:`NewClient.send_image`.
+
+        :param priority: The priority class.
+        :type priority: SendPriority
+        """
+        previous = getattr(self._local, "priority", None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def acquire(self, to: JID, priority: Optional[SendPriority] = None) -> float:
+        """
+        Blocks until a message to ``to`` may be sent.
+
+        :param to: The recipient.
+        :type to: JID
+        :param priority: The priority class, defaults to the one set by :meth:`priority`
+        :type priority: Optional[SendPriority], optional
+        :return: The time spent waiting, in seconds.
+        :rtype: float
+        """
+        if self._thread is None:
+            return 0.0
+        if priority is None:
+            priority = getattr(self._local, "priority", None)
+        if priority is None:
+            priority = self.default_priority
+        waiter = _Waiter(f"{to.User}@{to.Server}", time.monotonic())
+        with self._cond:
+            if self._thread is None:
+                return 0.0
+            self._queues[priority].append(waiter)
+            self._cond.notify()
+        waiter.granted.wait()
+        waited = time.monotonic() - waiter.enqueued
+        self._waits[priority].append(waited)
+        return waited
+
+    def on_result(self, to: JID, error: str = ""):
+        """
+        Feeds the outcome of a send back into the scheduler. Rate-overlimit errors halve the
+        account rate and pause every send for ``cooldown``, successes slowly win it back.
+
+        :param to: The recipient.
+        :type to: JID
+        :param error: The error returned by the server, empty on success.
+        :type error: str, optional
+        """
+        if self._account is None:
+            return
+        now = time.monotonic()
+        with self._cond:
+            if not error:
+                self.sent += 1
+                self._account.rate = min(
+                    self.account_rate,
+                    self._account.rate + self.account_rate * self.recovery,
+                )
+                return
+            if not is_rate_limited(error):
+                return
+            self.throttled += 1
+            self._account.rate = max(self.min_rate, self._account.rate / 2)
+            self._account.tokens = 0
+            chat = self._chats.get(f"{to.User}@{to.Server}")
+            if chat is not None:
+                chat.rate = max(self.min_rate, chat.rate / 2)
+                chat.tokens = 0
+            self._paused_until = now + self.cooldown
+            self._cond.notify()
+        log.warning(
+            "🚦 Rate limited by the server, account rate lowered to %.3f/s",
+            self._account.rate,
+        )
+
+    def stats(self) -> SchedulerStats:
+        now = time.monotonic()
+        with self._cond:
+            queued = {p: len(q) for p, q in self._queues.items()}
+            recent = sum(1 for t in self._grants if now - t <= 60)
+            rate = self._account.rate if self._account else 0.0
+        waits = {p: list(w) for p, w in self._waits.items()}
+        return SchedulerStats(
+            queued=queued,
+            wait_avg={p: sum(w) / len(w) if w else 0.0 for p, w in waits.items()},
+            wait_max={p: max(w, default=0.0) for p, w in waits.items()},
+            throughput=recent / 60,
+            sent=self.sent,
+            throttled=self.throttled,
+            account_rate=rate,
+        )
+
+    def _chat(self, chat: str, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat)
+        if bucket is None:
+            bucket = self._chats[chat] = TokenBucket(
+                self.chat_rate, self.chat_burst, now
+            )
+        return bucket
+
+    def _dispatch(self, now: float) -> float:
+        account = self._account
+        if account is None:
+            return 1.0
+        if now < self._paused_until:
+            return self._paused_until - now
+        next_due = 1.0
+        for priority in SendPriority:
+            waiters = self._queues[priority]
+            needed = 1 + (self.bulk_reserve if priority is SendPriority.BULK else 0)
+            blocked: List[_Waiter] = []
+            while waiters:
+                account_wait = account.wait_time(now, needed)
+                if account_wait > 0:
+                    waiters.extendleft(reversed(blocked))
+                    return account_wait
+                waiter = waiters.popleft()
+                bucket = self._chat(waiter.chat, now)
+                if bucket.take(now):
+                    account.tokens -= 1
+                    self._grants.append(now)
+                    waiter.granted.set()
+                else:
+                    # keep order within the chat, let other chats of this class go ahead
+                    next_due = min(next_due, bucket.wait_time(now))
+                    blocked.append(waiter)
+            waiters.extend(blocked)
+        return next_due
+
+    def _prune(self, now: float):
+        idle = [
+            chat
+            for chat, bucket in self._chats.items()
+            if bucket.wait_time(now) == 0 and bucket.tokens >= bucket.capacity
+        ]
+        for chat in idle:
+            del self._chats[chat]
+        for chat, bucket in self._chats.items():
+            bucket.rate = min(
+                self.chat_rate, bucket.rate + self.chat_rate * self.recovery
+            )
+
+    def _run(self):
+        last_prune = time.monotonic()
+        with self._cond:
+            while self._thread is threading.current_thread():
+                now = time.monotonic()
+                wait = self._dispatch(now)
+                if now - last_prune >= 60:
+                    self._prune(now)
+                    last_prune = now
+                self._cond.wait(max(0.001, wait))
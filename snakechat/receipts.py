@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .utils import log
+from .utils.enum import ReceiptType
+from .utils.jid import JIDLike, JIDValue, as_jid
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+
+def _key(jid: JIDLike) -> str:
+    jid = as_jid(jid)
+    if isinstance(jid, JIDValue):
+        return jid.key
+    return f"{jid.User}@{jid.Server}"
+
+
+@dataclass
+class _PendingReceipt:
+    chat: JIDLike
+    sender: JIDLike
+    receipt: ReceiptType
+    deadline: float
+    timestamp: int = 0
+    ids: Dict[str, None] = field(default_factory=dict)
+    # mark_read calls folded into this one
+    marks: int = 0
+
+
+@dataclass
+class ReceiptStats:
+    marks: int
+    ids: int
+    calls: int
+    failed: int
+    pending: int
+
+    @property
+    def saved(self) -> int:
+        """``mark_read`` calls avoided by coalescing."""
+        return max(0, self.marks - self.calls - self.pending)
+
+
+class ReadReceiptCoalescer:
+    def __init__(
+        self, client: NewClient, window: float = 1.0, max_ids: int = 50
+    ) -> None:
+        """
+        Buffers read marks per (chat, sender, receipt type) and sends each buffer as a single
+        :meth:`NewClient.mark_read` call once it is ``window`` seconds old or holds ``max_ids``
+        message IDs. Pending marks are sent by :meth:`flush`, which :meth:`NewClient.disconnect`
+        and :meth:`NewClient.logout` call first.
+
+        :param client: The client sending the receipts.
+        :type client: NewClient
+        :param window: Longest time a mark waits for others, defaults to 1.0
+        :type window: float, optional
+        :param max_ids: Message IDs that make a buffer flush right away, defaults to 50
+        :type max_ids: int, optional
+        """
+        self.client = client
+        self.window = window
+        self.max_ids = max_ids
+        self._pending: Dict[Tuple[str, str, ReceiptType], _PendingReceipt] = {}
+        self._cond = threading.Condition()
+        self._marks = 0
+        self._ids = 0
+        self._calls = 0
+        self._failed = 0
+        self._flusher: Optional[threading.Thread] = None
+
+    def mark(
+        self,
+        *message_ids: str,
+        chat: JIDLike,
+        sender: JIDLike,
+        receipt: ReceiptType = ReceiptType.READ,
+        timestamp: Optional[int] = None,
+    ):
+        """
+        Queues read marks, with the arguments of :meth:`NewClient.mark_read`.
+
+        :param chat: The chat of the messages.
+        :type chat: JIDLike
+        :param sender: The sender of the messages.
+        :type sender: JIDLike
+        :param receipt: The receipt type, defaults to ReceiptType.READ
+        :type receipt: ReceiptType, optional
+        :param timestamp: Time of the receipt in seconds, the latest one of a buffer is sent, defaults to now
+        :type timestamp: Optional[int], optional
+        """
+        if not message_ids:
+            return
+        key = (_key(chat), _key(sender), receipt)
+        full = None
+        with self._cond:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingReceipt(
+                    chat, sender, receipt, time.monotonic() + self.window
+                )
+                self._cond.notify()
+            pending.ids.update(dict.fromkeys(message_ids))
+            pending.timestamp = max(
+                pending.timestamp, int(time.time()) if timestamp is None else timestamp
+            )
+            pending.marks += 1
+            self._marks += 1
+            self._ids += len(message_ids)
+            if len(pending.ids) >= self.max_ids:
+                full = self._pending.pop(key)
+            self._start()
+        if full is not None:
+            self._send(full)
+
+    def flush(self):
+        """Sends every pending mark now."""
+        with self._cond:
+            pending, self._pending = list(self._pending.values()), {}
+        for receipt in pending:
+            self._send(receipt)
+
+    def stats(self) -> ReceiptStats:
+        with self._cond:
+            return ReceiptStats(
+                marks=self._marks,
+                ids=self._ids,
+                calls=self._calls,
+                failed=self._failed,
+                pending=sum(p.marks for p in self._pending.values()),
+            )
+
+    def _start(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._run, daemon=True, name="snakechat-receipts"
+            )
+            self._flusher.start()
+
+    def _send(self, pending: _PendingReceipt):
+        ids = list(pending.ids)
+        for start in range(0, len(ids), self.max_ids):
+            try:
+                self.client.mark_read(
+                    *ids[start : start + self.max_ids],
+                    chat=pending.chat,
+                    sender=pending.sender,
+                    receipt=pending.receipt,
+                    timestamp=pending.timestamp,
+                )
+            except Exception as e:
+                log.warning("Sending %d read marks failed: %s", len(ids), e)
+                with self._cond:
+                    self._failed += 1
+            with self._cond:
+                self._calls += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [k for k, p in self._pending.items() if p.deadline <= now]
+                ready: List[_PendingReceipt] = [self._pending.pop(k) for k in due]
+                if not ready:
+                    deadlines = [p.deadline for p in self._pending.values()]
+                    self._cond.wait(min(deadlines) - now if deadlines else None)
+                    continue
+            for pending in ready:
+                self._send(pending)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .events import MessageEv
+from .proto import snakechat_pb2 as snakechat_proto
+from .proto.snakechat_pb2 import MessageInfo, MessageSource, SendResponse
+from .proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from .utils import log
+from .utils.jid import JIDLike, JIDValue, as_jid
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+SPILL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spilled (
+    rowid INTEGER PRIMARY KEY,
+    chat TEXT NOT NULL,
+    id TEXT NOT NULL,
+    message BLOB NOT NULL,
+    UNIQUE (chat, id)
+);
+"""
+
+
+def _key(jid: JIDLike) -> str:
+    jid = as_jid(jid)
+    if isinstance(jid, JIDValue):
+        return jid.key
+    return f"{jid.User}@{jid.Server}"
+
+
+class RecentMessages:
+    def __init__(
+        self,
+        client: NewClient,
+        per_chat: int = 200,
+        max_bytes: int = 16 * 1024 * 1024,
+        spill_path: Optional[str] = None,
+        spill_max: int = 100_000,
+    ) -> None:
+        """
+        Bounded buffer of the last messages received and sent in every chat, so a message can be
+        replied to, edited or revoked knowing only its chat and ID. Messages are held serialized;
+        each chat keeps at most ``per_chat`` of them and the oldest messages of any chat are
+        evicted once the buffer holds more than ``max_bytes``. With ``spill_path``, evicted
+        messages are moved to a SQLite file instead of being dropped.
+
+        Nothing is buffered until :meth:`enable` is called, so a client that never looks messages
+        up does not pay for every ``MessageEv`` being marshalled into Python.
+
+        :param client: The client whose messages are buffered.
+        :type client: NewClient
+        :param per_chat: Messages kept per chat, defaults to 200
+        :type per_chat: int, optional
+        :param max_bytes: Size of the buffered messages across chats, defaults to 16 MiB
+        :type max_bytes: int, optional
+        :param spill_path: SQLite file receiving the evicted messages, defaults to None
+        :type spill_path: Optional[str], optional
+        :param spill_max: Messages kept in the spill file, defaults to 100000
+        :type spill_max: int, optional
+        """
+        self.client = client
+        self.per_chat = per_chat
+        self.max_bytes = max_bytes
+        self.spill_max = spill_max
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.enabled = False
+        # every buffered message, oldest first
+        self._messages: OrderedDict[Tuple[str, str], bytes] = OrderedDict()
+        self._chats: Dict[str, OrderedDict[str, None]] = {}
+        self._lock = threading.Lock()
+        self._spill: Optional[sqlite3.Connection] = None
+        if spill_path is not None:
+            self._spill = sqlite3.connect(spill_path, check_same_thread=False)
+            with self._lock:
+                self._spill.execute("PRAGMA journal_mode=WAL")
+                self._spill.executescript(SPILL_SCHEMA)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def enable(self):
+        """Starts buffering received and sent messages, call it before the client connects."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.client.event.add_listener(MessageEv, self._on_message)
+
+    def add(self, message: snakechat_proto.Message):
+        """Buffers a message with its info."""
+        source = message.Info.MessageSource
+        self._put(_key(source.Chat), message.Info.ID, message.SerializePartialToString())
+
+    def add_sent(self, to: JIDLike, message: Message, response: SendResponse):
+        """
+        Buffers a message sent by the client, if buffering is enabled.
+
+        :param to: The chat the message was sent to.
+        :type to: JIDLike
+        :param message: The message.
+        :type message: Message
+        :param response: The response of :meth:`NewClient.send_message`.
+        :type response: SendResponse
+        """
+        if not self.enabled:
+            return
+        chat = as_jid(to)
+        chat = chat.proto if isinstance(chat, JIDValue) else chat
+        info = MessageInfo(
+            MessageSource=MessageSource(
+                Chat=chat,
+                Sender=self.client.account.own_jid,
+                IsFromMe=True,
+                IsGroup=chat.Server == "g.us",
+            ),
+            ID=response.ID,
+            ServerID=response.ServerID,
+            # received messages carry milliseconds, the send response seconds
+            Timestamp=response.Timestamp * 1000,
+        )
+        self.add(snakechat_proto.Message(Info=info, Message=message))
+
+    def get(self, chat: JIDLike, message_id: str) -> Optional[snakechat_proto.Message]:
+        """
+        Returns a buffered message.
+
+        :param chat: The chat of the message.
+        :type chat: JIDLike
+        :param message_id: The message ID.
+        :type message_id: str
+        :return: The message with its info, None if it is neither buffered nor spilled.
+        :rtype: Optional[snakechat_proto.Message]
+        """
+        key = (_key(chat), message_id)
+        data = self._messages.get(key)
+        if data is None and self._spill is not None:
+            with self._lock:
+                row = self._spill.execute(
+                    "SELECT message FROM spilled WHERE chat = ? AND id = ?", key
+                ).fetchone()
+            data = row[0] if row else None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        message = snakechat_proto.Message()
+        message.MergeFromString(data)
+        return message
+
+    def update(self, chat: JIDLike, message_id: str, new_message: Message):
+        """Replaces the content of a buffered message, e.g. after an edit."""
+        current = self.get(chat, message_id)
+        if current is None:
+            return
+        current.Message.CopyFrom(new_message)
+        self._put(_key(chat), message_id, current.SerializePartialToString())
+
+    def forget(self, chat: JIDLike, message_id: str):
+        key = (_key(chat), message_id)
+        with self._lock:
+            self._drop(key)
+            if self._spill is not None:
+                with self._spill:
+                    self._spill.execute(
+                        "DELETE FROM spilled WHERE chat = ? AND id = ?", key
+                    )
+
+    def clear(self):
+        with self._lock:
+            self._messages.clear()
+            self._chats.clear()
+            self.size = 0
+
+    def _put(self, chat: str, message_id: str, data: bytes):
+        key = (chat, message_id)
+        with self._lock:
+            self._drop(key)
+            self._messages[key] = data
+            self.size += len(data)
+            ids = self._chats.setdefault(chat, OrderedDict())
+            ids[message_id] = None
+            evicted = []
+            while len(ids) > self.per_chat:
+                oldest = (chat, next(iter(ids)))
+                evicted.append((oldest, self._messages[oldest]))
+                self._drop(oldest)
+            while self.size > self.max_bytes and len(self._messages) > 1:
+                oldest = next(iter(self._messages))
+                evicted.append((oldest, self._messages[oldest]))
+                self._drop(oldest)
+            if evicted and self._spill is not None:
+                self._spill_out(evicted)
+
+    def _drop(self, key: Tuple[str, str]):
+        data = self._messages.pop(key, None)
+        if data is None:
+            return
+        self.size -= len(data)
+        ids = self._chats[key[0]]
+        del ids[key[1]]
+        if not ids:
+            del self._chats[key[0]]
+
+    def _spill_out(self, evicted):
+        try:
+            with self._spill:
+                self._spill.executemany(
+                    "INSERT OR REPLACE INTO spilled (chat, id, message) VALUES (?, ?, ?)",
+                    [(chat, message_id, data) for (chat, message_id), data in evicted],
+                )
+                self._spill.execute(
+                    "DELETE FROM spilled WHERE rowid <= "
+                    "(SELECT MAX(rowid) FROM spilled) - ?",
+                    (self.spill_max,),
+                )
+        except sqlite3.Error as e:
+            log.warning("Spilling %d messages failed: %s", len(evicted), e)
+
+    def _on_message(self, client: NewClient, message: MessageEv):
+        self.add(message)
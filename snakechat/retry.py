@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, Union
+
+from ._binder import gocode
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL = timedelta(hours=6)
+
+
+@dataclass
+class SentCacheStats:
+    hits: int
+    misses: int
+    evicted: int
+    size: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SentMessageCache:
+    def __init__(self, client: NewClient) -> None:
+        """
+        Controls the cache Go keeps of the messages sent by the client, keyed by recipient and
+        message ID. Retry receipts from devices that failed to decrypt a message, and
+        :meth:`NewClient.get_message_for_retry`, are answered from it without calling into
+        Python. The cache is on by default with a 32 MiB budget and a 6 hour TTL.
+
+        :param client: The client whose sent messages are cached.
+        :type client: NewClient
+        """
+        self.client = client
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.ttl = DEFAULT_TTL
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def enable(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: Union[timedelta, float] = DEFAULT_TTL,
+    ):
+        """
+        Sets the budget and TTL of the cache. Reconfiguring it drops the cached messages.
+
+        :param max_bytes: Marshalled size of the cached messages, defaults to 32 MiB
+        :type max_bytes: int, optional
+        :param ttl: How long a sent message can be retried, defaults to 6 hours
+        :type ttl: Union[timedelta, float], optional
+        """
+        if not isinstance(ttl, timedelta):
+            ttl = timedelta(seconds=ttl)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        gocode.SetSentMessageCache(self.client.uuid, max_bytes, int(ttl.total_seconds()))
+
+    def disable(self):
+        self.enable(0, self.ttl)
+
+    def stats(self) -> SentCacheStats:
+        return SentCacheStats(
+            *struct.unpack(
+                "<QQQQQ", gocode.GetSentMessageCacheStats(self.client.uuid).get_bytes()
+            )
+        )
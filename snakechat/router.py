@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .events import MessageEv
+from .utils.message import extract_text
+
+if TYPE_CHECKING:
+    from .client import NewClient
+    from .proto.snakechat_pb2 import SendResponse
+
+Handler = Callable[["CommandContext"], None]
+# handler, prefix, command name, rest of the text, regex match, command
+Resolved = Tuple[Handler, str, str, str, Optional[re.Match], Optional["Command"]]
+
+
+@dataclass
+class CommandContext:
+    client: NewClient
+    event: MessageEv
+    text: str
+    prefix: str = ""
+    command: str = ""
+    rest: str = ""
+    match: Optional[re.Match] = None
+    values: List = field(default_factory=list)
+
+    @property
+    def args(self) -> List[str]:
+        """The arguments after the command, shell-style quotes group words."""
+        try:
+            return shlex.split(self.rest)
+        except ValueError:
+            return self.rest.split()
+
+    def reply(self, message: str, **kwargs) -> SendResponse:
+        return self.client.reply_message(message, self.event, **kwargs)
+
+
+@dataclass
+class Command:
+    name: str
+    handler: Handler
+    aliases: Tuple[str, ...] = ()
+    arg_types: Tuple[Callable[[str], object], ...] = ()
+    description: str = ""
+
+    @property
+    def usage(self) -> str:
+        types = " ".join(f"<{t.__name__}>" for t in self.arg_types)
+        return f"{self.name} {types}".strip()
+
+
+class CommandRouter:
+    def __init__(
+        self,
+        prefixes: Union[str, Sequence[str]] = ("/", "!"),
+        case_sensitive: bool = False,
+        ignore_from_me: bool = True,
+    ) -> None:
+        """
+        Dispatches text messages to handlers. Commands are found with a dict lookup after a
+        prefix match, regex routes are compiled once and tried in registration order when no
+        command matches. The command lookup is skipped for every message whose first
+        character cannot start a prefix, which is most of the traffic of a busy account.
+
+        :param prefixes: Command prefixes, an empty string allows commands without one, defaults to ("/", "!")
+        :type prefixes: Union[str, Sequence[str]], optional
+        :param case_sensitive: Match command names case sensitively, defaults to False
+        :type case_sensitive: bool, optional
+        :param ignore_from_me: Skip messages sent by this account, defaults to True
+        :type ignore_from_me: bool, optional
+        """
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        self.prefixes = tuple(prefixes)
+        self.case_sensitive = case_sensitive
+        self.ignore_from_me = ignore_from_me
+        self.commands: Dict[str, Command] = {}
+        self.routes: List[Tuple[Pattern[str], Handler]] = []
+        self.fallback_handler: Optional[Handler] = None
+        self.error_handler: Optional[Callable[[CommandContext, Exception], None]] = None
+        self.handled = 0
+        self.ignored = 0
+        # longest prefix first, so "!!" wins over "!"
+        ordered = sorted(set(prefixes), key=len, reverse=True)
+        self._bare = "" in ordered
+        self._prefixes: Dict[str, Tuple[str, ...]] = {}
+        for prefix in ordered:
+            if prefix:
+                self._prefixes[prefix[0]] = self._prefixes.get(prefix[0], ()) + (prefix,)
+
+    def command(
+        self,
+        name: str,
+        *aliases: str,
+        arg_types: Sequence[Callable[[str], object]] = (),
+        description: str = "",
+    ) -> Callable[[Handler], Handler]:
+        """
+        Registers a command handler. With ``arg_types`` the arguments are converted before the
+        handler runs and are passed as :attr:`CommandContext.values`; missing or invalid
+        arguments are answered with the usage line.
+
+        :param name: The command name, without prefix.
+        :type name: str
+        :param aliases: Other names of the command.
+        :type aliases: str
+        :param arg_types: Converters of the positional arguments, defaults to ()
+        :type arg_types: Sequence[Callable[[str], object]], optional
+        :param description: Shown by :meth:`help`, defaults to ""
+        :type description: str, optional
+        :return: A decorator that registers the handler.
+        :rtype: Callable[[Handler], Handler]
+        """
+
+        def register(handler: Handler) -> Handler:
+            command = Command(name, handler, aliases, tuple(arg_types), description)
+            for key in (name, *aliases):
+                self.commands[self._fold(key)] = command
+            return handler
+
+        return register
+
+    def regex(
+        self, pattern: Union[str, Pattern[str]], flags: int = 0
+    ) -> Callable[[Handler], Handler]:
+        """
+        Registers a handler for messages matching ``pattern`` (``re.search``). The match is
+        available as :attr:`CommandContext.match`.
+
+        :param pattern: The regular expression.
+        :type pattern: Union[str, Pattern[str]]
+        :param flags: Flags used to compile a string pattern, defaults to 0
+        :type flags: int, optional
+        :return: A decorator that registers the handler.
+        :rtype: Callable[[Handler], Handler]
+        """
+
+        def register(handler: Handler) -> Handler:
+            compiled = (
+                pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, flags)
+            )
+            self.routes.append((compiled, handler))
+            return handler
+
+        return register
+
+    def fallback(self, handler: Handler) -> Handler:
+        """Registers the handler for prefixed messages that match no command."""
+        self.fallback_handler = handler
+        return handler
+
+    def on_error(
+        self, handler: Callable[[CommandContext, Exception], None]
+    ) -> Callable[[CommandContext, Exception], None]:
+        self.error_handler = handler
+        return handler
+
+    def attach(self, client: NewClient):
+        """Routes the messages of ``client``. Call it before the client connects."""
+        client.event.add_listener(MessageEv, self)
+
+    def help(self) -> str:
+        seen = {id(command): command for command in self.commands.values()}.values()
+        prefix = self.prefixes[0] if self.prefixes else ""
+        return "\n".join(
+            f"{prefix}{c.usage}" + (f" - {c.description}" if c.description else "")
+            for c in seen
+        )
+
+    def resolve(self, text: str) -> Optional[Resolved]:
+        """
+        Finds the handler of ``text`` without running it.
+
+        :param text: The message text.
+        :type text: str
+        :return: (handler, prefix, name, rest, match, command) or None if nothing matches.
+        :rtype: Optional[Resolved]
+        """
+        if not text:
+            return None
+        candidates = self._prefixes.get(text[0])
+        if candidates is not None:
+            for prefix in candidates:
+                if text.startswith(prefix):
+                    found = self._lookup(text, prefix)
+                    if found is not None:
+                        return found
+                    if self.fallback_handler is not None:
+                        parts = text[len(prefix) :].split(None, 1) or [""]
+                        rest = parts[1].strip() if len(parts) > 1 else ""
+                        return (self.fallback_handler, prefix, parts[0], rest, None, None)
+                    break
+        if self._bare:
+            found = self._lookup(text, "")
+            if found is not None:
+                return found
+        for pattern, handler in self.routes:
+            match = pattern.search(text)
+            if match is not None:
+                return (handler, "", "", text, match, None)
+        return None
+
+    def __call__(self, client: NewClient, message: MessageEv):
+        if self.ignore_from_me and message.Info.MessageSource.IsFromMe:
+            return
+        text = extract_text(message.Message)
+        found = self.resolve(text)
+        if found is None:
+            self.ignored += 1
+            return
+        handler, prefix, name, rest, match, command = found
+        ctx = CommandContext(client, message, text, prefix, name, rest, match)
+        self.handled += 1
+        try:
+            if command is not None and command.arg_types:
+                args = ctx.args
+                if len(args) < len(command.arg_types):
+                    ctx.reply(f"Usage: {prefix}{command.usage}")
+                    return
+                try:
+                    ctx.values = [
+                        convert(arg) for convert, arg in zip(command.arg_types, args)
+                    ]
+                except ValueError:
+                    ctx.reply(f"Usage: {prefix}{command.usage}")
+                    return
+            handler(ctx)
+        except Exception as e:
+            if self.error_handler is None:
+                raise
+            self.error_handler(ctx, e)
+
+    def _lookup(self, text: str, prefix: str) -> Optional[Resolved]:
+        parts = text[len(prefix) :].split(None, 1)
+        if not parts:
+            return None
+        command = self.commands.get(self._fold(parts[0]))
+        if command is None:
+            return None
+        rest = parts[1].strip() if len(parts) > 1 else ""
+        return (command.handler, prefix, parts[0], rest, None, command)
+
+    def _fold(self, name: str) -> str:
+        return name if self.case_sensitive else name.lower()
+
+    def __repr__(self) -> str:
+        return f"CommandRouter(commands={len(self.commands)}, routes={len(self.routes)})"
+
@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import heapq
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
+
+from .events import ConnectedEv, DisconnectedEv
+from .proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from .utils import log
+from .utils.enum import SendPriority
+from .utils.jid import JIDLike, JIDValue, Jid2String, as_jid
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled (
+    id TEXT PRIMARY KEY,
+    send_at REAL NOT NULL,
+    chat TEXT NOT NULL,
+    message BLOB NOT NULL,
+    priority INTEGER NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS scheduled_due ON scheduled (state, send_at);
+"""
+
+# states of a schedule
+PENDING = 0
+SENDING = 1
+SENT = 2
+FAILED = 3
+
+SendAt = Union[datetime, float]
+
+
+def _timestamp(send_at: SendAt) -> float:
+    return send_at.timestamp() if isinstance(send_at, datetime) else float(send_at)
+
+
+@dataclass
+class ScheduledStats:
+    pending: int
+    sent: int
+    failed: int
+    cancelled: int
+    # seconds between the due time and the send, averaged over the sent messages
+    lag_avg: float
+    lag_max: float
+
+
+class MessageScheduler:
+    def __init__(
+        self,
+        client: NewClient,
+        path: Optional[str] = None,
+        concurrency: int = 4,
+        horizon: float = 60.0,
+        max_attempts: int = 5,
+        keep_sent: bool = False,
+    ) -> None:
+        """
+        Sends messages at a later time. Schedules are stored in SQLite, so they survive
+        restarts; only the ones due within ``horizon`` seconds are held in memory, in a heap
+        watched by a single thread that hands due messages to ``concurrency`` sender threads.
+        Messages go through :meth:`NewClient.send_message`, and a failed send is retried with
+        backoff up to ``max_attempts`` times. Nothing is sent while the client is disconnected,
+        and sends that fail because it is do not count as attempts. Creating it registers it as
+        :attr:`NewClient.scheduled`; create it at startup so overdue schedules are sent.
+
+        :param client: The client sending the messages.
+        :type client: NewClient
+        :param path: Path of the SQLite database, defaults to "scheduled-<client uuid>.db"
+        :type path: Optional[str], optional
+        :param concurrency: Messages sent at once, defaults to 4
+        :type concurrency: int, optional
+        :param horizon: Seconds of upcoming schedules loaded at a time, defaults to 60.0
+        :type horizon: float, optional
+        :param max_attempts: Attempts before a schedule is marked as failed, defaults to 5
+        :type max_attempts: int, optional
+        :param keep_sent: Keep sent schedules in the database instead of deleting them, defaults to False
+        :type keep_sent: bool, optional
+        """
+        self.client = client
+        self.path = path or f"scheduled-{client.uuid.decode()}.db"
+        self.concurrency = concurrency
+        self.horizon = horizon
+        self.max_attempts = max_attempts
+        self.keep_sent = keep_sent
+        self._heap: List[Tuple[float, str]] = []
+        self._loaded_until = float("-inf")
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._executor = ThreadPoolExecutor(
+            concurrency, thread_name_prefix="snakechat-scheduled"
+        )
+        self._stop = False
+        self._sent = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._online = self._usable()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            with self._db:
+                # sends cut short by a restart are tried again
+                self._db.execute(
+                    "UPDATE scheduled SET state = ? WHERE state = ?", (PENDING, SENDING)
+                )
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="snakechat-scheduled"
+        )
+        client.event.add_listener(ConnectedEv, self._on_connection)
+        client.event.add_listener(DisconnectedEv, self._on_connection)
+        self._thread.start()
+        client.scheduled = self
+
+    def schedule(
+        self,
+        send_at: SendAt,
+        to: JIDLike,
+        message: Union[Message, str],
+        priority: SendPriority = SendPriority.BULK,
+        schedule_id: Optional[str] = None,
+    ) -> str:
+        """
+        Schedules a message.
+
+        :param send_at: When to send it, as a datetime or a Unix timestamp.
+        :type send_at: SendAt
+        :param to: The recipient.
+        :type to: JIDLike
+        :param message: The message or its text.
+        :type message: Union[Message, str]
+        :param priority: The priority class of the send, defaults to SendPriority.BULK
+        :type priority: SendPriority, optional
+        :param schedule_id: ID of the schedule, defaults to a random one
+        :type schedule_id: Optional[str], optional
+        :return: The ID to pass to :meth:`cancel`.
+        :rtype: str
+        """
+        return self.schedule_many([(send_at, to, message)], priority, [schedule_id])[0]
+
+    def schedule_many(
+        self,
+        items: Iterable[Tuple[SendAt, JIDLike, Union[Message, str]]],
+        priority: SendPriority = SendPriority.BULK,
+        schedule_ids: Optional[Iterable[Optional[str]]] = None,
+    ) -> List[str]:
+        """
+        Schedules many messages in a single transaction.
+
+        :param items: (send_at, to, message) tuples, as taken by :meth:`schedule`.
+        :type items: Iterable[Tuple[SendAt, JIDLike, Union[Message, str]]]
+        :param priority: The priority class of the sends, defaults to SendPriority.BULK
+        :type priority: SendPriority, optional
+        :param schedule_ids: IDs of the schedules, in the order of ``items``, defaults to random ones.
+            An ID that is still pending is rescheduled.
+        :type schedule_ids: Optional[Iterable[Optional[str]]], optional
+        :raises ValueError: If an ID belongs to a schedule that is being sent, was sent or failed.
+        :return: The IDs of the schedules.
+        :rtype: List[str]
+        """
+        ids = iter(schedule_ids or ())
+        rows = []
+        for send_at, to, message in items:
+            if isinstance(message, str):
+                message = self.client.build_text_message(message)
+            rows.append(
+                (
+                    next(ids, None) or uuid.uuid4().hex,
+                    _timestamp(send_at),
+                    Jid2String(as_jid(to)),
+                    message.SerializeToString(),
+                    int(priority),
+                )
+            )
+        with self._db_lock:
+            with self._db:
+                # checked under the lock the dispatcher claims with, so no send starts meanwhile
+                taken = [
+                    row[0]
+                    for row in rows
+                    if self._db.execute(
+                        "SELECT 1 FROM scheduled WHERE id = ? AND state != ?",
+                        (row[0], PENDING),
+                    ).fetchone()
+                ]
+                if taken:
+                    raise ValueError(
+                        f"schedules {', '.join(taken)} are no longer pending"
+                    )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO scheduled (id, send_at, chat, message, priority) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        with self._cond:
+            for row in rows:
+                if row[1] < self._loaded_until:
+                    heapq.heappush(self._heap, (row[1], row[0]))
+            self._cond.notify()
+        return [row[0] for row in rows]
+
+    def cancel(self, *schedule_ids: str) -> int:
+        """
+        Cancels schedules that were not sent yet.
+
+        :return: The number of schedules cancelled.
+        :rtype: int
+        """
+        with self._db_lock:
+            with self._db:
+                cancelled = self._db.executemany(
+                    "DELETE FROM scheduled WHERE id = ? AND state = ?",
+                    [(schedule_id, PENDING) for schedule_id in schedule_ids],
+                ).rowcount
+        # cancelled entries left in the heap are skipped when they are claimed
+        with self._cond:
+            self._cancelled += cancelled
+        return cancelled
+
+    def pending(self, to: Optional[JIDLike] = None) -> int:
+        with self._db_lock:
+            if to is None:
+                return self._db.execute(
+                    "SELECT COUNT(*) FROM scheduled WHERE state = ?", (PENDING,)
+                ).fetchone()[0]
+            return self._db.execute(
+                "SELECT COUNT(*) FROM scheduled WHERE state = ? AND chat = ?",
+                (PENDING, Jid2String(as_jid(to))),
+            ).fetchone()[0]
+
+    def stats(self) -> ScheduledStats:
+        pending = self.pending()
+        with self._cond:
+            return ScheduledStats(
+                pending=pending,
+                sent=self._sent,
+                failed=self._failed,
+                cancelled=self._cancelled,
+                lag_avg=self._lag_total / self._sent if self._sent else 0.0,
+                lag_max=self._lag_max,
+            )
+
+    def close(self):
+        """Stops dispatching and waits for the sends in flight."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        with self._db_lock:
+            self._db.close()
+
+    def _load(self, until: float):
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT send_at, id FROM scheduled "
+                "WHERE state = ? AND send_at >= ? AND send_at < ?",
+                (PENDING, self._loaded_until, until),
+            ).fetchall()
+        for row in rows:
+            heapq.heappush(self._heap, (row[0], row[1]))
+        self._loaded_until = until
+
+    def _claim(self, schedule_id: str) -> Optional[Tuple[float, str, bytes, int]]:
+        with self._db_lock:
+            with self._db:
+                claimed = self._db.execute(
+                    "UPDATE scheduled SET state = ? WHERE id = ? AND state = ?",
+                    (SENDING, schedule_id, PENDING),
+                ).rowcount
+            if not claimed:
+                return None
+            return self._db.execute(
+                "SELECT send_at, chat, message, priority FROM scheduled WHERE id = ?",
+                (schedule_id,),
+            ).fetchone()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                now = time.time()
+                if now + self.horizon / 2 >= self._loaded_until:
+                    self._load(now + self.horizon)
+                if not self._heap or self._heap[0][0] > now:
+                    wake = self._loaded_until - self.horizon / 2
+                    if self._heap:
+                        wake = min(wake, self._heap[0][0])
+                    self._cond.wait(max(0.0, wake - now))
+                    continue
+                if not self._online:
+                    # due messages wait for the next ConnectedEv
+                    self._cond.wait()
+                    continue
+                due_at, schedule_id = heapq.heappop(self._heap)
+            row = self._claim(schedule_id)
+            if row is None or row[0] != due_at:
+                # cancelled, already sent, or rescheduled to another time
+                if row is not None:
+                    self._release(schedule_id)
+                continue
+            self._slots.acquire()
+            self._executor.submit(self._send, schedule_id, *row)
+
+    def _release(self, schedule_id: str):
+        with self._db_lock:
+            with self._db:
+                self._db.execute(
+                    "UPDATE scheduled SET state = ? WHERE id = ?", (PENDING, schedule_id)
+                )
+
+    def _send(self, schedule_id: str, send_at: float, chat: str, data: bytes, priority: int):
+        try:
+            self.client.send_message(
+                JIDValue.parse(chat), Message.FromString(data), priority=SendPriority(priority)
+            )
+        except Exception as e:
+            with self._cond:
+                self._online = self._usable()
+                online = self._online
+            if online:
+                self._retry(schedule_id, str(e))
+            else:
+                self._postpone(schedule_id, send_at)
+        else:
+            lag = max(0.0, time.time() - send_at)
+            with self._db_lock:
+                with self._db:
+                    if self.keep_sent:
+                        self._db.execute(
+                            "UPDATE scheduled SET state = ? WHERE id = ?", (SENT, schedule_id)
+                        )
+                    else:
+                        self._db.execute("DELETE FROM scheduled WHERE id = ?", (schedule_id,))
+            with self._cond:
+                self._sent += 1
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+        finally:
+            self._slots.release()
+
+    def _usable(self) -> bool:
+        # a hibernated client is woken by the send
+        return self.client.hibernated or self.client.is_connected
+
+    def _on_connection(self, client: NewClient, _):
+        with self._cond:
+            self._online = self._usable()
+            self._cond.notify()
+
+    def _postpone(self, schedule_id: str, send_at: float):
+        # the client went offline, the send is not an attempt and runs after the next connect
+        self._release(schedule_id)
+        log.debug("Scheduled message %s waits for the client to connect", schedule_id)
+        with self._cond:
+            if send_at < self._loaded_until:
+                heapq.heappush(self._heap, (send_at, schedule_id))
+            self._cond.notify()
+
+    def _retry(self, schedule_id: str, error: str):
+        with self._db_lock:
+            with self._db:
+                self._db.execute(
+                    "UPDATE scheduled SET attempts = attempts + 1, error = ? WHERE id = ?",
+                    (error, schedule_id),
+                )
+                attempts = self._db.execute(
+                    "SELECT attempts FROM scheduled WHERE id = ?", (schedule_id,)
+                ).fetchone()[0]
+                if attempts >= self.max_attempts:
+                    self._db.execute(
+                        "UPDATE scheduled SET state = ? WHERE id = ?", (FAILED, schedule_id)
+                    )
+                    retry_at = None
+                else:
+                    retry_at = time.time() + min(300.0, 2.0**attempts)
+                    self._db.execute(
+                        "UPDATE scheduled SET state = ?, send_at = ? WHERE id = ?",
+                        (PENDING, retry_at, schedule_id),
+                    )
+        if retry_at is None:
+            log.warning("Scheduled message %s failed: %s", schedule_id, error)
+            with self._cond:
+                self._failed += 1
+            return
+        log.debug("Scheduled message %s failed (attempt %d): %s", schedule_id, attempts, error)
+        with self._cond:
+            if retry_at < self._loaded_until:
+                heapq.heappush(self._heap, (retry_at, schedule_id))
+            self._cond.notify()
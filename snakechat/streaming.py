@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+from .utils import log
+from .utils.jid import JIDLike, as_jid
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+
+class MessageStream:
+    def __init__(
+        self,
+        client: NewClient,
+        chat: JIDLike,
+        interval: float = 1.0,
+        link_preview: bool = False,
+    ) -> None:
+        """
+        Writer for a text message that grows while it is produced, e.g. an answer streamed from
+        a language model. The first update is sent as a new message right away; later updates
+        only replace the pending text and are sent as edits of that message, at most one every
+        ``interval`` seconds. :meth:`close` sends the final text if it was not sent yet.
+
+        :param client: The client sending the message.
+        :type client: NewClient
+        :param chat: The chat the message is sent to.
+        :type chat: JIDLike
+        :param interval: Minimum seconds between two edits, defaults to 1.0
+        :type interval: float, optional
+        :param link_preview: Whether to generate a link preview for the first message, defaults to False
+        :type link_preview: bool, optional
+        """
+        self.client = client
+        self.chat = as_jid(chat)
+        self.interval = interval
+        self.link_preview = link_preview
+        self.message_id: Optional[str] = None
+        self.updates = 0
+        self.edits = 0
+        self.closed = False
+        self._text = ""
+        self._sent_text: Optional[str] = None
+        self._sent_at = 0.0
+        self._started = False
+        self._sending = False
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+    def __enter__(self) -> MessageStream:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def coalesced(self) -> int:
+        """Updates that were never sent because a later one replaced them."""
+        sent = self.edits + (self.message_id is not None)
+        return max(0, self.updates - sent)
+
+    def write(self, chunk: str):
+        """Appends ``chunk`` to the text."""
+        with self._lock:
+            text = self._text + chunk
+        self.update(text)
+
+    def update(self, text: str):
+        """
+        Replaces the whole text.
+
+        :param text: The new text.
+        :type text: str
+        :raises ValueError: If the stream is closed.
+        """
+        with self._lock:
+            if self.closed:
+                raise ValueError("the message stream is closed")
+            self._text = text
+            self.updates += 1
+            first = not self._started
+            self._started = True
+        if first:
+            self._send_first(text)
+        else:
+            self._schedule()
+
+    def flush(self):
+        """Sends the pending text now, as the first message if sending that one failed."""
+        with self._lock:
+            retry = not self._started and self.updates > 0
+            if retry:
+                self._started = True
+            text = self._text
+        if retry:
+            self._send_first(text)
+        else:
+            self._flush(force=True)
+
+    def close(self):
+        """Sends the final text and closes the stream."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.flush()
+
+    def _send_first(self, text: str):
+        with self._send_lock:
+            with self._lock:
+                self._sending = True
+            try:
+                response = self.client.send_message(self.chat, text, self.link_preview)
+            except Exception:
+                with self._lock:
+                    # nothing was sent, the next update or close tries again
+                    self._started = False
+                raise
+            finally:
+                with self._lock:
+                    self._sending = False
+            with self._lock:
+                self.message_id = response.ID
+                self._sent_text = text
+                self._sent_at = time.monotonic()
+        self._schedule()
+
+    def _schedule(self):
+        with self._lock:
+            if self._timer is not None or self._sending or self.message_id is None:
+                return
+            if self._text == self._sent_text:
+                return
+            delay = self._sent_at + self.interval - time.monotonic()
+            if delay > 0:
+                self._start_timer(delay)
+                return
+        self._flush(force=False)
+
+    def _start_timer(self, delay: float):
+        self._timer = threading.Timer(delay, self._flush_later)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush(self, force: bool):
+        with self._send_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                text = self._text
+                if self.message_id is None or text == self._sent_text:
+                    return
+                delay = self._sent_at + self.interval - time.monotonic()
+                if not force and delay > 0:
+                    self._start_timer(delay)
+                    return
+                self._sending = True
+            try:
+                self.client.edit_message(
+                    self.chat, self.message_id, self.client.build_text_message(text)
+                )
+            finally:
+                with self._lock:
+                    self._sending = False
+            with self._lock:
+                self._sent_text = text
+                self._sent_at = time.monotonic()
+                self.edits += 1
+                # updates that arrived during the edit
+                if self._text != text and self._timer is None and not self.closed:
+                    self._start_timer(self.interval)
+
+    def _flush_later(self):
+        try:
+            self._flush(force=False)
+        except Exception as e:
+            log.warning("Editing the streamed message %s failed: %s", self.message_id, e)
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, Optional, Union
+
+from .events import (
+    ClientOutdatedEv,
+    ConnectedEv,
+    ConnectFailureEv,
+    DisconnectedEv,
+    KeepAliveRestoredEv,
+    KeepAliveTimeoutEv,
+    LoggedOutEv,
+    StreamErrorEv,
+    StreamReplacedEv,
+    TemporaryBanEv,
+)
+from .proto import snakechat_pb2 as snakechat
+from .utils import log
+from .utils.enum import SessionHealth
+
+if TYPE_CHECKING:
+    from .client import ClientFactory, NewClient
+
+STOPPING_FAILURES = frozenset(
+    {
+        snakechat.LOGGED_OUT,
+        snakechat.MAIN_DEVICE_GONE,
+        snakechat.UNKNOWN_LOGOUT,
+        snakechat.CLIENT_OUTDATED,
+        snakechat.BAD_USER_AGENT,
+    }
+)
+
+
+def _seconds(value: Union[timedelta, float]) -> float:
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+@dataclass
+class SessionStatus:
+    health: SessionHealth
+    failures: int
+    since_last_event: float
+    next_retry_in: Optional[float]
+
+
+class _Session:
+    __slots__ = ("health", "failures", "retry_at", "deadline", "ready")
+
+    def __init__(self) -> None:
+        self.health = SessionHealth.CONNECTING
+        self.failures = 0
+        self.retry_at = 0.0
+        self.deadline: Optional[float] = None
+        self.ready = threading.Event()
+
+
+class Supervisor:
+    def __init__(self, client_factory: ClientFactory) -> None:
+        """
+        Tracks the health of every session of a :class:`ClientFactory` and reconnects
+        dropped sessions with exponential backoff. Disabled until :meth:`enable` is called.
+
+        :param client_factory: The factory whose clients are supervised.
+        :type client_factory: ClientFactory
+        """
+        self.client_factory = client_factory
+        self.base_delay = 1.0
+        self.max_delay = 300.0
+        self.quarantine_after = 8
+        self.quarantine_time = 900.0
+        self.connect_timeout = 30.0
+        self.keepalive_grace = 180.0
+        self.outbound_wait = 10.0
+        self._sessions: Dict[bytes, _Session] = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def enable(
+        self,
+        base_delay: Union[timedelta, float] = 1.0,
+        max_delay: Union[timedelta, float] = 300.0,
+        quarantine_after: int = 8,
+        quarantine_time: Union[timedelta, float] = 900.0,
+        connect_timeout: Union[timedelta, float] = 30.0,
+        keepalive_grace: Union[timedelta, float] = 180.0,
+        outbound_wait: Union[timedelta, float] = 10.0,
+    ):
+        """
+        Starts supervising the factory's sessions. Must be called before :meth:`ClientFactory.run`
+        so the connection events are subscribed.
+
+        :param base_delay: Delay before the first reconnect attempt, doubled on every failure, defaults to 1 second
+        :type base_delay: Union[timedelta, float], optional
+        :param max_delay: Upper bound of the reconnect delay, defaults to 300 seconds
+        :type max_delay: Union[timedelta, float], optional
+        :param quarantine_after: Consecutive failures after which a session is quarantined, defaults to 8
+        :type quarantine_after: int, optional
+        :param quarantine_time: How long a quarantined session is left alone, defaults to 900 seconds
+        :type quarantine_time: Union[timedelta, float], optional
+        :param connect_timeout: Time a reconnect attempt has to produce a ``ConnectedEv``, defaults to 30 seconds
+        :type connect_timeout: Union[timedelta, float], optional
+        :param keepalive_grace: Time a session may stay degraded before it is forcibly reconnected, defaults to 180 seconds
+        :type keepalive_grace: Union[timedelta, float], optional
+        :param outbound_wait: Time an outbound call waits for a reconnecting session, defaults to 10 seconds
+        :type outbound_wait: Union[timedelta, float], optional
+        """
+        self.base_delay = _seconds(base_delay)
+        self.max_delay = _seconds(max_delay)
+        self.quarantine_after = quarantine_after
+        self.quarantine_time = _seconds(quarantine_time)
+        self.connect_timeout = _seconds(connect_timeout)
+        self.keepalive_grace = _seconds(keepalive_grace)
+        self.outbound_wait = _seconds(outbound_wait)
+        for client in self.client_factory.clients:
+            self.attach(client)
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="snakechat-supervisor"
+            )
+            self._thread.start()
+
+    def disable(self):
+        """Stops reconnecting sessions and hands reconnects back to whatsmeow. Health keeps being tracked."""
+        self._stop.set()
+        self._wakeup.set()
+        self._thread = None
+        for client in list(self.client_factory.clients):
+            if self.health(client) in (SessionHealth.HEALTHY, SessionHealth.DEGRADED):
+                client.set_auto_reconnect(True)
+
+    def attach(self, client: NewClient):
+        """
+        Starts tracking a client. Called by :meth:`enable` and by :meth:`ClientFactory.new_client`.
+
+        :param client: The client to supervise.
+        :type client: NewClient
+        """
+        with self._lock:
+            if client.uuid in self._sessions:
+                return
+            self._sessions[client.uuid] = _Session()
+        client.event.add_listener(ConnectedEv, self._on_connected)
+        client.event.add_listener(KeepAliveTimeoutEv, self._on_keepalive_timeout)
+        client.event.add_listener(KeepAliveRestoredEv, self._on_keepalive_restored)
+        client.event.add_listener(DisconnectedEv, self._on_dropped)
+        client.event.add_listener(StreamErrorEv, self._on_dropped)
+        client.event.add_listener(ConnectFailureEv, self._on_connect_failure)
+        client.event.add_listener(TemporaryBanEv, self._on_temporary_ban)
+        client.event.add_listener(LoggedOutEv, self._on_stopped)
+        client.event.add_listener(StreamReplacedEv, self._on_stopped)
+        client.event.add_listener(ClientOutdatedEv, self._on_stopped)
+        client.outbound_hooks.append(self.on_outbound)
+
+    def health(self, client: NewClient) -> SessionHealth:
+        """
+        Returns the current health of a session.
+
+        :param client: The session.
+        :type client: NewClient
+        :return: The health state.
+        :rtype: SessionHealth
+        """
+        if client.hibernated:
+            return SessionHealth.HIBERNATED
+        session = self._sessions.get(client.uuid)
+        return session.health if session else SessionHealth.CONNECTING
+
+    def status(self) -> Dict[str, SessionStatus]:
+        """
+        Returns a health snapshot of every supervised session, keyed by the session uuid.
+
+        :return: The status of each session.
+        :rtype: Dict[str, SessionStatus]
+        """
+        now = time.monotonic()
+        result: Dict[str, SessionStatus] = {}
+        for client in list(self.client_factory.clients):
+            session = self._sessions.get(client.uuid)
+            if session is None:
+                continue
+            pending = session.health in (
+                SessionHealth.RECONNECTING,
+                SessionHealth.QUARANTINED,
+            )
+            result[client.uuid.decode()] = SessionStatus(
+                health=self.health(client),
+                failures=session.failures,
+                since_last_event=now - client.last_event,
+                next_retry_in=max(0.0, session.retry_at - now) if pending else None,
+            )
+        return result
+
+    def on_outbound(self, client: NewClient):
+        session = self._sessions.get(client.uuid)
+        if session is None or client.hibernated:
+            return
+        if session.health in (SessionHealth.CONNECTING, SessionHealth.RECONNECTING):
+            session.ready.wait(self.outbound_wait)
+
+    def _set(self, session: _Session, health: SessionHealth):
+        session.health = health
+        if health in (SessionHealth.HEALTHY, SessionHealth.DEGRADED):
+            session.ready.set()
+        elif health in (SessionHealth.CONNECTING, SessionHealth.RECONNECTING):
+            session.ready.clear()
+        else:
+            # nobody should keep waiting on a session that is not coming back soon
+            session.ready.set()
+        self._wakeup.set()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _schedule(self, session: _Session):
+        session.retry_at = time.monotonic() + self._backoff(session.failures + 1)
+        session.deadline = None
+        self._set(session, SessionHealth.RECONNECTING)
+
+    def _quarantine(self, client: NewClient, session: _Session, seconds: float):
+        session.retry_at = time.monotonic() + seconds
+        session.deadline = None
+        self._set(session, SessionHealth.QUARANTINED)
+        log.warning("🚑 Session %s quarantined for %.0fs", client.uuid, seconds)
+
+    def _failed(self, client: NewClient, session: _Session, reason: str):
+        with self._lock:
+            session.failures += 1
+            log.debug(
+                "Reconnect of %s failed (%d): %s", client.uuid, session.failures, reason
+            )
+            if session.failures >= self.quarantine_after:
+                self._quarantine(client, session, self.quarantine_time)
+            else:
+                self._schedule(session)
+
+    def _on_connected(self, client: NewClient, _: ConnectedEv):
+        client.set_auto_reconnect(not self.enabled)
+        with self._lock:
+            session = self._sessions[client.uuid]
+            session.failures = 0
+            session.deadline = None
+            self._set(session, SessionHealth.HEALTHY)
+
+    def _on_keepalive_timeout(self, client: NewClient, _: KeepAliveTimeoutEv):
+        with self._lock:
+            session = self._sessions[client.uuid]
+            if session.health is SessionHealth.HEALTHY:
+                session.deadline = time.monotonic() + self.keepalive_grace
+                self._set(session, SessionHealth.DEGRADED)
+
+    def _on_keepalive_restored(self, client: NewClient, _: KeepAliveRestoredEv):
+        with self._lock:
+            session = self._sessions[client.uuid]
+            if session.health is SessionHealth.DEGRADED:
+                session.deadline = None
+                self._set(session, SessionHealth.HEALTHY)
+
+    def _on_dropped(self, client: NewClient, _):
+        if client.hibernated:
+            return
+        with self._lock:
+            session = self._sessions[client.uuid]
+            if session.health in (SessionHealth.STOPPED, SessionHealth.QUARANTINED):
+                return
+            if session.health is SessionHealth.CONNECTING and session.deadline:
+                self._failed(client, session, "disconnected while connecting")
+            else:
+                self._schedule(session)
+
+    def _on_connect_failure(self, client: NewClient, failure: ConnectFailureEv):
+        with self._lock:
+            session = self._sessions[client.uuid]
+            if failure.Reason in STOPPING_FAILURES:
+                self._set(session, SessionHealth.STOPPED)
+            elif failure.Reason == snakechat.TEMP_BANNED:
+                self._quarantine(client, session, self.quarantine_time)
+            else:
+                self._failed(client, session, failure.Message)
+
+    def _on_temporary_ban(self, client: NewClient, ban: TemporaryBanEv):
+        with self._lock:
+            self._quarantine(client, self._sessions[client.uuid], float(ban.Expire))
+
+    def _on_stopped(self, client: NewClient, _):
+        with self._lock:
+            self._set(self._sessions[client.uuid], SessionHealth.STOPPED)
+
+    def _attempt(self, client: NewClient, session: _Session):
+        with self._lock:
+            session.deadline = time.monotonic() + self.connect_timeout
+            self._set(session, SessionHealth.CONNECTING)
+        try:
+            client.reconnect()
+        except Exception as e:
+            if client.is_logged_in:
+                with self._lock:
+                    session.failures = 0
+                    self._set(session, SessionHealth.HEALTHY)
+            else:
+                self._failed(client, session, str(e))
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_due = now + 1.0
+            for client in list(self.client_factory.clients):
+                session = self._sessions.get(client.uuid)
+                if session is None or client.hibernated:
+                    continue
+                health = session.health
+                if health in (SessionHealth.RECONNECTING, SessionHealth.QUARANTINED):
+                    if session.retry_at <= now:
+                        self._attempt(client, session)
+                    else:
+                        next_due = min(next_due, session.retry_at)
+                elif session.deadline is not None and session.deadline <= now:
+                    if health is SessionHealth.CONNECTING:
+                        client.disconnect()
+                        self._failed(client, session, "connect timeout")
+                    elif health is SessionHealth.DEGRADED:
+                        client.disconnect()
+                        with self._lock:
+                            self._schedule(session)
+            self._wakeup.wait(max(0.05, next_due - time.monotonic()))
+            self._wakeup.clear()
@@ -7,7 +7,7 @@ from .ffmpeg import FFmpeg
 from .thumbnail import save_file_to_temp_directory
 from .iofile import get_bytes_from_name_or_url
 from .calc import AspectRatioMethod
-from .jid import build_jid, Jid2String, JIDToNonAD
+from .jid import build_jid, Jid2String, JIDToNonAD, JIDValue, as_jid, jid_wire
 from .enum import (
     MediaType,
     MediaTypeToMMS,
@@ -107,6 +107,9 @@ __all__ = (
     "build_jid",
     "Jid2String",
     "JIDToNonAD",
+    "JIDValue",
+    "as_jid",
+    "jid_wire",
     "MediaType",
     "MediaTypeToMMS",
     "BlocklistAction",
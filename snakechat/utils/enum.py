@@ -1,5 +1,5 @@
 from __future__ import annotations
-from enum import Enum
+from enum import Enum, IntEnum
 import magic
 import typing
 from ..proto.waE2E.WAWebProtobufsE2E_pb2 import (
@@ -347,3 +347,91 @@ class ParticipantRequestChange(Enum):
 
     APPROVE = "approve"
     REJECT = "reject"
+
+
+class SessionHealth(Enum):
+    """
+    Enumeration of the health states tracked by the reconnect supervisor.
+
+    Attributes:
+        CONNECTING (str): A connection attempt is in progress.
+        HEALTHY (str): The session is connected and keepalives succeed.
+        DEGRADED (str): Keepalives are timing out but the socket is still open.
+        RECONNECTING (str): The session dropped and waits for its next reconnect attempt.
+        QUARANTINED (str): The session failed too often and is paused until its quarantine ends.
+        HIBERNATED (str): The session was disconnected on purpose because it was idle.
+        STOPPED (str): The session was logged out, replaced or banned and is not reconnected.
+    """
+
+    CONNECTING = "connecting"
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"
+    RECONNECTING = "reconnecting"
+    QUARANTINED = "quarantined"
+    HIBERNATED = "hibernated"
+    STOPPED = "stopped"
+
+
+class OutboxState(Enum):
+    """
+    Enumeration of the delivery states of a message in the durable outbox.
+
+    Attributes:
+        QUEUED (str): The message is persisted and waits for a worker.
+        SENDING (str): A worker is sending the message.
+        RETRY (str): The last attempt failed, the message waits for its next attempt.
+        SENT (str): The server acknowledged the message.
+        FAILED (str): Every attempt failed, the message is not retried anymore.
+    """
+
+    QUEUED = "queued"
+    SENDING = "sending"
+    RETRY = "retry"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class SendPriority(IntEnum):
+    """
+    Enumeration of the priority classes of the send scheduler, lower values are sent first.
+
+    Attributes:
+        INTERACTIVE (int): Replies to a user that is waiting for them.
+        NORMAL (int): Regular traffic.
+        BULK (int): Broadcasts and other traffic that can wait.
+    """
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+
+class RoutingStrategy(Enum):
+    """
+    Enumeration of the ways a session pool picks the session that sends a message.
+
+    Attributes:
+        LEAST_LOADED (str): The session with the fewest queued and in-flight sends.
+        ROUND_ROBIN (str): Every available session in turn.
+        STICKY (str): The session that last sent to the recipient, so a chat always sees the same number.
+    """
+
+    LEAST_LOADED = "least_loaded"
+    ROUND_ROBIN = "round_robin"
+    STICKY = "sticky"
+
+
+class EventPriority(IntEnum):
+    """
+    Enumeration of the event dispatch lanes, lower values are delivered first.
+
+    Attributes:
+        CONTROL (int): Connection and account events, never queued behind other events nor shed.
+        NORMAL (int): Messages, group, call and other events, queued but never shed. Handled
+            concurrently by the lane workers, so two events may finish out of order.
+        LOW (int): Receipts and presence, the first events shed under overload.
+    """
+
+    CONTROL = 0
+    NORMAL = 1
+    LOW = 2
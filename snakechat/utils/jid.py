@@ -1,6 +1,249 @@
-import copy
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
 from ..proto.snakechat_pb2 import JID
 
+# Leading byte of a JID sent to Go in its string form, a serialized protobuf JID never starts with it.
+WIRE_STRING = b"\x00"
+
+
+class JIDValue:
+    __slots__ = (
+        "User",
+        "RawAgent",
+        "Device",
+        "Integrator",
+        "Server",
+        "_hash",
+        "_str",
+        "_wire",
+        "_proto_bytes",
+        "_non_ad",
+    )
+
+    def __init__(
+        self,
+        user: str,
+        server: str,
+        raw_agent: int = 0,
+        device: int = 0,
+        integrator: int = 0,
+    ) -> None:
+        """
+        Immutable, hashable JID. Use :meth:`of`, :meth:`parse` or :meth:`from_proto` to get
+        interned instances. It has the same fields as the protobuf :class:`JID` and can be passed
+        to every :class:`NewClient` method that takes one; its string, wire bytes and serialized
+        protobuf are computed once.
+
+        :param user: The user part, the phone number for users.
+        :type user: str
+        :param server: The server, e.g. s.whatsapp.net or g.us.
+        :type server: str
+        :param raw_agent: The agent of an AD JID, defaults to 0
+        :type raw_agent: int, optional
+        :param device: The device of an AD JID, defaults to 0
+        :type device: int, optional
+        :param integrator: The integrator, defaults to 0
+        :type integrator: int, optional
+        """
+        setattr_ = object.__setattr__
+        setattr_(self, "User", user)
+        setattr_(self, "RawAgent", raw_agent)
+        setattr_(self, "Device", device)
+        setattr_(self, "Integrator", integrator)
+        setattr_(self, "Server", server)
+        setattr_(self, "_hash", hash((user, raw_agent, device, integrator, server)))
+        setattr_(self, "_str", _format(user, raw_agent, device, server))
+        setattr_(self, "_wire", None)
+        setattr_(self, "_proto_bytes", None)
+        setattr_(self, "_non_ad", self if not raw_agent and not device else None)
+
+    @classmethod
+    def of(
+        cls,
+        user: str,
+        server: str = "s.whatsapp.net",
+        raw_agent: int = 0,
+        device: int = 0,
+        integrator: int = 0,
+    ) -> JIDValue:
+        return _intern(user, server, raw_agent, device, integrator)
+
+    @classmethod
+    def parse(cls, jid: str) -> JIDValue:
+        """
+        Parses the ``user.agent:device@server`` form, as printed by :func:`Jid2String` and
+        whatsmeow, into an interned JID.
+
+        :param jid: The JID string.
+        :type jid: str
+        :raises ValueError: If the string is not a valid JID.
+        :return: The JID.
+        :rtype: JIDValue
+        """
+        return _parse(jid)
+
+    @classmethod
+    def from_proto(cls, jid: JID) -> JIDValue:
+        return _intern(jid.User, jid.Server, jid.RawAgent, jid.Device, jid.Integrator)
+
+    @property
+    def IsEmpty(self) -> bool:
+        return not self.Server
+
+    @property
+    def non_ad(self) -> JIDValue:
+        """The JID without agent and device, computed once."""
+        non_ad = self._non_ad
+        if non_ad is None:
+            non_ad = _intern(self.User, self.Server, 0, 0, self.Integrator)
+            object.__setattr__(self, "_non_ad", non_ad)
+        return non_ad
+
+    @property
+    def key(self) -> str:
+        """``user@server``, the key used for per-user caches."""
+        return self.non_ad._str
+
+    @property
+    def wire(self) -> bytes:
+        """The string form prefixed with :data:`WIRE_STRING`, read by ``utils.DecodeJID`` in Go."""
+        wire = self._wire
+        if wire is None:
+            wire = WIRE_STRING + self._str.encode()
+            object.__setattr__(self, "_wire", wire)
+        return wire
+
+    @property
+    def proto(self) -> JID:
+        return JID(
+            User=self.User,
+            RawAgent=self.RawAgent,
+            Device=self.Device,
+            Integrator=self.Integrator,
+            Server=self.Server,
+            IsEmpty=self.IsEmpty,
+        )
+
+    def SerializeToString(self) -> bytes:
+        data = self._proto_bytes
+        if data is None:
+            data = self.proto.SerializeToString()
+            object.__setattr__(self, "_proto_bytes", data)
+        return data
+
+    def _astuple(self) -> Tuple[str, int, int, int, str]:
+        return (self.User, self.RawAgent, self.Device, self.Integrator, self.Server)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("JIDValue is immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, JIDValue):
+            return self._hash == other._hash and self._astuple() == other._astuple()
+        return NotImplemented
+
+    def __str__(self) -> str:
+        return self._str
+
+    def __repr__(self) -> str:
+        return f"JIDValue({self._str!r})"
+
+    def __reduce__(self):
+        return (_intern, (self.User, self.Server, self.RawAgent, self.Device, self.Integrator))
+
+
+JIDLike = Union[JID, JIDValue, str]
+
+
+def _format(user: str, raw_agent: int, device: int, server: str) -> str:
+    if raw_agent > 0:
+        return "%s.%s:%d@%s" % (user, raw_agent, device, server)
+    elif device > 0:
+        return "%s:%d@%s" % (user, device, server)
+    elif user:
+        return "%s@%s" % (user, server)
+    return server
+
+
+@lru_cache(maxsize=1 << 16)
+def _intern(
+    user: str, server: str, raw_agent: int, device: int, integrator: int
+) -> JIDValue:
+    return JIDValue(user, server, raw_agent, device, integrator)
+
+
+def _uint(text: str, bits: int) -> int:
+    # the same numbers strconv.ParseUint accepts in whatsmeow's ParseJID
+    if not text.isascii() or not text.isdigit() or int(text) >= 1 << bits:
+        raise ValueError(f"invalid number {text!r}")
+    return int(text)
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse(jid: str) -> JIDValue:
+    user, at, server = jid.partition("@")
+    if not at:
+        return _intern("", jid, 0, 0, 0)
+    if "@" in server:
+        raise ValueError(f"unexpected number of @ in JID {jid!r}")
+    raw_agent = device = 0
+    try:
+        if "." in user:
+            user, _, ad = user.partition(".")
+            if "." in ad:
+                raise ValueError(f"unexpected number of dots in JID {jid!r}")
+            agent, colon, dev = ad.partition(":")
+            raw_agent = _uint(agent, 8)
+            if colon:
+                device = _uint(dev, 16)
+        elif ":" in user:
+            user, _, dev = user.partition(":")
+            device = _uint(dev, 16)
+    except ValueError as e:
+        raise ValueError(f"failed to parse JID {jid!r}: {e}") from None
+    return _intern(user, server, raw_agent, device, 0)
+
+
+def as_jid(jid: JIDLike) -> Union[JID, JIDValue]:
+    """
+    Returns ``jid`` as a JID object, parsing it when it is a string.
+
+    :param jid: The JID, its string form or a :class:`JIDValue`.
+    :type jid: JIDLike
+    :return: The JID.
+    :rtype: Union[JID, JIDValue]
+    """
+    if isinstance(jid, str):
+        return _parse(jid)
+    return jid
+
+
+def jid_wire(jid: JIDLike) -> bytes:
+    """
+    Encodes a JID for the FFI functions that read it with ``utils.DecodeJID``: strings and
+    :class:`JIDValue` are sent in their string form, protobuf JIDs are serialized. Strings
+    are parsed first, so a malformed one fails here instead of in Go.
+
+    :param jid: The JID.
+    :type jid: JIDLike
+    :raises ValueError: If ``jid`` is a string that is not a valid JID.
+    :return: The bytes to pass to Go.
+    :rtype: bytes
+    """
+    if isinstance(jid, str):
+        jid = _parse(jid)
+    if isinstance(jid, JIDValue):
+        return jid.wire
+    return jid.SerializeToString()
+
 
 def JIDToNonAD(jid: JID) -> JID:
     """
@@ -11,10 +254,16 @@ def JIDToNonAD(jid: JID) -> JID:
     :return: A new JID object with RawAgent and Device set to 0.
     :rtype: JID
     """
-    new_jid = copy.deepcopy(jid)
-    new_jid.RawAgent = 0
-    new_jid.Device = 0
-    return new_jid
+    if isinstance(jid, JIDValue):
+        return jid.non_ad
+    return JID(
+        User=jid.User,
+        RawAgent=0,
+        Device=0,
+        Integrator=jid.Integrator,
+        Server=jid.Server,
+        IsEmpty=jid.IsEmpty,
+    )
 
 
 def Jid2String(jid: JID) -> str:
@@ -25,6 +274,8 @@ def Jid2String(jid: JID) -> str:
     :return: The string representation of the JID.
     :rtype: str
     """
+    if isinstance(jid, JIDValue):
+        return jid._str
     if jid.RawAgent > 0:
         return "%s.%s:%d@%s" % (jid.User, jid.RawAgent, jid.Device, jid.Server)
     elif jid.Device > 0:
@@ -1,10 +1,4 @@
-from ..proto.waE2E.WAWebProtobufsE2E_pb2 import (
-    Message,
-    ImageMessage,
-    DocumentMessage,
-    ExtendedTextMessage,
-    VideoMessage,
-)
+from ..proto.waE2E.WAWebProtobufsE2E_pb2 import Message
 from ..types import MediaMessageType, TextMessageType
 
 
@@ -26,7 +20,7 @@ def get_message_type(message: Message) -> MediaMessageType | TextMessageType:
     raise IndexError()
 
 
-def extract_text(message: Message):
+def extract_text(message: Message) -> str:
     """
     Extracts text content from a message.
 
@@ -35,18 +29,15 @@ def extract_text(message: Message):
     :return: The extracted text content.
     :rtype: str
     """
-    if message.imageMessage.ListFields():
-        imageMessage: ImageMessage = message.imageMessage
-        return imageMessage.caption
-    elif message.extendedTextMessage.ListFields():
-        extendedTextMessage: ExtendedTextMessage = message.extendedTextMessage
-        return extendedTextMessage.text
-    elif message.videoMessage.ListFields():
-        videoMessage: VideoMessage = message.videoMessage
-        return videoMessage.caption
-    elif message.documentMessage.ListFields():
-        documentMessage: DocumentMessage = message.documentMessage
-        return documentMessage.caption
-    elif message.conversation:
+    # HasField reads the presence bit, ListFields would build a list of every set field
+    if message.conversation:
         return message.conversation
+    if message.HasField("extendedTextMessage"):
+        return message.extendedTextMessage.text
+    if message.HasField("imageMessage"):
+        return message.imageMessage.caption
+    if message.HasField("videoMessage"):
+        return message.videoMessage.caption
+    if message.HasField("documentMessage"):
+        return message.documentMessage.caption
     return ""
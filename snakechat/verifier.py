@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from phonenumbers import (
+    COUNTRY_CODE_TO_REGION_CODE,
+    NumberParseException,
+    PhoneNumberFormat,
+    format_number,
+    is_possible_number,
+    parse,
+)
+
+from .ratelimit import TokenBucket, is_rate_limited
+from .utils import log
+from .utils.jid import build_jid
+from .proto.snakechat_pb2 import JID
+
+if TYPE_CHECKING:
+    from .client import NewClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS numbers (
+    e164 TEXT PRIMARY KEY,
+    is_in INTEGER NOT NULL,
+    jid TEXT,
+    checked REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+"""
+
+_FORMATTING = str.maketrans("", "", " -().\t/")
+
+
+@lru_cache(maxsize=1024)
+def _has_country_code(prefix: str) -> bool:
+    return any(
+        int(prefix[:size]) in COUNTRY_CODE_TO_REGION_CODE
+        for size in (1, 2, 3)
+        if len(prefix) >= size
+    )
+
+
+@lru_cache(maxsize=1 << 17)
+def normalize_number(number: str, region: Optional[str] = None) -> Optional[str]:
+    """
+    Normalizes a phone number to E.164. Numbers without a leading ``+`` are read in the
+    national format of ``region``, or as international numbers without the ``+`` when no
+    region is given. Numbers already in international form with a known country code skip the
+    full parse, and results are memoized, so repeated numbers are cheap.
+
+    :param number: The phone number in any common format.
+    :type number: str
+    :param region: ISO 3166 region code used for national numbers, defaults to None
+    :type region: Optional[str], optional
+    :return: The E.164 number, or None if it is not a possible phone number.
+    :rtype: Optional[str]
+    """
+    cleaned = number.translate(_FORMATTING)
+    if cleaned.startswith("00"):
+        cleaned = "+" + cleaned[2:]
+    elif region is None and not cleaned.startswith("+"):
+        cleaned = "+" + cleaned
+    digits = cleaned[1:]
+    if (
+        cleaned.startswith("+")
+        and 8 <= len(digits) <= 15
+        and digits.isdigit()
+        and digits[0] != "0"
+        and _has_country_code(digits[:3])
+    ):
+        return cleaned
+    try:
+        parsed = parse(cleaned, region)
+    except NumberParseException:
+        return None
+    if not is_possible_number(parsed):
+        return None
+    return format_number(parsed, PhoneNumberFormat.E164)
+
+
+@dataclass
+class NumberCheck:
+    number: str
+    e164: Optional[str]
+    is_in: bool
+    jid: Optional[JID]
+    cached: bool
+    # the check itself failed, is_in says nothing about the number
+    failed: bool = False
+
+
+@dataclass
+class VerifierStats:
+    numbers: int
+    invalid: int
+    cache_hits: int
+    checked: int
+    failed: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        return self.numbers / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        valid = self.cache_hits + self.checked
+        return self.cache_hits / valid if valid else 0.0
+
+
+class NumberVerifier:
+    def __init__(
+        self,
+        client: NewClient,
+        path: str = "numbers.db",
+        ttl: Union[timedelta, float] = timedelta(days=7),
+        chunk_size: int = 250,
+        concurrency: int = 4,
+        rate: float = 0.5,
+        max_attempts: int = 5,
+    ) -> None:
+        """
+        Checks large lists of phone numbers with :meth:`NewClient.is_on_whatsapp`. Numbers are
+        normalized to E.164 and deduplicated, answered from a persistent cache when possible and
+        otherwise checked in concurrent chunks under a rate limit. Every finished chunk is
+        committed to the cache, so an interrupted run picks up where it stopped.
+
+        :param client: The client used for the checks.
+        :type client: NewClient
+        :param path: Path of the SQLite cache, defaults to "numbers.db"
+        :type path: str, optional
+        :param ttl: How long a result stays valid, defaults to 7 days
+        :type ttl: Union[timedelta, float], optional
+        :param chunk_size: Numbers per request, defaults to 250
+        :type chunk_size: int, optional
+        :param concurrency: Requests in flight at once, defaults to 4
+        :type concurrency: int, optional
+        :param rate: Requests per second, defaults to 0.5
+        :type rate: float, optional
+        :param max_attempts: Attempts per chunk before its numbers are reported as failed, defaults to 5
+        :type max_attempts: int, optional
+        """
+        self.client = client
+        self.path = path
+        self.ttl = ttl.total_seconds() if isinstance(ttl, timedelta) else float(ttl)
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_attempts = max_attempts
+        self.last_stats: Optional[VerifierStats] = None
+        self._bucket = TokenBucket(rate, 1.0, time.monotonic())
+        self._bucket_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def verify(
+        self,
+        numbers: Iterable[str],
+        region: Optional[str] = None,
+        job_id: Optional[str] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[NumberCheck]:
+        """
+        Verifies ``numbers`` and returns one result per input number, in input order. Numbers
+        whose chunk failed every attempt are returned with ``failed`` set, and the job is only
+        recorded as finished when none failed.
+
+        :param numbers: The phone numbers.
+        :type numbers: Iterable[str]
+        :param region: ISO 3166 region code for numbers written in national format, defaults to None
+        :type region: Optional[str], optional
+        :param job_id: Name under which progress is recorded, see :meth:`progress`, defaults to None
+        :type job_id: Optional[str], optional
+        :param on_progress: Called with (checked, to_check) after every chunk, defaults to None
+        :type on_progress: Optional[Callable[[int, int], None]], optional
+        :return: The result of every number.
+        :rtype: List[NumberCheck]
+        """
+        start = time.monotonic()
+        numbers = list(numbers)
+        normalized = [normalize_number(number, region) for number in numbers]
+        unique = list(dict.fromkeys(e164 for e164 in normalized if e164))
+        known = self._lookup(unique)
+        missing = [e164 for e164 in unique if e164 not in known]
+        chunks = [
+            missing[i : i + self.chunk_size]
+            for i in range(0, len(missing), self.chunk_size)
+        ]
+        progress = {"done": 0, "failed": 0}
+        progress_lock = threading.Lock()
+        if job_id:
+            self._record_job(job_id, len(unique), len(known), False)
+        checked: Dict[str, NumberCheck] = {}
+        failed: Set[str] = set()
+
+        def run(chunk: List[str]):
+            results = self._check_chunk(chunk)
+            with progress_lock:
+                if results is None:
+                    progress["failed"] += len(chunk)
+                    failed.update(chunk)
+                else:
+                    checked.update(results)
+                progress["done"] += len(chunk)
+                done = progress["done"]
+                answered = done - progress["failed"]
+            if job_id:
+                self._record_job(job_id, len(unique), len(known) + answered, False)
+            if on_progress:
+                on_progress(done, len(missing))
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            list(executor.map(run, chunks))
+        if job_id and progress["failed"] == 0:
+            self._record_job(job_id, len(unique), len(unique), True)
+        results = []
+        for number, e164 in zip(numbers, normalized):
+            if e164 is None:
+                results.append(NumberCheck(number, None, False, None, False))
+                continue
+            hit = known.get(e164) or checked.get(e164)
+            if hit is None:
+                results.append(
+                    NumberCheck(number, e164, False, None, False, e164 in failed)
+                )
+            else:
+                results.append(
+                    NumberCheck(number, e164, hit.is_in, hit.jid, hit.cached)
+                )
+        self.last_stats = VerifierStats(
+            numbers=len(numbers),
+            invalid=sum(1 for e164 in normalized if e164 is None),
+            cache_hits=len(known),
+            checked=len(checked),
+            failed=progress["failed"],
+            elapsed=time.monotonic() - start,
+        )
+        log.debug(
+            "📇 Verified %d numbers in %.1fs (%.0f/s, %.0f%% cached)",
+            len(numbers),
+            self.last_stats.elapsed,
+            self.last_stats.throughput,
+            self.last_stats.hit_rate * 100,
+        )
+        return results
+
+    def progress(self, job_id: str) -> Optional[Dict[str, Union[int, bool]]]:
+        """
+        Returns the recorded progress of a job: total unique numbers, numbers done and whether
+        it finished. Running :meth:`verify` again with the same numbers resumes an unfinished job.
+
+        :param job_id: The job name passed to :meth:`verify`.
+        :type job_id: str
+        :return: The progress, None for an unknown job.
+        :rtype: Optional[Dict[str, Union[int, bool]]]
+        """
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT total, done, finished FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"total": row[0], "done": row[1], "finished": bool(row[2])}
+
+    def purge(self) -> int:
+        """Deletes expired cache entries and returns how many were removed."""
+        with self._db_lock:
+            with self._db:
+                return self._db.execute(
+                    "DELETE FROM numbers WHERE checked < ?", (time.time() - self.ttl,)
+                ).rowcount
+
+    def _lookup(self, e164s: List[str]) -> Dict[str, NumberCheck]:
+        found: Dict[str, NumberCheck] = {}
+        cutoff = time.time() - self.ttl
+        with self._db_lock:
+            for i in range(0, len(e164s), 900):
+                batch = e164s[i : i + 900]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    "SELECT e164, is_in, jid FROM numbers "
+                    f"WHERE checked >= ? AND e164 IN ({placeholders})",
+                    (cutoff, *batch),
+                )
+                for e164, is_in, jid in rows:
+                    found[e164] = NumberCheck(
+                        e164, e164, bool(is_in), self._jid(jid), True
+                    )
+        return found
+
+    @staticmethod
+    def _jid(value: Optional[str]) -> Optional[JID]:
+        if not value:
+            return None
+        user, _, server = value.partition("@")
+        return build_jid(user, server)
+
+    def _throttle(self):
+        while True:
+            with self._bucket_lock:
+                wait = self._bucket.wait_time(time.monotonic())
+                if wait <= 0:
+                    self._bucket.tokens -= 1
+                    return
+            time.sleep(wait)
+
+    def _check_chunk(self, chunk: List[str]) -> Optional[Dict[str, NumberCheck]]:
+        for attempt in range(1, self.max_attempts + 1):
+            self._throttle()
+            try:
+                responses = self.client.is_on_whatsapp(*chunk)
+                break
+            except Exception as e:
+                delay = min(60.0, 2.0**attempt)
+                if is_rate_limited(str(e)):
+                    delay *= 4
+                log.warning(
+                    "Checking %d numbers failed (attempt %d): %s", len(chunk), attempt, e
+                )
+                if attempt < self.max_attempts:
+                    time.sleep(delay)
+        else:
+            return None
+        results: Dict[str, NumberCheck] = {}
+        for response in responses:
+            e164 = normalize_number(response.Query)
+            if e164 is None:
+                continue
+            jid = response.JID if response.IsIn else None
+            results[e164] = NumberCheck(e164, e164, response.IsIn, jid, False)
+        now = time.time()
+        rows = []
+        for e164 in chunk:
+            result = results.setdefault(
+                e164, NumberCheck(e164, e164, False, None, False)
+            )
+            jid = f"{result.jid.User}@{result.jid.Server}" if result.jid else None
+            rows.append((e164, int(result.is_in), jid, now))
+        with self._db_lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO numbers (e164, is_in, jid, checked) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        return results
+
+    def _record_job(self, job_id: str, total: int, done: int, finished: bool):
+        with self._db_lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO jobs (id, total, done, finished, updated) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job_id, total, done, int(finished), time.time()),
+                )
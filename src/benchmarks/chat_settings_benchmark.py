@@ -0,0 +1,57 @@
+# Compares the per-call ChatSettingsStore methods with put_many/get_many.
+# Needs an already paired session: python chat_settings_benchmark.py db.sqlite3 [chats]
+
+import logging, os, sys, threading, time
+from datetime import timedelta
+
+sys.path.insert(0, os.getcwd())
+
+from snakechat.client import NewClient
+from snakechat.events import ConnectedEv
+from snakechat.utils import log
+from snakechat.utils.jid import build_jid
+
+log.setLevel(logging.WARNING)
+
+database = sys.argv[1] if len(sys.argv) > 1 else "db.sqlite3"
+count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+client = NewClient(database)
+connected = threading.Event()
+
+
+@client.event(ConnectedEv)
+def on_connected(_: NewClient, __: ConnectedEv):
+    connected.set()
+
+
+def measure(name: str, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{elapsed * 1000:>10.1f} ms{count / elapsed:>12.0f} chats/s")
+    return elapsed
+
+
+def run():
+    chats = [build_jid(f"1555{i:07d}") for i in range(count)]
+    until = timedelta(seconds=int(time.time()) + 3600)
+    store = client.chat_settings
+    print(f"{count} chats")
+    single_put = measure(
+        "put_muted_until per chat",
+        lambda: [store.put_muted_until(chat, until) for chat in chats],
+    )
+    bulk_put = measure("put_many", lambda: store.put_many(chats, muted_until=until))
+    single_get = measure(
+        "get_chat_settings per chat",
+        lambda: [store.get_chat_settings(chat) for chat in chats],
+    )
+    bulk_get = measure("get_many", lambda: store.get_many(chats))
+    print(f"put speedup {single_put / bulk_put:.1f}x, get speedup {single_get / bulk_get:.1f}x")
+    store.put_many(chats, muted_until=timedelta(0))
+
+
+threading.Thread(target=client.connect, daemon=True).start()
+if not connected.wait(60):
+    sys.exit("could not connect, pair the session first")
+run()
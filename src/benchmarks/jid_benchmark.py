@@ -0,0 +1,62 @@
+# Compares the protobuf JID helpers with JIDValue, no session needed.
+# python jid_benchmark.py [iterations]
+
+import copy, os, sys, timeit
+
+sys.path.insert(0, os.getcwd())
+
+from snakechat.proto.snakechat_pb2 import JID
+from snakechat.utils.jid import JIDToNonAD, JIDValue, Jid2String, jid_wire
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+text = "15551234567.0:12@s.whatsapp.net"
+proto = JID(
+    User="15551234567",
+    RawAgent=0,
+    Device=12,
+    Integrator=0,
+    Server="s.whatsapp.net",
+    IsEmpty=False,
+)
+value = JIDValue.parse(text)
+
+
+def deepcopy_non_ad(jid: JID) -> JID:
+    new_jid = copy.deepcopy(jid)
+    new_jid.RawAgent = 0
+    new_jid.Device = 0
+    return new_jid
+
+
+def parse_to_proto(jid: str) -> JID:
+    user, _, server = jid.partition("@")
+    user, _, device = user.partition(":")
+    user, _, agent = user.partition(".")
+    return JID(
+        User=user,
+        RawAgent=int(agent or 0),
+        Device=int(device or 0),
+        Integrator=0,
+        Server=server,
+        IsEmpty=False,
+    )
+
+
+cases = [
+    ("to non-AD", lambda: deepcopy_non_ad(proto), lambda: value.non_ad),
+    ("to non-AD (protobuf)", lambda: deepcopy_non_ad(proto), lambda: JIDToNonAD(proto)),
+    ("FFI bytes", lambda: proto.SerializeToString(), lambda: jid_wire(value)),
+    ("parse string", lambda: parse_to_proto(text), lambda: JIDValue.parse(text)),
+    ("format string", lambda: Jid2String(proto), lambda: str(value)),
+    ("cache key", lambda: f"{proto.User}@{proto.Server}", lambda: value.key),
+]
+
+print(f"{count} iterations")
+print(f"{'':<22}{'protobuf':>12}{'JIDValue':>12}{'speedup':>10}")
+for name, old, new in cases:
+    old_time = min(timeit.repeat(old, number=count, repeat=3))
+    new_time = min(timeit.repeat(new, number=count, repeat=3))
+    print(
+        f"{name:<22}{old_time / count * 1e9:>9.0f} ns{new_time / count * 1e9:>9.0f} ns"
+        f"{old_time / new_time:>9.1f}x"
+    )
@@ -0,0 +1,80 @@
+# Routes mixed message traffic through CommandRouter and through a rebuilt dict of lambdas.
+# No session needed: python router_benchmark.py [messages]
+
+import os, random, sys, time
+
+sys.path.insert(0, os.getcwd())
+
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import (
+    ExtendedTextMessage,
+    ImageMessage,
+    Message,
+)
+from snakechat.router import CommandRouter
+from snakechat.utils.message import extract_text
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+random.seed(1)
+names = ["ping", "help", "mute", "sticker", "image", "video", "doc", "read", "logout"]
+chatter = ["hello there", "ok", "see you tomorrow", "😂😂", "what time is it?"]
+
+
+def sample() -> Message:
+    roll = random.random()
+    if roll < 0.2:
+        return Message(conversation=f"/{random.choice(names)} 5 minutes")
+    if roll < 0.25:
+        return Message(conversation="look at https://example.com/page")
+    if roll < 0.4:
+        return Message(extendedTextMessage=ExtendedTextMessage(text=random.choice(chatter)))
+    if roll < 0.5:
+        return Message(imageMessage=ImageMessage(caption=random.choice(chatter)))
+    return Message(conversation=random.choice(chatter))
+
+
+messages = [sample() for _ in range(count)]
+hits = {"router": 0, "dict": 0}
+
+router = CommandRouter()
+for name in names:
+    router.command(name)(lambda ctx: None)
+router.regex(r"https?://\S+")(lambda ctx: None)
+
+
+def old_extract_text(message: Message) -> str:
+    if message.imageMessage.ListFields():
+        return message.imageMessage.caption
+    elif message.extendedTextMessage.ListFields():
+        return message.extendedTextMessage.text
+    elif message.videoMessage.ListFields():
+        return message.videoMessage.caption
+    elif message.documentMessage.ListFields():
+        return message.documentMessage.caption
+    elif message.conversation:
+        return message.conversation
+    return ""
+
+
+def dict_dispatch(message: Message):
+    text = old_extract_text(message)
+    actions = {f"/{name}": (lambda: None) for name in names}
+    action = actions.get(text.split(" ")[0])
+    if action is not None:
+        hits["dict"] += 1
+        action()
+
+
+def router_dispatch(message: Message):
+    found = router.resolve(extract_text(message))
+    if found is not None:
+        hits["router"] += 1
+        found[0](None)
+
+
+for name, dispatch in (("dict of lambdas", dict_dispatch), ("CommandRouter", router_dispatch)):
+    start = time.perf_counter()
+    for message in messages:
+        dispatch(message)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<18}{elapsed * 1000:>9.1f} ms{count / elapsed:>12.0f} msg/s")
+print(f"routed: dict {hits['dict']}, router {hits['router']} (router also matches links)")
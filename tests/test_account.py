@@ -0,0 +1,70 @@
+from snakechat.account import AccountState
+from snakechat.events import BlocklistEv, ConnectedEv
+from snakechat.proto.snakechat_pb2 import JID, Blocklist, BlocklistChange
+
+
+class FakeEvent:
+    def add_listener(self, event, f):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.event = FakeEvent()
+        self.account = AccountState(self)
+        self.blocklist_calls = 0
+
+    def get_blocklist(self, refresh: bool = False) -> Blocklist:
+        self.blocklist_calls += 1
+        blocklist = Blocklist(DHash="h1", JIDs=[_jid("1")])
+        self.account.set_blocklist(blocklist)
+        return blocklist
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def test_blocklist_is_fetched_once_and_then_answered_from_memory():
+    client = FakeClient()
+
+    assert client.account.is_blocked(_jid("1"))
+    assert not client.account.is_blocked(_jid("2"))
+    assert client.blocklist_calls == 1
+
+
+def test_modify_delta_against_the_cached_hash_is_applied_in_place():
+    client = FakeClient()
+    account = client.account
+    account.set_blocklist(Blocklist(DHash="h1", JIDs=[_jid("1")]))
+
+    account._on_blocklist(
+        client,
+        BlocklistEv(
+            Action=BlocklistEv.MODIFY,
+            DHASH="h2",
+            PrevDHash="h1",
+            Changes=[
+                BlocklistChange(JID=_jid("1"), BlockAction=BlocklistChange.UNBLOCK),
+                BlocklistChange(JID=_jid("2"), BlockAction=BlocklistChange.BLOCK),
+            ],
+        ),
+    )
+
+    assert account.blocklist.DHash == "h2"
+    assert [jid.User for jid in account.blocklist.JIDs] == ["2"]
+    assert account.is_blocked(_jid("2")) and not account.is_blocked(_jid("1"))
+    assert client.blocklist_calls == 0
+
+
+def test_connects_refresh_nothing_by_default():
+    client = FakeClient()
+    account = client.account
+    account._on_connected(client, ConnectedEv())
+    account.set_blocklist(Blocklist(DHash="h1", JIDs=[]))
+
+    account._on_connected(client, ConnectedEv())
+
+    # the reconnect only forgets what may be stale, nothing is fetched until it is read
+    assert account.blocklist is None
+    assert client.blocklist_calls == 0
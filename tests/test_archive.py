@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+import pytest
+
+from snakechat.archive import MessageArchive
+from snakechat.events import HistorySyncChunk
+from snakechat.proto.snakechat_pb2 import JID, MessageInfo, MessageSource
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.proto.waHistorySync.WAWebProtobufsHistorySync_pb2 import (
+    Conversation,
+    HistorySync,
+    HistorySyncMsg,
+)
+from snakechat.proto.waWeb.WAWebProtobufsWeb_pb2 import WebMessageInfo
+
+
+class FakeEvent:
+    def __init__(self):
+        self.listeners = {}
+        self.history_listeners = []
+
+    def add_listener(self, event, f):
+        self.listeners.setdefault(event, []).append(f)
+
+
+class FakeClient:
+    def __init__(self):
+        self.event = FakeEvent()
+        self.account = SimpleNamespace(own_jid=_jid("me"))
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def _info(chat: str, message_id: str, timestamp: int, sender: str = "9") -> MessageInfo:
+    return MessageInfo(
+        MessageSource=MessageSource(Chat=_jid(chat), Sender=_jid(sender), IsFromMe=False),
+        ID=message_id,
+        Timestamp=timestamp,
+        Pushname="Nine",
+    )
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MessageArchive(FakeClient(), str(tmp_path / "archive.db"), flush_interval=0.01)
+    yield archive
+    archive.close()
+
+
+def test_messages_are_archived_once(archive):
+    archive.add(_info("1", "A", 1000), Message(conversation="hello there"))
+    archive.add(_info("1", "A", 1000), Message(conversation="hello again"))
+    archive.flush()
+
+    message = archive.get(_jid("1"), "A")
+    assert archive.count() == 1
+    assert archive.has(_jid("1"), "A") and not archive.has(_jid("2"), "A")
+    assert (message.sender, message.type, message.text) == (
+        "9@s.whatsapp.net",
+        "conversation",
+        "hello there",
+    )
+    assert message.message.conversation == "hello there"
+
+
+def test_pages_walk_a_chat_newest_first(archive):
+    for i in range(5):
+        archive.add(_info("1", f"M{i}", 1000 * (i + 1)), Message(conversation=f"m{i}"))
+    archive.add(_info("2", "X", 0), Message(conversation="other chat"))
+    archive.flush()
+
+    first = archive.recent(_jid("1"), limit=2)
+    second = archive.recent(_jid("1"), limit=2, cursor=first.cursor)
+    last = archive.recent(_jid("1"), limit=2, cursor=second.cursor)
+
+    assert [m.id for m in first.messages + second.messages + last.messages] == [
+        "M4",
+        "M3",
+        "M2",
+        "M1",
+        "M0",
+    ]
+    assert last.cursor is None
+    assert [m.id for m in archive.between(_jid("1"), 2000, 4000).messages] == ["M2", "M1"]
+    assert archive.oldest(_jid("1")).id == "M0"
+    assert archive.chats() == ["2@s.whatsapp.net", "1@s.whatsapp.net"]
+
+
+def test_search_matches_words_and_filters_by_chat(archive):
+    archive.add(_info("1", "A", 1), Message(conversation="Invoice paid"))
+    archive.add(_info("1", "B", 2), Message(conversation="invoice pending"))
+    archive.add(_info("2", "C", 3), Message(conversation="Invoice for you"))
+    archive.add(_info("2", "D", 4), Message(conversation="nothing here"))
+    archive.flush()
+
+    assert [m.id for m in archive.search("invoice").messages] == ["C", "B", "A"]
+    assert [m.id for m in archive.search("invoice", chat=_jid("1")).messages] == ["B", "A"]
+    assert [m.id for m in archive.from_sender(_jid("9"), limit=1).messages] == ["D"]
+
+
+def test_history_syncs_are_archived(archive):
+    info = WebMessageInfo(messageTimestamp=5, message=Message(conversation="old"))
+    info.key.ID = "H1"
+    info.key.remoteJID = "1@s.whatsapp.net"
+    info.key.fromMe = True
+    data = HistorySync(
+        syncType=HistorySync.INITIAL_BOOTSTRAP,
+        conversations=[
+            Conversation(ID="1@s.whatsapp.net", messages=[HistorySyncMsg(message=info)])
+        ],
+    )
+
+    for f in archive.client.event.history_listeners:
+        f(archive.client, HistorySyncChunk(0, 1, 1, 1, data))
+    archive.flush()
+
+    message = archive.get(_jid("1"), "H1")
+    assert (message.timestamp, message.from_me, message.sender) == (
+        5000,
+        True,
+        "me@s.whatsapp.net",
+    )
@@ -0,0 +1,116 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from snakechat.archive import MessageArchive
+from snakechat.backfill import HistoryBackfill
+from snakechat.events import HistorySyncChunk
+from snakechat.proto.snakechat_pb2 import JID, MessageInfo, MessageSource
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.proto.waHistorySync.WAWebProtobufsHistorySync_pb2 import (
+    Conversation,
+    HistorySync,
+    HistorySyncMsg,
+)
+from snakechat.proto.waWeb.WAWebProtobufsWeb_pb2 import WebMessageInfo
+
+CHAT = "123@s.whatsapp.net"
+
+
+class FakeEvent:
+    def __init__(self):
+        self.history_listeners = []
+
+    def add_listener(self, event, f):
+        pass
+
+    def emit_history(self, client, data: HistorySync):
+        chunk = HistorySyncChunk(0, 1, len(data.conversations), len(data.conversations), data)
+        for f in self.history_listeners:
+            f(client, chunk)
+
+
+class FakeClient:
+    def __init__(self):
+        self.event = FakeEvent()
+        self.account = SimpleNamespace(own_jid=_jid("me"))
+        self.archive = None
+        # pages answered by the phone, oldest last
+        self.pages = []
+
+    def send_peer_message(self, request: Message):
+        page = self.pages.pop(0)
+
+        def answer():
+            # a live message lands in the chat while the page is being answered
+            self.archive.add(_info("LIVE", 10_000), Message(conversation="live"))
+            self.event.emit_history(self, page)
+
+        threading.Thread(target=answer).start()
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def _info(message_id: str, timestamp: int) -> MessageInfo:
+    return MessageInfo(
+        MessageSource=MessageSource(Chat=_jid("123"), Sender=_jid("123"), IsFromMe=False),
+        ID=message_id,
+        Timestamp=timestamp,
+    )
+
+
+def _page(*messages, end: bool = False) -> HistorySync:
+    conversation = Conversation(ID=CHAT)
+    if end:
+        conversation.endOfHistoryTransferType = (
+            Conversation.COMPLETE_AND_NO_MORE_MESSAGE_REMAIN_ON_PRIMARY
+        )
+    for message_id, seconds in messages:
+        info = WebMessageInfo(messageTimestamp=seconds, message=Message(conversation="old"))
+        info.key.ID = message_id
+        info.key.remoteJID = CHAT
+        info.key.fromMe = False
+        conversation.messages.append(HistorySyncMsg(message=info))
+    return HistorySync(syncType=HistorySync.ON_DEMAND, conversations=[conversation])
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = FakeClient()
+    client.archive = MessageArchive(client, str(tmp_path / "archive.db"), flush_interval=0.01)
+    client.archive.add(_info("NEWEST", 5_000_000), Message(conversation="newest"))
+    client.archive.flush()
+    yield client
+    client.archive.close()
+
+
+def test_added_counts_only_the_rows_the_page_inserted(client):
+    client.pages = [
+        # "A2" repeats a message the archive already has after the first page
+        _page(("A1", 4000), ("A2", 3000)),
+        _page(("A2", 3000), ("A3", 2000), end=True),
+    ]
+    backfill = HistoryBackfill(client, client.archive, page_timeout=5, rate=1000)
+
+    progress = backfill.run()
+
+    cursor = backfill.cursor(CHAT)
+    assert (progress.pages, progress.received, progress.added) == (2, 4, 3)
+    assert (cursor.pages, cursor.added, cursor.done) == (2, 3, True)
+    assert cursor.oldest_id == "A3"
+    # the live message is archived but not counted as backfilled
+    assert client.archive.count(_jid("123")) == 5
+
+
+def test_on_demand_syncs_of_other_chats_are_still_archived(client):
+    HistoryBackfill(client, client.archive)
+    data = _page(("B1", 1000))
+    data.conversations[0].ID = "456@s.whatsapp.net"
+
+    client.event.emit_history(client, data)
+    client.archive.flush()
+
+    assert client.archive.count(_jid("456")) == 1
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from snakechat.contacts import ContactDirectory
+from snakechat.events import MessageEv
+from snakechat.proto.snakechat_pb2 import JID, ContactInfo, MessageInfo, MessageSource
+
+
+class FakeEvent:
+    def __init__(self):
+        self.listeners = {}
+
+    def add_listener(self, event, f):
+        self.listeners.setdefault(event, []).append(f)
+
+
+class FakeStore:
+    def __init__(self, names):
+        self.names = names
+        self.single = 0
+        self.bulk = []
+
+    def _info(self, user: str) -> ContactInfo:
+        name = self.names.get(user)
+        return ContactInfo(Found=name is not None, FullName=name or "")
+
+    def get_contact(self, jid: JID) -> ContactInfo:
+        self.single += 1
+        return self._info(jid.User)
+
+    def get_contacts(self, jids):
+        self.bulk.append([jid.User for jid in jids])
+        return [SimpleNamespace(JID=jid, Info=self._info(jid.User)) for jid in jids]
+
+    def get_all_contacts(self):
+        return [
+            SimpleNamespace(JID=_jid(user), Info=self._info(user)) for user in self.names
+        ]
+
+
+class FakeClient:
+    def __init__(self, **names):
+        self.event = FakeEvent()
+        self.contact = FakeStore(names)
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def test_contacts_are_read_from_the_store_once():
+    client = FakeClient(**{"1": "Ann"})
+    contacts = ContactDirectory(client)
+
+    assert contacts.name(_jid("1")) == "Ann"
+    assert contacts.get(_jid("1")).found
+    assert not contacts.get(_jid("2")).found
+    assert client.contact.single == 2
+    assert (contacts.hits, contacts.misses) == (1, 2)
+
+
+def test_bulk_lookup_fetches_every_miss_in_one_call():
+    client = FakeClient(**{"1": "Ann", "2": "Bob"})
+    contacts = ContactDirectory(client)
+    contacts.get(_jid("1"))
+
+    found = contacts.get_contacts([_jid("2"), _jid("1"), _jid("2"), _jid("3")])
+
+    assert [c.name for c in found] == ["Bob", "Ann", "Bob", ""]
+    assert client.contact.bulk == [["2", "3"]]
+
+
+def test_least_recently_used_contacts_are_evicted():
+    contacts = ContactDirectory(FakeClient(**{"1": "a", "2": "b", "3": "c"}), maxsize=2)
+    contacts.get(_jid("1"))
+    contacts.get(_jid("2"))
+    contacts.get(_jid("1"))
+    contacts.get(_jid("3"))
+
+    assert len(contacts) == 2
+    assert "2@s.whatsapp.net" not in contacts._entries
+    assert contacts.preload() == 2
+
+
+def test_push_names_from_messages_update_held_contacts():
+    client = FakeClient()
+    contacts = ContactDirectory(client)
+    contacts.enable()
+    contacts.get(_jid("1"))
+    on_message = client.event.listeners[MessageEv][0]
+
+    def message(user: str, push_name: str, from_me: bool = False) -> MessageEv:
+        source = MessageSource(Sender=_jid(user), IsFromMe=from_me)
+        return MessageEv(Info=MessageInfo(MessageSource=source, Pushname=push_name))
+
+    on_message(client, message("1", "Annie"))
+    on_message(client, message("1", "Me", from_me=True))
+    on_message(client, message("2", "Stranger"))
+
+    assert contacts.name(_jid("1")) == "Annie"
+    assert len(contacts) == 1
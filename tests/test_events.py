@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from snakechat.events import (
+    OFFLINE_BATCH,
+    OFFLINE_BATCH_FINAL,
+    Event,
+    MessageEv,
+    iter_frames,
+)
+from snakechat.proto.snakechat_pb2 import MessageInfo
+
+
+def _uvarint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _frames(*records: bytes) -> bytes:
+    return b"".join(_uvarint(len(record)) + record for record in records)
+
+
+def _message(message_id: str) -> MessageEv:
+    return MessageEv(Info=MessageInfo(ID=message_id))
+
+
+def test_frames_are_split_on_their_length_prefix():
+    records = [b"", b"a", b"x" * 300, b"b" * 20000]
+    data = b"\x01" + _frames(*records)
+
+    assert list(iter_frames(data, 1)) == records
+    assert list(iter_frames(b"")) == []
+
+
+def test_offline_batches_reach_the_listeners_and_the_handler_in_order():
+    event = Event(SimpleNamespace(uuid=b"a"))
+    seen, batches = [], []
+    event.add_listener(MessageEv, lambda client, message: seen.append(message.Info.ID))
+    event.offline_batch_func = batches.append
+    first = _frames(*(_message(i).SerializePartialToString() for i in "AB"))
+
+    event.deliver(OFFLINE_BATCH, b"\x00" + first)
+    event.deliver(
+        OFFLINE_BATCH,
+        bytes([OFFLINE_BATCH_FINAL]) + _frames(_message("C").SerializePartialToString()),
+    )
+
+    assert seen == ["A", "B", "C"]
+    assert [[m.Info.ID for m in batch] for batch in batches] == [["A", "B"], ["C"]]
+    assert [batch.final for batch in batches] == [False, True]
+
+
+def test_a_failing_listener_does_not_drop_the_batch():
+    event = Event(SimpleNamespace(uuid=b"a"))
+    batches = []
+
+    def broken(client, message):
+        raise RuntimeError("boom")
+
+    event.add_listener(MessageEv, broken)
+    event.offline_batch_func = batches.append
+    event.deliver(OFFLINE_BATCH, b"\x00" + _frames(_message("A").SerializePartialToString()))
+
+    assert len(batches) == 1 and batches[0][0].Info.ID == "A"
@@ -0,0 +1,123 @@
+import time
+from types import SimpleNamespace
+
+from snakechat.events import ConnectedEv, GroupInfoEv
+from snakechat.groups import GroupCache
+from snakechat.proto.snakechat_pb2 import JID, GroupInfo, GroupName, GroupParticipant
+
+
+class FakeEvent:
+    def __init__(self):
+        self.listeners = {}
+
+    def add_listener(self, event, f):
+        self.listeners.setdefault(event, []).append(f)
+
+    def emit(self, client, ev):
+        for f in self.listeners.get(type(ev), []):
+            f(client, ev)
+
+
+class FakeClient:
+    def __init__(self):
+        self.event = FakeEvent()
+        self.account = SimpleNamespace(own_jid=_jid("me"))
+        self.groups = GroupCache(self)
+        self.joined_calls = 0
+
+    def get_joined_groups(self):
+        self.joined_calls += 1
+        self.groups.put_all([_group("g1", "1", "2")])
+
+
+def _jid(user: str, server: str = "s.whatsapp.net") -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server=server)
+
+
+def _group(user: str, admin: str, *members: str) -> GroupInfo:
+    info = GroupInfo(JID=_jid(user, "g.us"), ParticipantVersionID="v1")
+    info.GroupName.Name = "before"
+    for member in (admin, *members):
+        participant = GroupParticipant(
+            IsAdmin=member == admin, IsSuperAdmin=False, DisplayName="", Error=0
+        )
+        participant.JID.CopyFrom(_jid(member))
+        info.Participants.append(participant)
+    return info
+
+
+def test_lookup_returns_a_snapshot_that_events_do_not_change():
+    client = FakeClient()
+    cache = client.groups
+    cache.put(_group("g1", "1", "2"))
+    before = cache.lookup(_jid("g1", "g.us"))
+
+    client.event.emit(
+        client,
+        GroupInfoEv(
+            JID=_jid("g1", "g.us"),
+            Name=GroupName(Name="after", NameSetAt=0, NameSetBy=_jid("1")),
+            Join=[_jid("3")],
+        ),
+    )
+    after = cache.lookup(_jid("g1", "g.us"))
+
+    assert before.GroupName.Name == "before"
+    assert len(before.Participants) == 2
+    assert after.GroupName.Name == "after"
+    assert len(after.Participants) == 3
+    assert cache.is_member(_jid("g1", "g.us"), _jid("3"))
+
+
+def test_put_keeps_its_own_copy():
+    cache = FakeClient().groups
+    info = _group("g1", "1")
+    cache.put(info)
+    info.GroupName.Name = "changed by the caller"
+
+    assert cache.lookup(_jid("g1", "g.us")).GroupName.Name == "before"
+
+
+def test_roles_and_user_index_follow_events():
+    client = FakeClient()
+    cache = client.groups
+    group = _jid("g1", "g.us")
+    cache.put(_group("g1", "1", "2"))
+
+    client.event.emit(client, GroupInfoEv(JID=group, Promote=[_jid("2")]))
+    client.event.emit(client, GroupInfoEv(JID=group, Leave=[_jid("1")]))
+
+    assert cache.is_admin(group, _jid("2"))
+    assert not cache.is_member(group, _jid("1"))
+    assert cache.groups_of(_jid("1")) == []
+    assert [jid.User for jid in cache.groups_of(_jid("2"))] == ["g1"]
+
+
+def test_missed_participant_delta_drops_the_group():
+    client = FakeClient()
+    cache = client.groups
+    cache.put(_group("g1", "1"))
+
+    client.event.emit(
+        client,
+        GroupInfoEv(
+            JID=_jid("g1", "g.us"), PrevParticipantsVersionID="v0", Join=[_jid("3")]
+        ),
+    )
+
+    assert cache.lookup(_jid("g1", "g.us")) is None
+
+
+def test_groups_are_warmed_on_the_first_connect_only():
+    client = FakeClient()
+    cache = client.groups
+    cache._on_connected(client, ConnectedEv())
+    deadline = time.monotonic() + 5
+    while not cache._warmed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for _ in range(3):
+        cache._on_connected(client, ConnectedEv())
+    time.sleep(0.05)
+
+    assert client.joined_calls == 1
+    assert len(cache) == 1
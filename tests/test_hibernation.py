@@ -0,0 +1,103 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from snakechat import hibernation
+from snakechat.exc import ConnectError
+from snakechat.hibernation import Hibernation
+
+
+class FakeClient:
+    def __init__(self, name: str = "a", wakes: bool = True):
+        self.uuid = name.encode()
+        self.hibernated = False
+        self.is_connected = True
+        self.is_logged_in = True
+        self.last_activity = time.monotonic()
+        self.wakes = wakes
+        self.disconnects = 0
+
+    def disconnect(self):
+        self.disconnects += 1
+        self.is_connected = self.is_logged_in = False
+
+    def reconnect(self):
+        self.is_connected = True
+        self.is_logged_in = self.wakes
+
+
+class FakeFactory:
+    def __init__(self, *clients):
+        self.clients = list(clients)
+
+
+@pytest.fixture(autouse=True)
+def memory(monkeypatch):
+    # the Go runtime holds 100 bytes and drops to 40 once a session is released
+    monkeypatch.setattr(
+        hibernation,
+        "gocode",
+        SimpleNamespace(MemoryInUse=lambda: 100, ReleaseMemory=lambda: 40),
+    )
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_a_hibernated_session_wakes_on_outbound_calls():
+    client = FakeClient()
+    manager = Hibernation(FakeFactory(client))
+
+    assert manager.hibernate(client) == 60
+    assert manager.hibernate(client) == 0
+    assert client.hibernated and client.disconnects == 1
+
+    manager.on_outbound(client)
+
+    assert not client.hibernated and client.is_logged_in
+    stats = manager.stats()
+    assert (stats.hibernated, stats.awake, stats.memory_saved, stats.wake_count) == (
+        0,
+        1,
+        60,
+        1,
+    )
+
+
+def test_a_session_that_does_not_wake_stays_hibernated():
+    client = FakeClient(wakes=False)
+    manager = Hibernation(FakeFactory(client))
+    manager.wake_timeout = 0.05
+    manager.hibernate(client)
+
+    with pytest.raises(ConnectError):
+        manager.wake(client)
+
+    assert client.hibernated
+    assert client.disconnects == 2
+    assert manager.stats().wake_count == 0
+
+
+def test_idle_sessions_are_hibernated_and_drained():
+    idle, busy = FakeClient("idle"), FakeClient("busy")
+    idle.last_activity -= 60
+    manager = Hibernation(FakeFactory(idle, busy))
+    manager.enable(idle_timeout=30, check_interval=0.01)
+    try:
+        assert _wait(lambda: idle.hibernated)
+        assert not busy.hibernated
+
+        manager.drain_interval = 0.05
+        idle.last_activity = time.monotonic()
+        assert _wait(lambda: manager.stats().wake_count == 1)
+    finally:
+        manager.disable()
+
+    assert not idle.hibernated and not busy.hibernated
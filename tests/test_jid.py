@@ -0,0 +1,85 @@
+import pickle
+
+import pytest
+
+from snakechat.proto.snakechat_pb2 import JID
+from snakechat.utils.jid import (
+    WIRE_STRING,
+    JIDToNonAD,
+    JIDValue,
+    Jid2String,
+    as_jid,
+    jid_wire,
+)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "123@s.whatsapp.net",
+        "123:4@s.whatsapp.net",
+        "123.1:4@lid",
+        "120363@g.us",
+        "s.whatsapp.net",
+    ],
+)
+def test_parse_and_format_round_trip(text):
+    jid = JIDValue.parse(text)
+
+    assert str(jid) == text
+    assert Jid2String(jid) == text
+    assert Jid2String(jid.proto) == text
+
+
+def test_parse_reads_agent_and_device():
+    jid = JIDValue.parse("123.1:4@lid")
+
+    assert (jid.User, jid.RawAgent, jid.Device, jid.Server) == ("123", 1, 4, "lid")
+    assert jid.non_ad == JIDValue.of("123", "lid")
+    assert jid.key == "123@lid"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "a@b@c",
+        "123.x@s.whatsapp.net",
+        "123.256@s.whatsapp.net",
+        "123:65536@s.whatsapp.net",
+        "123:-1@s.whatsapp.net",
+        "123.1.2@s.whatsapp.net",
+    ],
+)
+def test_parse_rejects_what_go_rejects(text):
+    with pytest.raises(ValueError):
+        JIDValue.parse(text)
+    with pytest.raises(ValueError):
+        jid_wire(text)
+
+
+def test_values_are_interned_and_immutable():
+    jid = JIDValue.parse("123@s.whatsapp.net")
+
+    assert jid is JIDValue.of("123")
+    assert jid is JIDValue.from_proto(jid.proto)
+    assert pickle.loads(pickle.dumps(jid)) is jid
+    assert jid.non_ad is jid
+    with pytest.raises(AttributeError):
+        jid.User = "456"
+
+
+def test_jid_wire_of_strings_values_and_protos():
+    proto = JID(User="123", RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+    assert jid_wire("123@s.whatsapp.net") == WIRE_STRING + b"123@s.whatsapp.net"
+    assert jid_wire(JIDValue.of("123")) == WIRE_STRING + b"123@s.whatsapp.net"
+    assert jid_wire(proto) == proto.SerializeToString()
+    assert JIDValue.of("123").SerializeToString() == JIDValue.of("123").proto.SerializeToString()
+
+
+def test_as_jid_and_non_ad_of_protos():
+    proto = JID(User="123", RawAgent=0, Device=3, Integrator=0, Server="s.whatsapp.net")
+
+    assert as_jid(proto) is proto
+    assert as_jid("123:3@s.whatsapp.net") == JIDValue.from_proto(proto)
+    assert Jid2String(JIDToNonAD(proto)) == "123@s.whatsapp.net"
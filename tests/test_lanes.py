@@ -0,0 +1,101 @@
+import threading
+import time
+
+from snakechat.lanes import EventLanes
+from snakechat.utils.enum import EventPriority
+
+NORMAL, LOW, CONTROL, CHUNK = 13, 18, 3, 45
+
+
+class Recorder:
+    def __init__(self):
+        self.delivered = []
+        self.threads = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def block(self):
+        self.release.clear()
+
+    def __call__(self, code: int, data: bytes):
+        self.started.set()
+        self.release.wait(5)
+        with self._lock:
+            self.delivered.append((code, data))
+            self.threads.append(threading.current_thread().name)
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_control_events_and_disabled_lanes_are_delivered_by_the_caller():
+    lanes = EventLanes(Recorder())
+    assert not lanes.submit(NORMAL, b"")
+
+    lanes.enable(workers=1)
+    try:
+        assert not lanes.submit(CONTROL, b"")
+        assert lanes.submit(NORMAL, b"")
+    finally:
+        lanes.disable()
+
+
+def test_oldest_low_events_are_shed_first_and_higher_lanes_drain_first():
+    recorder = Recorder()
+    lanes = EventLanes(recorder)
+    lanes.enable(workers=1, shed_low=2)
+    try:
+        recorder.block()
+        lanes.submit(NORMAL, b"busy")
+        assert recorder.started.wait(5)
+        for i in range(5):
+            lanes.submit(LOW, b"low%d" % i)
+        lanes.submit(NORMAL, b"normal")
+
+        stats = lanes.stats()
+        assert stats.shed[EventPriority.LOW] == 4
+        assert stats.queued[EventPriority.LOW] == 1
+        assert stats.queued[EventPriority.NORMAL] == 1
+        recorder.release.set()
+    finally:
+        lanes.disable()
+
+    assert recorder.delivered == [(NORMAL, b"busy"), (NORMAL, b"normal"), (LOW, b"low4")]
+
+
+def test_chunked_events_keep_their_order_on_one_worker():
+    recorder = Recorder()
+    lanes = EventLanes(recorder)
+    lanes.enable(workers=4, shed_normal=0)
+    try:
+        for i in range(50):
+            assert lanes.submit(CHUNK, b"%d" % i)
+        assert _wait(lambda: len(recorder.delivered) == 50)
+    finally:
+        lanes.disable()
+
+    assert recorder.delivered == [(CHUNK, b"%d" % i) for i in range(50)]
+    assert set(recorder.threads) == {"snakechat-events-ordered"}
+    assert lanes.stats().shed[EventPriority.NORMAL] == 0
+
+
+def test_disable_delivers_what_is_queued():
+    recorder = Recorder()
+    lanes = EventLanes(recorder)
+    lanes.enable(workers=2)
+    for i in range(20):
+        lanes.submit(NORMAL, b"%d" % i)
+    lanes.disable()
+
+    assert sorted(data for _, data in recorder.delivered) == sorted(
+        b"%d" % i for i in range(20)
+    )
+    assert not lanes.enabled
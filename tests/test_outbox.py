@@ -0,0 +1,150 @@
+import threading
+import time
+
+import pytest
+
+from snakechat.exc import OutboxCommitError
+from snakechat.outbox import Outbox
+from snakechat.proto.snakechat_pb2 import JID
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.utils.enum import OutboxState
+
+
+class FakeClient:
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+        self.attempts = []
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def generate_message_id(self) -> str:
+        with self._lock:
+            self._ids += 1
+            return f"ID{self._ids}"
+
+    def build_text_message(self, text: str, link_preview: bool = False) -> Message:
+        return Message(conversation=text)
+
+    def send_message(self, to, message, message_id=None):
+        with self._lock:
+            self.attempts.append(message_id)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("not delivered")
+            self.sent.append((to.User, message.conversation, message_id))
+
+
+def _jid(user: str = "123") -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.db")
+
+
+def test_enqueued_message_is_sent_and_marked_sent(path):
+    client = FakeClient()
+    outbox = Outbox(client, path, workers=1, flush_interval=0.01)
+    outbox.start()
+    try:
+        message_id = outbox.enqueue(_jid(), "hello")
+        assert outbox.flush(timeout=5)
+        assert _wait(lambda: outbox.state(message_id) == OutboxState.SENT)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert client.sent == [("123", "hello", message_id)]
+    assert outbox.stats().sent == 1
+
+
+def test_failed_attempts_are_retried_with_the_same_id(path):
+    client = FakeClient(failures=2)
+    outbox = Outbox(
+        client, path, workers=1, base_delay=0.01, max_delay=0.02, flush_interval=0.01
+    )
+    outbox.start()
+    try:
+        message_id = outbox.enqueue(_jid(), "hello")
+        assert _wait(lambda: outbox.state(message_id) == OutboxState.SENT)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert client.attempts == [message_id] * 3
+    assert outbox.stats().retried == 2
+
+
+def test_message_fails_for_good_after_max_attempts(path):
+    client = FakeClient(failures=10)
+    outbox = Outbox(
+        client,
+        path,
+        workers=1,
+        max_attempts=3,
+        base_delay=0.01,
+        max_delay=0.02,
+        flush_interval=0.01,
+    )
+    outbox.start()
+    try:
+        message_id = outbox.enqueue(_jid(), "hello")
+        assert _wait(lambda: outbox.state(message_id) == OutboxState.FAILED)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert len(client.attempts) == 3
+    assert client.sent == []
+    assert outbox.purge() == 1
+    assert outbox.state(message_id) is None
+
+
+def test_pending_messages_are_recovered_by_the_next_start(path):
+    first = Outbox(FakeClient(failures=1), path, workers=1, base_delay=60)
+    first.start()
+    message_id = first.enqueue(_jid(), "hello")
+    assert _wait(lambda: first.state(message_id) == OutboxState.RETRY)
+    first.stop(timeout=5)
+
+    client = FakeClient()
+    second = Outbox(client, path, workers=1, flush_interval=0.01)
+    second._db.execute("UPDATE outbox SET next_attempt = 0")
+    second._db.commit()
+    second.start()
+    try:
+        assert _wait(lambda: second.state(message_id) == OutboxState.SENT)
+    finally:
+        second.stop(timeout=5)
+
+    assert client.sent == [("123", "hello", message_id)]
+
+
+def test_failed_commit_marks_messages_failed_and_flush_raises(path):
+    client = FakeClient()
+    outbox = Outbox(client, path, workers=1, flush_interval=0.01)
+    outbox.start()
+    try:
+        outbox._db.close()
+        message_id = outbox.enqueue(_jid(), "hello")
+        with pytest.raises(OutboxCommitError):
+            outbox.flush(timeout=5)
+        assert outbox.state(message_id) == OutboxState.FAILED
+        assert outbox.flush(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+    assert client.attempts == []
+    assert message_id not in outbox._states
+
+
+def test_stop_before_start_does_nothing(path):
+    Outbox(FakeClient(), path).stop()
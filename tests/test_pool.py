@@ -0,0 +1,132 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from snakechat.exc import NoSessionAvailableError
+from snakechat.pool import SessionPool
+from snakechat.proto.snakechat_pb2 import JID
+from snakechat.utils.enum import RoutingStrategy
+
+
+class FakeEvent:
+    def add_listener(self, event, f):
+        pass
+
+
+class FakeClient:
+    def __init__(self, name: str, fail_and_drop: bool = False):
+        self.uuid = name.encode()
+        self.event = FakeEvent()
+        self.scheduler = SimpleNamespace(is_throttled=False, backlog=0)
+        self.hibernated = False
+        self.is_connected = True
+        self.fail_and_drop = fail_and_drop
+        self.sent = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.sending = threading.Event()
+        self._ids = 0
+
+    def generate_message_id(self) -> str:
+        self._ids += 1
+        return f"{self.uuid.decode()}-{self._ids}"
+
+    def send_message(self, to, message, message_id=None, priority=None):
+        self.sending.set()
+        self.gate.wait(5)
+        if self.fail_and_drop:
+            self.is_connected = False
+            raise RuntimeError("connection lost")
+        self.sent.append((to.User, message, message_id))
+        return SimpleNamespace(ID=message_id, sender=self.uuid)
+
+
+class FakeFactory:
+    def __init__(self, *clients):
+        self.clients = list(clients)
+        self.supervisor = SimpleNamespace(enabled=False)
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def _pool(*clients, **settings) -> SessionPool:
+    pool = SessionPool(FakeFactory(*clients))
+    pool.enable(**settings)
+    return pool
+
+
+def test_least_loaded_routing_uses_every_session():
+    a, b = FakeClient("a"), FakeClient("b")
+    a.gate.clear()
+    pool = _pool(a, b, concurrency=1)
+    try:
+        futures = [pool.submit(_jid(str(i)), f"m{i}") for i in range(4)]
+        a.gate.set()
+        responses = [future.result(5) for future in futures]
+    finally:
+        pool.disable()
+
+    assert {response.sender for response in responses} == {b"a", b"b"}
+    assert len(a.sent) + len(b.sent) == 4
+    assert pool.stats().sent == 4
+
+
+def test_sticky_routing_keeps_a_recipient_on_one_session():
+    a, b = FakeClient("a"), FakeClient("b")
+    pool = _pool(a, b, strategy=RoutingStrategy.STICKY)
+    try:
+        senders = {pool.send(_jid("1"), "hi", timeout=5).sender for _ in range(5)}
+    finally:
+        pool.disable()
+
+    assert len(senders) == 1
+    assert pool.session_for(_jid("1")).uuid in senders
+
+
+def test_a_send_that_fails_as_its_session_drops_moves_to_another_one():
+    dropping, healthy = FakeClient("a", fail_and_drop=True), FakeClient("b")
+    pool = _pool(dropping, strategy=RoutingStrategy.ROUND_ROBIN)
+    pool.client_factory.clients.append(healthy)
+    try:
+        future = pool.submit(_jid("1"), "hi")
+        pool.attach(healthy)
+        response = future.result(5)
+    finally:
+        pool.disable()
+
+    assert response.sender == b"b"
+    # the job keeps the ID it got on its first session
+    assert healthy.sent == [("1", "hi", "a-1")]
+    assert pool.rebalanced == 1
+
+
+def test_submit_fails_without_an_available_session():
+    client = FakeClient("a")
+    client.is_connected = False
+    pool = SessionPool(FakeFactory(client))
+    with pytest.raises(NoSessionAvailableError):
+        pool.submit(_jid("1"), "hi")
+
+    pool.enable()
+    with pytest.raises(NoSessionAvailableError):
+        pool.submit(_jid("1"), "hi")
+    pool.disable()
+
+
+def test_disable_fails_the_queued_messages():
+    client = FakeClient("a")
+    client.gate.clear()
+    pool = _pool(client, concurrency=1)
+    first = pool.submit(_jid("1"), "first")
+    second = pool.submit(_jid("1"), "second")
+    assert client.sending.wait(5)
+
+    pool.disable()
+    client.gate.set()
+
+    assert first.result(5).ID == "a-1"
+    with pytest.raises(NoSessionAvailableError):
+        second.result(5)
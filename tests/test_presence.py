@@ -0,0 +1,88 @@
+import threading
+import time
+
+from snakechat.presence import TypingIndicator
+from snakechat.utils.enum import ChatPresence, ChatPresenceMedia
+
+COMPOSING = ChatPresence.CHAT_PRESENCE_COMPOSING
+PAUSED = ChatPresence.CHAT_PRESENCE_PAUSED
+TEXT = ChatPresenceMedia.CHAT_PRESENCE_MEDIA_TEXT
+AUDIO = ChatPresenceMedia.CHAT_PRESENCE_MEDIA_AUDIO
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_chat_presence(self, chat, presence, media):
+        with self._lock:
+            self.sent.append((str(chat), presence, media))
+        return ""
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_nested_blocks_send_one_composing_and_one_paused():
+    client = FakeClient()
+    typing = TypingIndicator(client)
+    with typing.hold("1@s.whatsapp.net"):
+        assert _wait(lambda: client.sent)
+        with typing.hold("1@s.whatsapp.net"):
+            assert typing.stats().typing == 1
+    assert _wait(lambda: len(client.sent) == 2)
+    time.sleep(0.05)
+
+    assert client.sent == [
+        ("1@s.whatsapp.net", COMPOSING, TEXT),
+        ("1@s.whatsapp.net", PAUSED, TEXT),
+    ]
+    stats = typing.stats()
+    assert (stats.typing, stats.sent, stats.coalesced) == (0, 2, 1)
+
+
+def test_a_block_that_ends_before_composing_was_sent_sends_nothing():
+    client = FakeClient()
+    typing = TypingIndicator(client)
+    with typing._cond:
+        # the worker cannot send while the lock is held
+        typing.start("1@s.whatsapp.net")
+        typing.stop("1@s.whatsapp.net")
+    time.sleep(0.05)
+
+    assert client.sent == []
+    assert typing.stats().coalesced == 1
+
+
+def test_composing_is_refreshed_and_resent_for_a_new_media():
+    client = FakeClient()
+    typing = TypingIndicator(client, refresh=0.05)
+    typing.start("1@s.whatsapp.net")
+    assert _wait(lambda: len(client.sent) >= 2)
+    typing.start("1@s.whatsapp.net", AUDIO)
+    assert _wait(lambda: ("1@s.whatsapp.net", COMPOSING, AUDIO) in client.sent)
+    typing.stop("1@s.whatsapp.net")
+    typing.stop("1@s.whatsapp.net")
+
+    assert _wait(lambda: client.sent[-1] == ("1@s.whatsapp.net", PAUSED, AUDIO))
+    assert client.sent[:2] == [("1@s.whatsapp.net", COMPOSING, TEXT)] * 2
+
+
+def test_updates_share_the_rate_budget():
+    client = FakeClient()
+    typing = TypingIndicator(client, max_per_second=2.0)
+    for user in range(4):
+        typing.start(f"{user}@s.whatsapp.net")
+
+    assert _wait(lambda: len(client.sent) == 2)
+    time.sleep(0.1)
+    assert len(client.sent) == 2
+    assert _wait(lambda: len(client.sent) == 4)
+    assert typing.stats().throttled >= 1
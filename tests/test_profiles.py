@@ -0,0 +1,94 @@
+import threading
+import time
+
+from snakechat.profiles import ProfileCache, TTLCache
+from snakechat.proto.snakechat_pb2 import (
+    JID,
+    GetUserInfoSingleReturnFunction,
+    UserInfo,
+)
+
+
+class FakeEvent:
+    def add_listener(self, event, f):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.event = FakeEvent()
+        self.calls = []
+
+    def _fetch_user_info(self, jids):
+        self.calls.append(list(jids))
+        return [
+            GetUserInfoSingleReturnFunction(JID=jid, UserInfo=UserInfo(Status="hi"))
+            for jid in jids
+        ]
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def test_refresh_joining_an_unsent_batch_resolves_both_callers():
+    client = FakeClient()
+    cache = ProfileCache(client, batch_window=0.2)
+    results = {}
+
+    def lookup(name: str, refresh: bool):
+        results[name] = cache.get_user_info([_jid("123")], refresh=refresh)
+
+    first = threading.Thread(target=lookup, args=("first", False))
+    second = threading.Thread(target=lookup, args=("second", True))
+    first.start()
+    # the refresh arrives while the first caller's request is still collecting
+    time.sleep(0.05)
+    second.start()
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert not first.is_alive() and not second.is_alive()
+    assert results["first"][0].UserInfo.Status == "hi"
+    assert results["second"][0].UserInfo.Status == "hi"
+    assert len(client.calls) == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_concurrent_misses_share_one_request():
+    client = FakeClient()
+    cache = ProfileCache(client, batch_window=0.1)
+    threads = [
+        threading.Thread(target=cache.get_user_info, args=([_jid(str(i))],))
+        for i in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(client.calls) == 1
+    assert len(client.calls[0]) == 5
+    assert cache.get_user_info([_jid("3")])[0].UserInfo.Status == "hi"
+    assert len(client.calls) == 1
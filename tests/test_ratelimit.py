@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from snakechat.proto.snakechat_pb2 import JID
+from snakechat.ratelimit import SendScheduler, TokenBucket, _Waiter, is_rate_limited
+from snakechat.utils.enum import SendPriority
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def _scheduler(**settings) -> SendScheduler:
+    # configured without the dispatcher thread, _dispatch is driven by the tests
+    scheduler = SendScheduler(client=None)
+    for name, value in settings.items():
+        setattr(scheduler, name, value)
+    scheduler._account = TokenBucket(scheduler.account_rate, scheduler.account_burst, 0.0)
+    return scheduler
+
+
+def _queue(scheduler: SendScheduler, priority: SendPriority, chat: str) -> _Waiter:
+    waiter = _Waiter(f"{chat}@s.whatsapp.net", 0.0)
+    scheduler._queues[priority].append(waiter)
+    return waiter
+
+
+def test_token_bucket_refills_up_to_its_capacity():
+    bucket = TokenBucket(rate=2.0, capacity=3.0, now=0.0)
+
+    assert [bucket.take(0.0) for _ in range(4)] == [True, True, True, False]
+    assert bucket.wait_time(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5)
+    bucket.refill(100.0)
+    assert bucket.tokens == 3.0
+
+
+def test_rate_limit_errors_are_recognised():
+    assert is_rate_limited("server returned error 429")
+    assert is_rate_limited("rate-overlimit")
+    assert not is_rate_limited("not-authorized")
+
+
+def test_higher_classes_are_granted_first():
+    scheduler = _scheduler(account_burst=2.0, bulk_reserve=0.0)
+    bulk = _queue(scheduler, SendPriority.BULK, "1")
+    normal = _queue(scheduler, SendPriority.NORMAL, "2")
+    interactive = _queue(scheduler, SendPriority.INTERACTIVE, "3")
+
+    wait = scheduler._dispatch(0.0)
+
+    assert interactive.granted.is_set() and normal.granted.is_set()
+    assert not bulk.granted.is_set()
+    assert wait == pytest.approx(1.0)
+
+
+def test_bulk_sends_leave_the_reserve_to_interactive_ones():
+    scheduler = _scheduler(account_burst=2.0, bulk_reserve=1.0)
+    first = _queue(scheduler, SendPriority.BULK, "1")
+    second = _queue(scheduler, SendPriority.BULK, "2")
+
+    scheduler._dispatch(0.0)
+    assert first.granted.is_set() and not second.granted.is_set()
+
+    interactive = _queue(scheduler, SendPriority.INTERACTIVE, "3")
+    scheduler._dispatch(0.0)
+    assert interactive.granted.is_set() and not second.granted.is_set()
+
+
+def test_a_busy_chat_does_not_block_other_chats():
+    scheduler = _scheduler(account_burst=10.0, chat_burst=1.0)
+    first = _queue(scheduler, SendPriority.NORMAL, "1")
+    again = _queue(scheduler, SendPriority.NORMAL, "1")
+    other = _queue(scheduler, SendPriority.NORMAL, "2")
+
+    wait = scheduler._dispatch(0.0)
+
+    assert first.granted.is_set() and other.granted.is_set()
+    assert not again.granted.is_set()
+    assert 0 < wait <= 1.0
+    assert list(scheduler._queues[SendPriority.NORMAL]) == [again]
+
+
+def test_rate_limit_error_halves_the_rate_and_pauses_sends():
+    scheduler = _scheduler(account_rate=1.0, cooldown=5.0, recovery=0.1)
+
+    scheduler.on_result(_jid("1"), "rate-overlimit")
+    assert scheduler._account.rate == 0.5
+    assert scheduler.is_throttled
+    waiter = _queue(scheduler, SendPriority.INTERACTIVE, "1")
+    assert scheduler._dispatch(scheduler._paused_until - 1) == pytest.approx(1.0)
+    assert not waiter.granted.is_set()
+
+    scheduler.on_result(_jid("1"))
+    assert scheduler._account.rate == pytest.approx(0.6)
+    assert (scheduler.sent, scheduler.throttled) == (1, 1)
+
+
+def test_acquire_waits_for_a_token_and_disable_releases_everyone():
+    scheduler = SendScheduler(client=None)
+    assert scheduler.acquire(_jid("1")) == 0.0
+
+    scheduler.enable(account_rate=0.001, account_burst=1.0, chat_burst=5.0)
+    assert scheduler.acquire(_jid("1")) < 1.0
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (scheduler.acquire(_jid("2")), done.set()))
+    thread.start()
+    assert not done.wait(0.1)
+
+    scheduler.disable()
+    assert done.wait(5)
+    thread.join()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from snakechat.proto.snakechat_pb2 import JID
+from snakechat.receipts import ReadReceiptCoalescer
+from snakechat.utils.enum import ReceiptType
+
+
+class FakeClient:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = []
+        self.sent = threading.Event()
+
+    def mark_read(self, *message_ids, chat, sender, receipt, timestamp):
+        self.calls.append((message_ids, str(chat), receipt, timestamp))
+        self.sent.set()
+        if self.fail:
+            raise RuntimeError("not sent")
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def test_marks_of_a_chat_are_sent_as_one_call_on_flush():
+    client = FakeClient()
+    receipts = ReadReceiptCoalescer(client, window=60)
+    receipts.mark("A", "B", chat="123@s.whatsapp.net", sender=_jid("9"), timestamp=10)
+    receipts.mark("B", "C", chat=_jid("123"), sender="9@s.whatsapp.net", timestamp=5)
+    receipts.mark("D", chat="123@s.whatsapp.net", sender=_jid("9"), receipt=ReceiptType.PLAYED)
+
+    assert client.calls == []
+    assert receipts.stats().pending == 3
+    receipts.flush()
+
+    calls = sorted(client.calls, key=lambda call: len(call[0]), reverse=True)
+    assert calls[0][0] == ("A", "B", "C")
+    assert calls[0][3] == 10
+    assert calls[1][0] == ("D",) and calls[1][2] == ReceiptType.PLAYED
+    stats = receipts.stats()
+    assert (stats.marks, stats.ids, stats.calls, stats.pending) == (3, 5, 2, 0)
+    assert stats.saved == 1
+
+
+def test_full_buffer_is_sent_right_away():
+    client = FakeClient()
+    receipts = ReadReceiptCoalescer(client, window=60, max_ids=3)
+    receipts.mark("A", "B", chat="123@s.whatsapp.net", sender="9@s.whatsapp.net")
+    receipts.mark("C", "D", "E", "F", chat="123@s.whatsapp.net", sender="9@s.whatsapp.net")
+
+    assert [call[0] for call in client.calls] == [("A", "B", "C"), ("D", "E", "F")]
+    assert receipts.stats().pending == 0
+
+
+def test_window_expiry_sends_without_a_flush():
+    client = FakeClient()
+    receipts = ReadReceiptCoalescer(client, window=0.05)
+    start = time.monotonic()
+    receipts.mark("A", chat="123@s.whatsapp.net", sender="9@s.whatsapp.net")
+
+    assert client.sent.wait(5)
+    assert time.monotonic() - start >= 0.05
+    assert client.calls[0][0] == ("A",)
+
+
+def test_failed_calls_are_counted():
+    client = FakeClient(fail=True)
+    receipts = ReadReceiptCoalescer(client, window=60)
+    receipts.mark("A", chat="123@s.whatsapp.net", sender="9@s.whatsapp.net")
+    receipts.flush()
+
+    stats = receipts.stats()
+    assert (stats.calls, stats.failed) == (1, 1)
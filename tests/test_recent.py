@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+from snakechat.events import MessageEv
+from snakechat.proto import snakechat_pb2 as snakechat_proto
+from snakechat.proto.snakechat_pb2 import JID, MessageInfo, MessageSource, SendResponse
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.recent import RecentMessages
+
+
+class FakeEvent:
+    def __init__(self):
+        self.listeners = {}
+
+    def add_listener(self, event, f):
+        self.listeners.setdefault(event, []).append(f)
+
+
+class FakeClient:
+    def __init__(self):
+        self.event = FakeEvent()
+        self.account = SimpleNamespace(own_jid=_jid("me"))
+
+
+def _jid(user: str) -> JID:
+    return JID(User=user, RawAgent=0, Device=0, Integrator=0, Server="s.whatsapp.net")
+
+
+def _message(chat: str, message_id: str, text: str = "hi") -> snakechat_proto.Message:
+    info = MessageInfo(MessageSource=MessageSource(Chat=_jid(chat)), ID=message_id)
+    return snakechat_proto.Message(Info=info, Message=Message(conversation=text))
+
+
+def test_messages_are_found_by_chat_and_id():
+    recent = RecentMessages(FakeClient())
+    recent.add(_message("1", "A", "first"))
+
+    assert recent.get("1@s.whatsapp.net", "A").Message.conversation == "first"
+    assert recent.get(_jid("1"), "B") is None
+    assert recent.get(_jid("2"), "A") is None
+    assert (recent.hits, recent.misses) == (1, 2)
+
+
+def test_each_chat_keeps_its_newest_messages():
+    recent = RecentMessages(FakeClient(), per_chat=2)
+    for message_id in ("A", "B", "C"):
+        recent.add(_message("1", message_id))
+    recent.add(_message("2", "A"))
+
+    assert recent.get(_jid("1"), "A") is None
+    assert recent.get(_jid("1"), "C") is not None
+    assert recent.get(_jid("2"), "A") is not None
+    assert len(recent) == 3
+
+
+def test_the_byte_budget_evicts_the_oldest_messages_of_any_chat():
+    size = len(_message("1", "A").SerializePartialToString())
+    recent = RecentMessages(FakeClient(), max_bytes=size * 2)
+    recent.add(_message("1", "A"))
+    recent.add(_message("2", "B"))
+    recent.add(_message("3", "C"))
+
+    assert recent.get(_jid("1"), "A") is None
+    assert len(recent) == 2
+    assert recent.size <= size * 2
+
+
+def test_evicted_messages_are_read_back_from_the_spill_file(tmp_path):
+    recent = RecentMessages(FakeClient(), per_chat=1, spill_path=str(tmp_path / "spill.db"))
+    recent.add(_message("1", "A", "old"))
+    recent.add(_message("1", "B", "new"))
+
+    assert len(recent) == 1
+    assert recent.get(_jid("1"), "A").Message.conversation == "old"
+    recent.forget(_jid("1"), "A")
+    assert recent.get(_jid("1"), "A") is None
+
+
+def test_update_replaces_the_content():
+    recent = RecentMessages(FakeClient())
+    recent.add(_message("1", "A", "before"))
+    recent.update(_jid("1"), "A", Message(conversation="after"))
+    recent.update(_jid("1"), "missing", Message(conversation="ignored"))
+
+    assert recent.get(_jid("1"), "A").Message.conversation == "after"
+    assert len(recent) == 1
+
+
+def test_sent_messages_are_buffered_once_enabled():
+    client = FakeClient()
+    recent = RecentMessages(client)
+    response = SendResponse(ID="S1", Timestamp=10)
+    recent.add_sent("1@s.whatsapp.net", Message(conversation="ignored"), response)
+    assert len(recent) == 0
+
+    recent.enable()
+    recent.add_sent("1@s.whatsapp.net", Message(conversation="sent"), response)
+
+    sent = recent.get(_jid("1"), "S1")
+    assert sent.Info.MessageSource.IsFromMe
+    assert sent.Info.MessageSource.Sender.User == "me"
+    assert sent.Info.Timestamp == 10_000
+    assert client.event.listeners[MessageEv] == [recent._on_message]
@@ -0,0 +1,117 @@
+import pytest
+
+from snakechat.events import MessageEv
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.router import CommandRouter
+
+
+class FakeClient:
+    def __init__(self):
+        self.replies = []
+
+    def reply_message(self, message, quoted, **kwargs):
+        self.replies.append(message)
+
+
+def _message(text: str) -> MessageEv:
+    return MessageEv(Message=Message(conversation=text))
+
+
+@pytest.fixture
+def router():
+    router = CommandRouter(prefixes=("!", "!!", "/"))
+
+    @router.command("ping", "p")
+    def ping(ctx):
+        pass
+
+    @router.command("deep")
+    def deep(ctx):
+        pass
+
+    @router.regex(r"hello (\w+)")
+    def hello(ctx):
+        pass
+
+    return router
+
+
+def test_command_is_found_after_its_prefix(router):
+    handler, prefix, name, rest, match, command = router.resolve("/PING  a b ")
+
+    assert handler.__name__ == "ping"
+    assert (prefix, name, rest, match) == ("/", "PING", "a b", None)
+    assert command.name == "ping"
+    assert router.resolve("!p")[0].__name__ == "ping"
+
+
+def test_longest_prefix_wins(router):
+    assert router.resolve("!!deep")[1] == "!!"
+    assert router.resolve("!deep")[1] == "!"
+
+
+def test_regex_routes_run_when_no_command_matches(router):
+    handler, prefix, name, rest, match, command = router.resolve("well hello world")
+
+    assert handler.__name__ == "hello"
+    assert match.group(1) == "world"
+    assert command is None
+    assert router.resolve("/unknown") is None
+    assert router.resolve("plain text") is None
+    assert router.resolve("") is None
+
+
+def test_fallback_takes_unknown_prefixed_commands(router):
+    @router.fallback
+    def unknown(ctx):
+        pass
+
+    assert router.resolve("/nope  x") == (unknown, "/", "nope", "x", None, None)
+    assert router.resolve("/")[:3] == (unknown, "/", "")
+
+
+def test_bare_commands_and_case_sensitivity():
+    router = CommandRouter(prefixes="", case_sensitive=True)
+
+    @router.command("Ping")
+    def ping(ctx):
+        pass
+
+    assert router.resolve("Ping now")[:4] == (ping, "", "Ping", "now")
+    assert router.resolve("ping") is None
+
+
+def test_call_converts_arguments_and_answers_usage():
+    router = CommandRouter()
+    client = FakeClient()
+    seen = []
+
+    @router.command("add", arg_types=(int, int))
+    def add(ctx):
+        seen.append(sum(ctx.values))
+
+    router(client, _message("/add 2 3"))
+    router(client, _message("/add 2"))
+    router(client, _message("/add 2 x"))
+    router(client, _message("nothing"))
+
+    assert seen == [5]
+    assert client.replies == ["Usage: /add <int> <int>"] * 2
+    assert (router.handled, router.ignored) == (3, 1)
+
+
+def test_errors_go_to_the_error_handler():
+    router = CommandRouter()
+    errors = []
+
+    @router.command("boom")
+    def boom(ctx):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        router(FakeClient(), _message("/boom"))
+
+    router.on_error(lambda ctx, e: errors.append((ctx.command, str(e))))
+    router(FakeClient(), _message("/boom"))
+
+    assert errors == [("boom", "boom")]
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from snakechat.events import ConnectedEv
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.scheduled import FAILED, PENDING, SENDING, MessageScheduler
+
+
+class FakeEvent:
+    def __init__(self):
+        self.listeners = {}
+
+    def add_listener(self, event, f):
+        self.listeners.setdefault(event, []).append(f)
+
+    def emit(self, client, ev):
+        for f in self.listeners.get(type(ev), []):
+            f(client, ev)
+
+
+class FakeClient:
+    def __init__(self, connected: bool = True, failures: int = 0):
+        self.uuid = b"123"
+        self.event = FakeEvent()
+        self.hibernated = False
+        self.is_connected = connected
+        self.failures = failures
+        self.scheduled = None
+        self.sent = []
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def build_text_message(self, text: str) -> Message:
+        return Message(conversation=text)
+
+    def send_message(self, to, message, priority=None):
+        with self._lock:
+            self.attempts += 1
+            if not self.is_connected:
+                raise RuntimeError("websocket not connected")
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("not delivered")
+            self.sent.append((str(to), message.conversation))
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _state(scheduler, schedule_id):
+    with scheduler._db_lock:
+        row = scheduler._db.execute(
+            "SELECT state, attempts FROM scheduled WHERE id = ?", (schedule_id,)
+        ).fetchone()
+    return tuple(row) if row else None
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "scheduled.db")
+
+
+def test_due_message_is_sent_and_removed(path):
+    client = FakeClient()
+    scheduler = MessageScheduler(client, path)
+    try:
+        schedule_id = scheduler.schedule(time.time() - 1, "9@s.whatsapp.net", "hi")
+        assert _wait(lambda: client.sent)
+        assert _wait(lambda: scheduler.stats().sent == 1)
+        assert _state(scheduler, schedule_id) is None
+    finally:
+        scheduler.close()
+
+    assert client.sent == [("9@s.whatsapp.net", "hi")]
+    assert client.scheduled is scheduler
+
+
+def test_nothing_is_sent_before_the_client_connects(path):
+    client = FakeClient(connected=False)
+    scheduler = MessageScheduler(client, path)
+    try:
+        schedule_id = scheduler.schedule(time.time() - 1, "9@s.whatsapp.net", "hi")
+        time.sleep(0.1)
+        assert client.attempts == 0
+
+        client.is_connected = True
+        client.event.emit(client, ConnectedEv())
+        assert _wait(lambda: client.sent == [("9@s.whatsapp.net", "hi")])
+        assert _wait(lambda: _state(scheduler, schedule_id) is None)
+        assert scheduler.stats().failed == 0
+    finally:
+        scheduler.close()
+
+
+def test_sends_cut_by_a_disconnect_are_not_attempts(path):
+    client = FakeClient()
+    client.is_connected = False
+    scheduler = MessageScheduler(client, path, max_attempts=1)
+    # the scheduler believes the client is online until a send fails
+    scheduler._online = True
+    try:
+        schedule_id = scheduler.schedule(time.time() - 1, "9@s.whatsapp.net", "hi")
+        assert _wait(lambda: client.attempts == 1)
+        assert _wait(lambda: _state(scheduler, schedule_id) == (PENDING, 0))
+        assert not scheduler._online
+
+        client.is_connected = True
+        client.event.emit(client, ConnectedEv())
+        assert _wait(lambda: client.sent)
+        assert _wait(lambda: _state(scheduler, schedule_id) is None)
+        assert scheduler.stats().failed == 0
+    finally:
+        scheduler.close()
+
+
+def test_failed_sends_of_a_connected_client_count_until_failed(path):
+    client = FakeClient(failures=5)
+    scheduler = MessageScheduler(client, path, max_attempts=1, keep_sent=True)
+    try:
+        schedule_id = scheduler.schedule(time.time() - 1, "9@s.whatsapp.net", "hi")
+        assert _wait(lambda: _state(scheduler, schedule_id) == (FAILED, 1))
+        assert _wait(lambda: scheduler.stats().failed == 1)
+    finally:
+        scheduler.close()
+
+    assert client.sent == []
+
+
+def test_only_pending_schedules_can_be_replaced(path):
+    client = FakeClient(connected=False)
+    scheduler = MessageScheduler(client, path)
+    try:
+        later = time.time() + 3600
+        scheduler.schedule(later, "9@s.whatsapp.net", "a", schedule_id="s1")
+        scheduler.schedule(later + 1, "9@s.whatsapp.net", "b", schedule_id="s1")
+        assert scheduler.pending() == 1
+
+        with scheduler._db_lock, scheduler._db:
+            scheduler._db.execute(
+                "UPDATE scheduled SET state = ? WHERE id = ?", (SENDING, "s1")
+            )
+        with pytest.raises(ValueError):
+            scheduler.schedule(later, "9@s.whatsapp.net", "c", schedule_id="s1")
+        assert _state(scheduler, "s1") == (SENDING, 0)
+        assert scheduler.cancel("s1") == 0
+    finally:
+        scheduler.close()
+
+
+def test_default_database_is_per_client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scheduler = MessageScheduler(FakeClient(connected=False))
+    scheduler.close()
+
+    assert scheduler.path == "scheduled-123.db"
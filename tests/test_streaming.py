@@ -0,0 +1,76 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from snakechat.proto.waE2E.WAWebProtobufsE2E_pb2 import Message
+from snakechat.streaming import MessageStream
+
+
+class FakeClient:
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.sent = []
+        self.edits = []
+        self.edited = threading.Event()
+
+    def send_message(self, to, message, link_preview=False):
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RuntimeError("not sent")
+        self.sent.append(message)
+        return SimpleNamespace(ID="MSG1")
+
+    def build_text_message(self, text: str) -> Message:
+        return Message(conversation=text)
+
+    def edit_message(self, chat, message_id, message: Message):
+        self.edits.append((message_id, message.conversation))
+        self.edited.set()
+
+
+def test_updates_within_the_interval_are_coalesced_into_one_edit():
+    client = FakeClient()
+    with MessageStream(client, "123@s.whatsapp.net", interval=60) as stream:
+        for chunk in ("a", "b", "c", "d"):
+            stream.write(chunk)
+        assert client.sent == ["a"]
+        assert client.edits == []
+
+    assert client.edits == [("MSG1", "abcd")]
+    assert (stream.updates, stream.edits, stream.coalesced) == (4, 1, 2)
+
+
+def test_pending_text_is_edited_once_the_interval_passed():
+    client = FakeClient()
+    stream = MessageStream(client, "123@s.whatsapp.net", interval=0.05)
+    start = time.monotonic()
+    stream.write("a")
+    stream.write("b")
+
+    assert client.edited.wait(5)
+    assert time.monotonic() - start >= 0.05
+    assert client.edits == [("MSG1", "ab")]
+    stream.close()
+    assert client.edits == [("MSG1", "ab")]
+
+
+def test_failed_first_send_is_retried_by_close():
+    client = FakeClient(fail_first=1)
+    stream = MessageStream(client, "123@s.whatsapp.net", interval=60)
+    with pytest.raises(RuntimeError):
+        stream.write("a")
+    stream.write("b")
+
+    assert client.sent == ["ab"]
+    stream.close()
+    assert client.edits == []
+
+
+def test_closed_stream_rejects_updates():
+    stream = MessageStream(FakeClient(), "123@s.whatsapp.net")
+    stream.close()
+
+    with pytest.raises(ValueError):
+        stream.write("a")
@@ -0,0 +1,151 @@
+import time
+
+from snakechat.events import (
+    ConnectedEv,
+    ConnectFailureEv,
+    DisconnectedEv,
+    KeepAliveRestoredEv,
+    KeepAliveTimeoutEv,
+    TemporaryBanEv,
+)
+from snakechat.proto import snakechat_pb2 as snakechat
+from snakechat.supervisor import Supervisor
+from snakechat.utils.enum import SessionHealth
+
+
+class FakeEvent:
+    def __init__(self):
+        self.listeners = {}
+
+    def add_listener(self, event, f):
+        self.listeners.setdefault(event, []).append(f)
+
+    def emit(self, client, event):
+        for f in self.listeners.get(type(event), []):
+            f(client, event)
+
+
+class FakeClient:
+    def __init__(self, name: str = "a", reconnects: bool = True):
+        self.uuid = name.encode()
+        self.event = FakeEvent()
+        self.outbound_hooks = []
+        self.hibernated = False
+        self.is_logged_in = False
+        self.last_event = time.monotonic()
+        self.reconnects = reconnects
+        self.attempts = 0
+        self.auto_reconnect = True
+
+    def set_auto_reconnect(self, enable: bool):
+        self.auto_reconnect = enable
+
+    def reconnect(self):
+        self.attempts += 1
+        if self.reconnects:
+            self.event.emit(self, ConnectedEv())
+        else:
+            self.event.emit(self, DisconnectedEv())
+
+    def disconnect(self):
+        pass
+
+
+class FakeFactory:
+    def __init__(self, *clients):
+        self.clients = list(clients)
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _supervisor(client: FakeClient) -> Supervisor:
+    supervisor = Supervisor(FakeFactory(client))
+    supervisor.attach(client)
+    return supervisor
+
+
+def test_keepalive_timeouts_degrade_a_healthy_session():
+    client = FakeClient()
+    supervisor = _supervisor(client)
+    assert supervisor.health(client) is SessionHealth.CONNECTING
+
+    client.event.emit(client, ConnectedEv())
+    client.event.emit(client, KeepAliveTimeoutEv())
+    assert supervisor.health(client) is SessionHealth.DEGRADED
+    client.event.emit(client, KeepAliveRestoredEv())
+    assert supervisor.health(client) is SessionHealth.HEALTHY
+
+    client.hibernated = True
+    assert supervisor.health(client) is SessionHealth.HIBERNATED
+
+
+def test_connect_failures_stop_or_quarantine_the_session():
+    client = FakeClient()
+    supervisor = _supervisor(client)
+
+    client.event.emit(client, TemporaryBanEv(Expire=60))
+    status = supervisor.status()["a"]
+    assert status.health is SessionHealth.QUARANTINED
+    assert 0 < status.next_retry_in <= 60
+
+    client.event.emit(client, ConnectFailureEv(Reason=snakechat.LOGGED_OUT, Message=""))
+    assert supervisor.health(client) is SessionHealth.STOPPED
+    # a stopped session is not brought back by a disconnect
+    client.event.emit(client, DisconnectedEv())
+    assert supervisor.health(client) is SessionHealth.STOPPED
+
+
+def test_repeated_failures_back_off_then_quarantine():
+    client = FakeClient()
+    supervisor = _supervisor(client)
+    supervisor.quarantine_after = 3
+    for _ in range(2):
+        client.event.emit(
+            client, ConnectFailureEv(Reason=snakechat.SERVICE_UNAVAILABLE, Message="busy")
+        )
+        assert supervisor.health(client) is SessionHealth.RECONNECTING
+
+    client.event.emit(
+        client, ConnectFailureEv(Reason=snakechat.SERVICE_UNAVAILABLE, Message="busy")
+    )
+    assert supervisor.health(client) is SessionHealth.QUARANTINED
+    assert supervisor.status()["a"].failures == 3
+
+    client.event.emit(client, ConnectedEv())
+    assert supervisor.status()["a"].failures == 0
+
+
+def test_dropped_sessions_are_reconnected():
+    client = FakeClient()
+    supervisor = Supervisor(FakeFactory(client))
+    supervisor.enable(base_delay=0.01, max_delay=0.01)
+    try:
+        client.event.emit(client, ConnectedEv())
+        assert not client.auto_reconnect
+        client.event.emit(client, DisconnectedEv())
+        assert _wait(lambda: supervisor.health(client) is SessionHealth.HEALTHY)
+    finally:
+        supervisor.disable()
+
+    assert client.attempts == 1
+    assert client.auto_reconnect
+
+
+def test_a_session_that_keeps_failing_is_quarantined():
+    client = FakeClient(reconnects=False)
+    supervisor = Supervisor(FakeFactory(client))
+    supervisor.enable(base_delay=0.01, max_delay=0.01, quarantine_after=3)
+    try:
+        client.event.emit(client, DisconnectedEv())
+        assert _wait(lambda: supervisor.health(client) is SessionHealth.QUARANTINED)
+    finally:
+        supervisor.disable()
+
+    assert client.attempts == 3
@@ -0,0 +1,99 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from snakechat.utils.jid import build_jid
+from snakechat.verifier import NumberVerifier, normalize_number
+
+
+class FakeClient:
+    def __init__(self, registered=(), failures: int = 0):
+        self.registered = set(registered)
+        self.failures = failures
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def is_on_whatsapp(self, *numbers):
+        with self._lock:
+            self.queries.append(numbers)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("rate-overlimit")
+        return [
+            SimpleNamespace(
+                Query=number,
+                IsIn=number in self.registered,
+                JID=build_jid(number.lstrip("+")),
+            )
+            for number in numbers
+        ]
+
+
+@pytest.mark.parametrize(
+    "number, region, expected",
+    [
+        ("+1 (650) 253-0000", None, "+16502530000"),
+        ("0044 20 7946 0958", None, "+442079460958"),
+        ("16502530000", None, "+16502530000"),
+        ("020 7946 0958", "GB", "+442079460958"),
+        ("12", None, None),
+        ("not a number", None, None),
+    ],
+)
+def test_numbers_are_normalized_to_e164(number, region, expected):
+    assert normalize_number(number, region) == expected
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "numbers.db")
+
+
+def test_results_follow_the_input_and_repeats_are_checked_once(path):
+    client = FakeClient(registered={"+16502530000"})
+    verifier = NumberVerifier(client, path, chunk_size=2, rate=1000)
+
+    results = verifier.verify(
+        ["+1 650 253 0000", "bogus", "+16502530000", "+442079460958"], job_id="job"
+    )
+
+    assert [(r.e164, r.is_in) for r in results] == [
+        ("+16502530000", True),
+        (None, False),
+        ("+16502530000", True),
+        ("+442079460958", False),
+    ]
+    assert results[0].jid.User == "16502530000"
+    assert sorted(n for query in client.queries for n in query) == [
+        "+16502530000",
+        "+442079460958",
+    ]
+    assert verifier.progress("job") == {"total": 2, "done": 2, "finished": True}
+    stats = verifier.last_stats
+    assert (stats.numbers, stats.invalid, stats.checked, stats.cache_hits) == (4, 1, 2, 0)
+
+
+def test_second_run_is_answered_from_the_cache(path):
+    client = FakeClient(registered={"+16502530000"})
+    NumberVerifier(client, path, rate=1000).verify(["+16502530000"])
+
+    verifier = NumberVerifier(client, path, rate=1000)
+    results = verifier.verify(["+16502530000"])
+
+    assert len(client.queries) == 1
+    assert results[0].cached and results[0].is_in
+    assert results[0].jid.User == "16502530000"
+    assert verifier.last_stats.hit_rate == 1.0
+
+
+def test_failed_chunks_are_reported_and_leave_the_job_unfinished(path, monkeypatch):
+    monkeypatch.setattr("snakechat.verifier.time.sleep", lambda seconds: None)
+    client = FakeClient(failures=10)
+    verifier = NumberVerifier(client, path, rate=1000, max_attempts=2)
+
+    results = verifier.verify(["+16502530000"], job_id="job")
+
+    assert results[0].failed and not results[0].is_in
+    assert len(client.queries) == 2
+    assert verifier.progress("job") == {"total": 1, "done": 0, "finished": False}